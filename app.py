@@ -1,13 +1,24 @@
 import streamlit as st
 import pandas as pd
 import os
-import json
+import math
 from datetime import datetime, date, timedelta
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
-from io import BytesIO
-import shutil
+
+from atelier.archive import ARCHIVED_TABLES
+from atelier.availability import DressCalendar
+from atelier.cache import SharedTables
+from atelier.export import FORMATS, TABLE_TITLES, Exporter, filter_frames
+from atelier.finance import filtered as filter_finance
+from atelier.images import THUMB_SIZES, ImageStore
+from atelier.jobs import OUTBOX_FOLDER, archive_old, register as register_jobs
+from atelier.importer import IMPORT_TABLES, commit as commit_import, read_rows, validate as validate_import
+from atelier.ledger import check as check_balances, repair as repair_balances
+from atelier.metrics import METRICS, measured, process_memory
+from atelier.paging import page_window, select_positions
+from atelier.scheduler import Scheduler
+from atelier.schema import DEPARTMENTS, DRESS_STATUSES, DRESS_TYPES, parse, to_storage
+from atelier.settings import Settings
+from atelier.storage import C_COLS, S_COLS, D_COLS, TABLES, StaleWriteError, make_backend
 
 # --- 1. إعدادات الصفحة والمظهر ---
 st.set_page_config(
@@ -17,135 +28,219 @@ st.set_page_config(
 )
 
 IMAGE_FOLDER = "dress_images"
-BACKUP_FOLDER = "backups"
-if not os.path.exists(IMAGE_FOLDER): os.makedirs(IMAGE_FOLDER)
-if not os.path.exists(BACKUP_FOLDER): os.makedirs(BACKUP_FOLDER)
+SEARCH_LIMIT = 200
+PAGE_SIZES = [25, 50, 100, 250]
+# لوحة الأداء تظهر في الإعدادات فقط عند تحديد المفتاح في ATELIER_PERF_KEY وفتح الرابط بـ ?perf=<المفتاح>
+PERF_KEY = os.environ.get("ATELIER_PERF_KEY")
 
 # --- 2. محرك البيانات (Data Engine) ---
-def load_data(file_name, columns):
-    """تحميل البيانات مع معالجة الأخطاء"""
+@st.cache_resource
+def get_backend():
+    """محرك التخزين المشترك (CSV أو SQLite حسب المتغير ATELIER_STORAGE)"""
+    return make_backend()
+
+@st.cache_resource
+def get_shared_tables():
+    """جداول مشتركة بين كل جلسات المتصفح، يُعاد تحميلها فقط عند تغيّر البيانات في التخزين"""
+    return SharedTables(get_backend())
+
+@st.cache_resource
+def get_images():
+    return ImageStore(IMAGE_FOLDER)
+
+@st.cache_resource
+def get_exporter():
+    return Exporter()
+
+@st.cache_resource
+def get_settings():
+    """إعدادات التطبيق المحفوظة بجانب البيانات"""
+    return Settings(get_backend().data_dir)
+
+@measured("load_data")
+def load_data(table):
+    """قراءة الجدول (بأنواعه الحقيقية وأسماء العملاء المرتبطة) من الذاكرة المشتركة مع معالجة الأخطاء"""
     try:
-        if os.path.exists(file_name):
-            df = pd.read_csv(file_name, dtype=str)
-            df = df.fillna("")
-            for col in columns:
-                if col not in df.columns: df[col] = ""
-            return df[columns]
+        return get_shared_tables().view(table)
     except Exception as e:
-        st.error(f"⚠️ خطأ في تحميل {file_name}: {str(e)}")
-    return pd.DataFrame(columns=columns)
-
-def save_data(df, file_name):
-    """حفظ البيانات مع نسخ احتياطي تلقائي"""
+        st.error(f"⚠️ خطأ في تحميل {TABLES[table]['file']}: {str(e)}")
+    return parse(pd.DataFrame(columns=TABLES[table]["columns"], dtype=str), table)
+
+def related_rows(table, col, value):
+    """الأسطر المرتبطة بقيمة معينة من فهرس الجدول (بدلاً من مسح الجدول كاملاً)"""
+    return get_shared_tables().lookup(table, col, value)
+
+def history_rows(table, col, value):
+    """مثل related_rows مع السجلات المؤرشفة (للسجل الكامل وللتأكد قبل الحذف)"""
+    return get_shared_tables().history(table, col, value)
+
+@st.cache_resource
+def get_scheduler():
+    """المهام الخلفية (الملخص اليومي والأرشفة والصيانة)، مُجدول واحد للعملية يبدأ مع أول جلسة"""
+    return register_jobs(Scheduler(), get_backend(), get_shared_tables(), get_settings()).start()
+
+def get_dress_calendar():
+    """تقويم توفر الفساتين بمدد التجهيز والتنظيف المحفوظة في الإعدادات (يُبنى مرة لكل نسخة بيانات)"""
+    before, after = get_settings().get("dress_buffer_before"), get_settings().get("dress_buffer_after")
+    today = date.today()
+    return get_shared_tables().derived(
+        "dress_calendar", ["bookings", "dresses"],
+        lambda bookings, dresses: DressCalendar(bookings, dresses, before, after, today),
+        params=(before, after, today),
+    )[1]
+
+def get_options(table):
+    """قاموس كود ← نص العرض لقوائم اختيار الجدول (مشترك بين الجلسات ويُحدَّث بالأسطر المتغيرة فقط)"""
+    return get_shared_tables().options(table)
+
+def search_records(table, query, limit=SEARCH_LIMIT):
+    """السجلات المطابقة لنص البحث مرتبة بالأقرب (من فهرس البحث المشترك)، أو None إذا لم يُكتب نص كافٍ"""
+    if not query: return None
+    return get_shared_tables().search(table, query, limit)
+
+def select_record(label, table, keys=None, blank=False, where=st, **kwargs):
+    """قائمة اختيار سجلات: القيمة المختارة هي كود السجل، والنص من قاموس الخيارات المشترك"""
+    labels = get_options(table)
+    options = list(labels) if keys is None else list(keys)
+    if blank: options = [""] + options
+    return where.selectbox(label, options, format_func=lambda key: labels.get(key, key), **kwargs)
+
+@measured("insert_row")
+def insert_row(table, values):
+    """إضافة سطر واحد للجدول (INSERT أو إلحاق بسجل العمليات)"""
+    columns = TABLES[table]["columns"]
+    row = dict(zip(columns, values))
     try:
-        # إنشاء نسخة احتياطية قبل الحفظ
-        if os.path.exists(file_name):
-            backup_name = f"{BACKUP_FOLDER}/{os.path.basename(file_name).replace('.csv', '')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            shutil.copy2(file_name, backup_name)
-            # الاحتفاظ بآخر 10 نسخ فقط
-            cleanup_old_backups(file_name)
-        df.to_csv(file_name, index=False)
-        return True
+        get_backend().insert(table, to_storage(table, row))
     except Exception as e:
-        st.error(f"⚠️ خطأ في حفظ {file_name}: {str(e)}")
+        st.error(f"⚠️ خطأ في حفظ {TABLES[table]['file']}: {str(e)}")
         return False
+    return True
+
+def new_id(table, prefix=None):
+    """كود جديد من عدّاد الجدول الدائم (لا يتكرر حتى مع حفظ جلستين في نفس الثانية)"""
+    return get_backend().next_id(table, prefix)
 
-def cleanup_old_backups(file_name, keep_count=10):
-    """حذف النسخ الاحتياطية القديمة والاحتفاظ بآخر عدد محدد"""
+@measured("update_row")
+def update_row(table, key, changes, base=None):
+    """تعديل السطر صاحب المفتاح (UPDATE)؛ يُرفض إذا عدّل مستخدم آخر نفس السجل بعد المراجعة base"""
     try:
-        base_name = os.path.basename(file_name).replace('.csv', '')
-        backups = [f for f in os.listdir(BACKUP_FOLDER) if f.startswith(base_name)]
-        backups.sort(reverse=True)
-        for old_backup in backups[keep_count:]:
-            os.remove(os.path.join(BACKUP_FOLDER, old_backup))
+        get_backend().update(table, key, to_storage(table, changes), base=base)
+    except StaleWriteError as e:
+        st.error(f"⚠️ {str(e)}")
+        return False
     except Exception as e:
-        pass  # تجاهل أخطاء التنظيف
+        st.error(f"⚠️ خطأ في حفظ {TABLES[table]['file']}: {str(e)}")
+        return False
+    return True
 
-def get_styled_df(df, numeric_cols=[], date_cols=[]):
-    """تنسيق DataFrame للعرض"""
-    if df.empty: return df
-    display_df = df.copy()
+@measured("delete_row")
+def delete_row(table, key, base=None):
+    """حذف سطر بالمفتاح الأساسي (DELETE)؛ يُرفض إذا عدّل مستخدم آخر نفس السجل بعد المراجعة base"""
     try:
-        for col in numeric_cols:
-            if col in display_df.columns:
-                display_df[col] = pd.to_numeric(display_df[col], errors='coerce').fillna(0)
-        for col in date_cols:
-            if col in display_df.columns:
-                display_df[col] = pd.to_datetime(display_df[col], errors='coerce').dt.date
+        get_backend().delete(table, key, base=base)
+    except StaleWriteError as e:
+        st.error(f"⚠️ {str(e)}")
+        return False
     except Exception as e:
-        st.warning(f"⚠️ تحذير في تنسيق البيانات: {str(e)}")
+        st.error(f"⚠️ خطأ في حفظ {TABLES[table]['file']}: {str(e)}")
+        return False
+    return True
+
+def sync_balance(booking_id):
+    """إعادة حساب المدفوع والمتبقي لحجز من دفعاته (الدفعات هي المصدر) وحفظهما إذا اختلفا"""
+    rows = related_rows("bookings", "كود الحجز", booking_id)
+    if rows.empty: return True
+    row = rows.iloc[0]
+    paid = get_shared_tables().ledger().paid(booking_id)
+    if row["المدفوع"] == paid and row["المتبقي"] == row["السعر المتفق"] - paid: return True
+    return update_row("bookings", booking_id, {"المدفوع": paid, "المتبقي": row["السعر المتفق"] - paid})
+
+def current_revision(table):
+    """رقم مراجعة الجدول الذي تعمل عليه الجلسة في هذا التشغيل"""
+    return get_shared_tables().revision(table)
+
+def seen_revision(table, form_key):
+    """رقم مراجعة الجدول كما رآه المستخدم عند عرض النموذج (في التشغيل السابق للضغط على الحفظ)"""
+    state_key = f"_rev_{form_key}"
+    seen = st.session_state.get(state_key)
+    st.session_state[state_key] = current_revision(table)
+    return seen
+
+def get_styled_df(df):
+    """تنسيق DataFrame للعرض (الأعمدة محمّلة بأنواعها مسبقاً، فيكفي عرض التواريخ بدون وقت)"""
+    if df.empty: return df
+    display_df = df.copy()
+    for col in display_df.select_dtypes(include="datetime").columns:
+        display_df[col] = display_df[col].dt.date
     return display_df
 
-def safe_date_parse(date_str, default=None):
-    """تحويل آمن للتاريخ مع معالجة الأخطاء"""
+def paged_table(table, key, date_col=None, newest_first=True, prepare=None, **kwargs):
+    """جدول مقسم لصفحات: البحث والترتيب وتحديد الفترة على الخادم، ولا يُحوَّل ويُرسل للمتصفح إلا الصفحة الظاهرة"""
+    columns = list(load_data(table).columns)
+    f1, f2, f3, f4 = st.columns([3, 2, 1, 2])
+    query = f1.text_input("🔍 بحث في الجدول", key=f"{key}_q")
+    sort_col = f2.selectbox("ترتيب حسب", [None] + columns, format_func=lambda c: "ترتيب الإدخال" if c is None else c, key=f"{key}_sort")
+    descending = f3.toggle("تنازلي", value=newest_first, key=f"{key}_desc")
+    date_range = None
+    if date_col:
+        picked = f4.date_input(f"فترة {date_col}", value=(), key=f"{key}_range")
+        if len(picked) == 2:
+            date_range = (pd.Timestamp(picked[0]).to_datetime64(), pd.Timestamp(picked[1]).to_datetime64())
+    df, positions = select_positions(get_shared_tables(), table, sort_col, descending, query, date_col, date_range)
+
+    p1, p2, p3 = st.columns([1, 1, 3])
+    page_size = p1.selectbox("عدد الأسطر", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = max(1, math.ceil(len(positions) / page_size))
+    # الرجوع للصفحة الأولى عند تغيير البحث أو الترتيب أو الفترة
+    signature = (query, sort_col, descending, date_range, page_size)
+    if st.session_state.get(f"{key}_sig") != signature or st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_sig"] = signature
+        st.session_state[f"{key}_page"] = 1
+    page = p2.number_input("الصفحة", 1, pages, key=f"{key}_page")
+    rows, page, pages = page_window(df, positions, page, page_size)
+    p3.caption(f"صفحة {page} من {pages} — {len(positions)} سجل")
+
+    display = get_styled_df(rows)
+    if prepare and not display.empty: display = prepare(display)
+    event = st.dataframe(display, use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row", key=f"{key}_grid_{page}_{hash(signature)}", **kwargs)
+    return display, event
+
+def safe_date_parse(value, default=None):
+    """تحويل آمن للتاريخ (Timestamp أو نص) مع معالجة الأخطاء"""
     try:
-        if date_str and date_str.strip():
-            return datetime.strptime(str(date_str).strip(), '%Y-%m-%d').date()
+        if isinstance(value, (pd.Timestamp, datetime)) and not pd.isna(value):
+            return value.date()
+        if isinstance(value, str) and value.strip():
+            return datetime.strptime(value.strip(), '%Y-%m-%d').date()
     except:
         pass
     return default if default else date.today()
 
-def export_to_excel(dataframes_dict, filename="export.xlsx"):
-    """تصدير عدة DataFrames إلى ملف Excel"""
-    try:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            for sheet_name, df in dataframes_dict.items():
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-        output.seek(0)
-        return output
-    except Exception as e:
-        st.error(f"⚠️ خطأ في التصدير: {str(e)}")
-        return None
-
-def get_upcoming_events(bookings_df, days=7):
-    """الحصول على المناسبات القادمة خلال عدد أيام محدد"""
+@measured("get_upcoming_events")
+def get_upcoming_events(days=7):
+    """المناسبات القادمة خلال عدد أيام محدد (بحث بمدى في فهرس تواريخ المناسبات المرتب)"""
     try:
-        upcoming = []
-        today = date.today()
-        for _, row in bookings_df.iterrows():
-            event_date = safe_date_parse(row["تاريخ المناسبة"])
-            days_diff = (event_date - today).days
-            if 0 <= days_diff <= days:
-                upcoming.append({
-                    "العروسة": row["اسم العروسه"],
-                    "الخدمة": row["الخدمة"],
-                    "تاريخ المناسبة": event_date,
-                    "الأيام المتبقية": days_diff,
-                    "المبلغ المتبقي": row["المتبقي"]
-                })
-        return pd.DataFrame(upcoming)
+        today = pd.Timestamp(date.today())
+        rows = get_shared_tables().between("bookings", "تاريخ المناسبة", today.to_datetime64(), (today + pd.Timedelta(days=days)).to_datetime64())
+        return pd.DataFrame({
+            "العروسة": rows["اسم العروسه"],
+            "الخدمة": rows["الخدمة"],
+            "تاريخ المناسبة": rows["تاريخ المناسبة"].dt.date,
+            "الأيام المتبقية": (rows["تاريخ المناسبة"] - today).dt.days,
+            "المبلغ المتبقي": rows["المتبقي"],
+        })
     except Exception as e:
         return pd.DataFrame()
 
-# تعريف الأعمدة الثابتة لضمان عدم حدوث KeyError
-C_COLS = ["كود العميل", "تاريخ التسجيل", "اسم العروسه", "اسم العريس", "العنوان", "تليفون 1", "تليفون 2", "ملاحظات"]
-S_COLS = ["كود الخدمة", "القسم", "اسم الخدمة", "السعر المقترح"]
-D_COLS = ["كود الفستان", "نوع الفستان", "تاريخ الشراء", "وصف الفستان", "صورة الفستان", "حالة الفستان"]
-B_COLS = ["كود الحجز", "تاريخ الحجز", "اسم العروسه", "القسم", "الخدمة", "كود الفستان", "تاريخ المناسبة", "السعر المتفق", "المدفوع", "المتبقي", "ملاحظات الحجز"]
-P_COLS = ["كود الدفع", "التاريخ", "كود الحجز", "القيمة المدفوعة", "اسم العروسه", "اسم العريس", "المتبقي بعد الدفعة", "ملاحظات الدفع"]
-
-# استخدام session_state لتحسين الأداء
-if 'data_loaded' not in st.session_state:
-    st.session_state.customers_df = load_data("customers.csv", C_COLS)
-    st.session_state.services_df = load_data("services.csv", S_COLS)
-    st.session_state.dresses_df = load_data("dresses.csv", D_COLS)
-    st.session_state.bookings_df = load_data("bookings.csv", B_COLS)
-    st.session_state.payments_df = load_data("payments.csv", P_COLS)
-    st.session_state.data_loaded = True
-
-# الوصول للبيانات من session_state
-customers_df = st.session_state.customers_df
-services_df = st.session_state.services_df
-dresses_df = st.session_state.dresses_df
-bookings_df = st.session_state.bookings_df
-payments_df = st.session_state.payments_df
-
-
+# الوصول للبيانات من الذاكرة المشتركة (بدون نسخة خاصة لكل جلسة)
 st.title("🌟 نظام إدارة الأتيليه الاحترافي")
 
+get_scheduler()
+
 # عرض التنبيهات للمناسبات القادمة بتصميم جذاب
-upcoming = get_upcoming_events(bookings_df, days=7)
+alert_days = get_settings().get("alert_days")
+upcoming = get_upcoming_events(days=alert_days)
 if not upcoming.empty:
     st.markdown(f"""
     <div style="
@@ -190,7 +285,7 @@ if not upcoming.empty:
                     font-size: 17px;
                     opacity: 0.95;
                     line-height: 1.4;
-                ">لديك <strong style="font-size: 20px;">{len(upcoming)}</strong> مناسبة قادمة خلال الأسبوع</div>
+                ">لديك <strong style="font-size: 20px;">{len(upcoming)}</strong> مناسبة قادمة خلال {"الأسبوع" if alert_days == 7 else f"{alert_days} يوم"}</div>
             </div>
         </div>
     </div>
@@ -218,10 +313,11 @@ if not upcoming.empty:
             }
         )
 
-tabs = st.tabs(["👥 العملاء", "📋 الخدمات", "👗 الفساتين", "📝 الحجوزات", "💰 المدفوعات", "📊 المالية", "⚙️ الإعدادات"])
-
+# كل قسم دالة مستقلة، ويُنفذ في كل إعادة تشغيل القسم المعروض فقط (بدل تنفيذ كل التبويبات)
 # --- 1. تبويب العملاء (الربط 360 درجة) ---
-with tabs[0]:
+@measured("section.customers")
+def render_customers():
+    customers_df = load_data("customers")
     st.header("إدارة وسجلات العملاء")
     c_mode = st.radio("العملية:", ["➕ إضافة عميلة جديدة", "✏️ بحث وتعديل شامل", "🗑️ حذف عميلة"], horizontal=True, key="c_mode")
     
@@ -242,40 +338,24 @@ with tabs[0]:
                         st.error("⚠️ رقم الهاتف يجب أن يحتوي على أرقام فقط (10 أرقام على الأقل)")
                         st.stop()
                     
-                    # إصلاح توليد الـ ID: البحث عن أكبر كود موجود وإضافة 1
-                    max_id = 100
-                    if not customers_df.empty:
-                        try:
-                            max_id = customers_df["كود العميل"].str.replace("C-", "").astype(int).max()
-                        except:
-                            max_id = len(customers_df) + 100
-                    
-                    new_id = f"C-{max_id + 1}"
-                    customers_df.loc[len(customers_df)] = [new_id, str(f_reg), f_n, f_g, f_a, f_p1, f_p2, f_nt]
-                    if save_data(customers_df, "customers.csv"):
-                        st.session_state.customers_df = customers_df
-                        st.success(f"تم التسجيل بنجاح (الكود: {new_id}) ✅")
+                    c_id = new_id("customers")
+                    if insert_row("customers", [c_id, f_reg, f_n, f_g, f_a, f_p1, f_p2, f_nt]):
+                        st.success(f"تم التسجيل بنجاح (الكود: {c_id}) ✅")
                         st.rerun()
                 else: st.error("⚠️ جميع الخانات مطلوبة")
     
     elif c_mode == "✏️ بحث وتعديل شامل":
         if not customers_df.empty:
-            # إضافة بحث متقدم
+            # بحث من الفهرس بالاسم (مع توحيد الحروف) أو ببداية رقم الهاتف
             search_term = st.text_input("🔍 ابحث بالاسم أو رقم الهاتف:")
-            filtered_customers = customers_df
-            if search_term:
-                filtered_customers = customers_df[
-                    customers_df["اسم العروسه"].str.contains(search_term, case=False, na=False) |
-                    customers_df["اسم العريس"].str.contains(search_term, case=False, na=False) |
-                    customers_df["تليفون 1"].str.contains(search_term, case=False, na=False) |
-                    customers_df["تليفون 2"].str.contains(search_term, case=False, na=False)
-                ]
-            
+            found = search_records("customers", search_term)
+            filtered_customers = customers_df if found is None else found
+
             if not filtered_customers.empty:
-                sel_c = st.selectbox("ابحث عن العروسة للتعديل الشامل:", [""] + filtered_customers["اسم العروسه"].tolist())
+                sel_c = select_record("ابحث عن العروسة للتعديل الشامل:", "customers", filtered_customers["كود العميل"], blank=True)
                 if sel_c:
-                    c_idx = customers_df[customers_df["اسم العروسه"] == sel_c].index[0]
-                    c_curr = customers_df.loc[c_idx]
+                    c_curr = related_rows("customers", "كود العميل", sel_c).iloc[0]
+                    c_rev = seen_revision("customers", "c_edit_full")
                     with st.form("c_edit_full"):
                         e1, e2 = st.columns(2)
                         en_name = e1.text_input("تعديل اسم العروسة", value=c_curr["اسم العروسه"])
@@ -286,26 +366,13 @@ with tabs[0]:
                         en_reg = e2.date_input("تعديل تاريخ التسجيل", value=safe_date_parse(c_curr["تاريخ التسجيل"]))
                         en_notes = st.text_area("تعديل الملاحظات", value=c_curr["ملاحظات"])
                         if st.form_submit_button("تحديث كل البيانات ✏️"):
-                            old_name = c_curr["اسم العروسه"]
                             # التحقق من صحة رقم الهاتف عند التعديل
                             if not (en_p1.isdigit() and len(en_p1) >= 10):
                                 st.error("⚠️ رقم الهاتف يجب أن يحتوي على أرقام فقط")
                                 st.stop()
 
-                            customers_df.loc[c_idx] = [c_curr["كود العميل"], str(en_reg), en_name, en_groom, en_addr, en_p1, en_p2, en_notes]
-                            
-                            # Cascade Update: تحديث الاسم في الحجوزات والمدفوعات إذا تغير
-                            if old_name != en_name:
-                                bookings_df.loc[bookings_df["اسم العروسه"] == old_name, "اسم العروسه"] = en_name
-                                payments_df.loc[payments_df["اسم العروسه"] == old_name, "اسم العروسه"] = en_name
-                                save_data(bookings_df, "bookings.csv")
-                                save_data(payments_df, "payments.csv")
-                                st.session_state.bookings_df = bookings_df
-                                st.session_state.payments_df = payments_df
-                                st.info("ℹ️ تم تحديث اسم العروسة في جميع السجلات المرتبطة")
-
-                            if save_data(customers_df, "customers.csv"):
-                                st.session_state.customers_df = customers_df
+                            # الحجوزات والمدفوعات مرتبطة بالكود، فتغيير الاسم لا يمس إلا جدول العملاء
+                            if update_row("customers", c_curr["كود العميل"], dict(zip(C_COLS, [c_curr["كود العميل"], en_reg, en_name, en_groom, en_addr, en_p1, en_p2, en_notes])), base=c_rev):
                                 st.success("تم التحديث ✅")
                                 st.rerun()
             else:
@@ -313,184 +380,203 @@ with tabs[0]:
     
     else:  # حذف عميلة
         if not customers_df.empty:
-            sel_c_del = st.selectbox("اختر العميلة للحذف:", [""] + customers_df["اسم العروسه"].tolist())
+            sel_c_del = select_record("اختر العميلة للحذف:", "customers", blank=True)
             if sel_c_del:
-                c_idx_del = customers_df[customers_df["اسم العروسه"] == sel_c_del].index[0]
                 # التحقق من وجود حجوزات
-                has_bookings = not bookings_df[bookings_df["اسم العروسه"] == sel_c_del].empty
+                has_bookings = not history_rows("bookings", "كود العميل", sel_c_del).empty
                 if has_bookings:
                     st.error("⚠️ لا يمكن حذف هذه العميلة لأن لديها حجوزات مسجلة!")
                 else:
-                    st.warning(f"⚠️ هل أنت متأكد من حذف العميلة: {sel_c_del}؟")
+                    st.warning(f"⚠️ هل أنت متأكد من حذف العميلة: {get_options('customers').get(sel_c_del, sel_c_del)}؟")
+                    c_del_rev = seen_revision("customers", "c_del")
                     if st.button("تأكيد الحذف 🗑️", type="primary"):
-                        customers_df = customers_df.drop(c_idx_del).reset_index(drop=True)
-                        if save_data(customers_df, "customers.csv"):
-                            st.session_state.customers_df = customers_df
+                        if delete_row("customers", sel_c_del, base=c_del_rev):
                             st.success("تم الحذف ✅")
                             st.rerun()
 
     st.divider()
     st.write("### جدول العملاء (اضغط على السطر لرؤية تاريخ العروسة المالي والزمني ⚡)")
-    c_display = get_styled_df(customers_df.iloc[::-1], date_cols=["تاريخ التسجيل"])
-    c_sel = st.dataframe(c_display, use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
+    c_display, c_sel = paged_table("customers", "c_grid", date_col="تاريخ التسجيل")
 
     if c_sel.selection.rows:
-        bride_name = c_display.iloc[c_sel.selection.rows[0]]["اسم العروسه"]
-        st.markdown(f"#### 🔍 السجل الكامل لـ: {bride_name}")
+        sel_row = c_display.iloc[c_sel.selection.rows[0]]
+        st.markdown(f"#### 🔍 السجل الكامل لـ: {sel_row['اسم العروسه']}")
         col_b, col_p = st.columns(2)
         with col_b:
             st.info("📋 الحجوزات المسجلة")
-            rel_b = bookings_df[bookings_df["اسم العروسه"] == bride_name]
-            st.dataframe(get_styled_df(rel_b, numeric_cols=["السعر المتفق","المتبقي"], date_cols=["تاريخ المناسبة"]), use_container_width=True, hide_index=True)
+            rel_b = history_rows("bookings", "كود العميل", sel_row["كود العميل"])
+            st.dataframe(get_styled_df(rel_b), use_container_width=True, hide_index=True)
         with col_p:
             st.success("💰 المدفوعات المستلمة")
-            rel_p = payments_df[payments_df["اسم العروسه"] == bride_name]
-            st.dataframe(get_styled_df(rel_p, numeric_cols=["القيمة المدفوعة"], date_cols=["التاريخ"]), use_container_width=True, hide_index=True)
+            rel_p = history_rows("payments", "كود العميل", sel_row["كود العميل"])
+            st.dataframe(get_styled_df(rel_p), use_container_width=True, hide_index=True)
 
 # --- 2. الخدمات ---
-with tabs[1]:
+@measured("section.services")
+def render_services():
+    services_df = load_data("services")
     st.header("منيو الخدمات")
     s_mode = st.radio("العملية:", ["إضافة خدمة", "تعديل شامل", "🗑️ حذف خدمة"], horizontal=True, key="s_mode")
     if s_mode == "إضافة خدمة":
         with st.form("s_add"):
             sn = st.text_input("اسم الخدمة *")
-            sd = st.selectbox("القسم", ["الميكب", "التصوير", "الشعر", "البشره", "الفساتين"])
+            sd = st.selectbox("القسم", DEPARTMENTS)
             sp = st.number_input("السعر المقترح", min_value=0)
             if st.form_submit_button("حفظ ✅"):
                 if sn:
-                    # إصلاح توليد ID الخدمات
-                    max_sid = 100
-                    if not services_df.empty:
-                        try:
-                            max_sid = services_df["كود الخدمة"].str.replace("S-", "").astype(int).max()
-                        except:
-                            max_sid = len(services_df) + 100
-                    
-                    services_df.loc[len(services_df)] = [f"S-{max_sid+1}", sd, sn, str(sp)]
-                    if save_data(services_df, "services.csv"):
-                        st.session_state.services_df = services_df
+                    if insert_row("services", [new_id("services"), sd, sn, sp]):
                         st.rerun()
     elif s_mode == "تعديل شامل":
         if not services_df.empty:
             sel_s = st.selectbox("اختر الخدمة للتعديل الشامل:", services_df["اسم الخدمة"])
-            s_idx = services_df[services_df["اسم الخدمة"] == sel_s].index[0]
-            s_curr = services_df.loc[s_idx]
+            s_curr = related_rows("services", "اسم الخدمة", sel_s).iloc[0]
+            s_rev = seen_revision("services", "s_edit_full")
             with st.form("s_edit_full"):
                 en_n = st.text_input("تعديل اسم الخدمة", value=s_curr["اسم الخدمة"])
-                en_d = st.selectbox("تعديل القسم", ["الميكب", "التصوير", "الشعر", "البشره", "الفساتين"], index=["الميكب", "التصوير", "الشعر", "البشره", "الفساتين"].index(s_curr["القسم"]))
-                en_p = st.number_input("تعديل السعر", value=int(float(s_curr["السعر المقترح"])))
+                en_d = st.selectbox("تعديل القسم", DEPARTMENTS, index=DEPARTMENTS.index(s_curr["القسم"]))
+                en_p = st.number_input("تعديل السعر", value=int(s_curr["السعر المقترح"]))
                 if st.form_submit_button("تحديث الخدمة ✏️"):
-                    services_df.loc[s_idx] = [s_curr["كود الخدمة"], en_d, en_n, str(en_p)]
-                    if save_data(services_df, "services.csv"):
-                        st.session_state.services_df = services_df
+                    if update_row("services", s_curr["كود الخدمة"], dict(zip(S_COLS, [s_curr["كود الخدمة"], en_d, en_n, en_p])), base=s_rev):
                         st.success("تم التحديث")
                         st.rerun()
     else:  # حذف خدمة
         if not services_df.empty:
             sel_s_del = st.selectbox("اختر الخدمة للحذف:", services_df["اسم الخدمة"])
-            s_idx_del = services_df[services_df["اسم الخدمة"] == sel_s_del].index[0]
-            has_bookings = not bookings_df[bookings_df["الخدمة"] == sel_s_del].empty
+            s_row_del = related_rows("services", "اسم الخدمة", sel_s_del).iloc[0]
+            has_bookings = not history_rows("bookings", "الخدمة", sel_s_del).empty
             if has_bookings:
                 st.error("⚠️ لا يمكن حذف هذه الخدمة لأنها مستخدمة في حجوزات!")
             else:
                 st.warning(f"⚠️ هل أنت متأكد من حذف الخدمة: {sel_s_del}؟")
+                s_del_rev = seen_revision("services", "s_del")
                 if st.button("تأكيد الحذف 🗑️", type="primary"):
-                    services_df = services_df.drop(s_idx_del).reset_index(drop=True)
-                    if save_data(services_df, "services.csv"):
-                        st.session_state.services_df = services_df
+                    if delete_row("services", s_row_del["كود الخدمة"], base=s_del_rev):
                         st.success("تم الحذف ✅")
                         st.rerun()
     
-    st.dataframe(get_styled_df(services_df, numeric_cols=["السعر المقترح"]), use_container_width=True, hide_index=True)
+    st.dataframe(get_styled_df(services_df), use_container_width=True, hide_index=True)
 
 # --- 3. الفساتين (مع سجل الحجوزات الجديد) ---
-with tabs[2]:
+@measured("section.dresses")
+def render_dresses():
+    dresses_df = load_data("dresses")
     st.header("كتالوج الفساتين")
-    d_mode = st.radio("العملية:", ["إضافة فستان", "تعديل شامل", "🗑️ حذف فستان"], horizontal=True, key="d_mode")
+    d_mode = st.radio("العملية:", ["إضافة فستان", "تعديل شامل", "🗑️ حذف فستان", "📅 التوفر"], horizontal=True, key="d_mode")
     if d_mode == "إضافة فستان":
         with st.form("d_add"):
             col1, col2 = st.columns(2)
-            dc = col1.text_input("كود الفستان *")
-            dt = col2.selectbox("النوع", ["زفاف", "سواريه", "غير محدد"])
+            dc = col1.text_input("كود الفستان", placeholder="يُولَّد تلقائياً إذا تُرك فارغاً")
+            dt = col2.selectbox("النوع", DRESS_TYPES)
             dp = col1.date_input("تاريخ الشراء", date.today())
-            ds = col2.selectbox("الحالة", ["متاح", "محجوز", "في المغسلة"])
+            ds = col2.selectbox("الحالة", DRESS_STATUSES)
             dd = st.text_area("وصف الفستان *")
             di = col2.file_uploader("الصورة")
             if st.form_submit_button("حفظ ✅"):
-                if dc and dd:
+                if dd:
+                    dc = dc.strip() or new_id("dresses")
                     # التحقق من عدم تكرار الكود
                     if dc in dresses_df["كود الفستان"].values:
                         st.error("⚠️ كود الفستان موجود مسبقاً!")
                     else:
-                        path = os.path.join(IMAGE_FOLDER, f"{dc}.jpg") if di else ""
-                        if di: Image.open(di).save(path)
-                        dresses_df.loc[len(dresses_df)] = [dc, dt, str(dp), dd, path, ds]
-                        if save_data(dresses_df, "dresses.csv"):
-                            st.session_state.dresses_df = dresses_df
+                        path = get_images().save(di) if di else ""
+                        if insert_row("dresses", [dc, dt, dp, dd, path, ds]):
                             st.rerun()
     elif d_mode == "تعديل شامل":
         if not dresses_df.empty:
             # تحسين عرض البحث
-            d_search_list = dresses_df.apply(lambda x: f"{x['كود الفستان']} | {x['وصف الفستان'][:50]}...", axis=1).tolist()
-            sel_d = st.selectbox("ابحث عن فستان للتعديل:", d_search_list)
-            d_idx = dresses_df[dresses_df["كود الفستان"] == sel_d.split(" | ")[0]].index[0]
-            d_curr = dresses_df.loc[d_idx]
+            sel_d = select_record("ابحث عن فستان للتعديل:", "dresses")
+            d_curr = related_rows("dresses", "كود الفستان", sel_d).iloc[0]
+            d_rev = seen_revision("dresses", "d_edit_full")
             with st.form("d_edit_full"):
                 e1, e2 = st.columns(2)
                 edc = e1.text_input("تعديل الكود", value=d_curr["كود الفستان"])
-                edt = e2.selectbox("تعديل النوع", ["زفاف", "سواريه", "غير محدد"], index=["زفاف", "سواريه", "غير محدد"].index(d_curr["نوع الفستان"]))
+                edt = e2.selectbox("تعديل النوع", DRESS_TYPES, index=DRESS_TYPES.index(d_curr["نوع الفستان"]))
                 edp = e1.date_input("تعديل تاريخ الشراء", value=safe_date_parse(d_curr["تاريخ الشراء"]))
-                eds = e2.selectbox("تعديل الحالة", ["متاح", "محجوز", "في المغسلة"], index=["متاح", "محجوز", "في المغسلة"].index(d_curr["حالة الفستان"]))
+                eds = e2.selectbox("تعديل الحالة", DRESS_STATUSES, index=DRESS_STATUSES.index(d_curr["حالة الفستان"]))
                 edd = st.text_area("تعديل وصف الفستان", value=d_curr["وصف الفستان"])
+                edi = st.file_uploader("تغيير الصورة")
                 if st.form_submit_button("تحديث الفستان ✏️"):
-                    dresses_df.loc[d_idx] = [edc, edt, str(edp), edd, d_curr["صورة الفستان"], eds]
-                    if save_data(dresses_df, "dresses.csv"):
-                        st.session_state.dresses_df = dresses_df
+                    ed_path = get_images().save(edi) if edi else d_curr["صورة الفستان"]
+                    if update_row("dresses", d_curr["كود الفستان"], dict(zip(D_COLS, [edc, edt, edp, edd, ed_path, eds])), base=d_rev):
+                        old_path = d_curr["صورة الفستان"]
+                        if old_path and old_path != ed_path and related_rows("dresses", "صورة الفستان", old_path).empty:
+                            get_images().remove(old_path)
                         st.rerun()
-    else:  # حذف فستان
+    elif d_mode == "🗑️ حذف فستان":
         if not dresses_df.empty:
             sel_d_del = st.selectbox("اختر الفستان للحذف:", dresses_df["كود الفستان"])
-            d_idx_del = dresses_df[dresses_df["كود الفستان"] == sel_d_del].index[0]
-            has_bookings = not bookings_df[bookings_df["كود الفستان"] == sel_d_del].empty
+            has_bookings = not history_rows("bookings", "كود الفستان", sel_d_del).empty
             if has_bookings:
                 st.error("⚠️ لا يمكن حذف هذا الفستان لأنه محجوز!")
             else:
                 st.warning(f"⚠️ هل أنت متأكد من حذف الفستان: {sel_d_del}؟")
+                d_del_rev = seen_revision("dresses", "d_del")
                 if st.button("تأكيد الحذف 🗑️", type="primary"):
-                    # حذف الصورة إن وجدت
-                    img_path = dresses_df.loc[d_idx_del, "صورة الفستان"]
-                    if img_path and os.path.exists(img_path):
-                        os.remove(img_path)
-                    dresses_df = dresses_df.drop(d_idx_del).reset_index(drop=True)
-                    if save_data(dresses_df, "dresses.csv"):
-                        st.session_state.dresses_df = dresses_df
+                    img_path = related_rows("dresses", "كود الفستان", sel_d_del).iloc[0]["صورة الفستان"]
+                    if delete_row("dresses", sel_d_del, base=d_del_rev):
+                        # الصور محفوظة ببصمة محتواها، فقد تكون نفس الصورة مستخدمة لفستان آخر
+                        if img_path and related_rows("dresses", "صورة الفستان", img_path).empty:
+                            get_images().remove(img_path)
                         st.success("تم الحذف ✅")
                         st.rerun()
+    else:  # تقويم التوفر
+        calendar = get_dress_calendar()
+        st.caption(f"كل حجز يشغل الفستان {get_settings().get('dress_buffer_before')} يوم قبل المناسبة و{get_settings().get('dress_buffer_after')} يوم بعدها (تعديلها من الإعدادات)")
+        av1, av2 = st.columns(2)
+        with av1:
+            st.write("#### الفساتين المتاحة في يوم")
+            av_day = st.date_input("اليوم", date.today(), key="av_day")
+            free = calendar.free_on(av_day)
+            st.metric("عدد الفساتين المتاحة", f"{len(free)} من {len(dresses_df)}")
+            free_df = dresses_df[dresses_df["كود الفستان"].isin(free)]
+            st.dataframe(get_styled_df(free_df[["كود الفستان", "نوع الفستان", "وصف الفستان"]]), use_container_width=True, hide_index=True)
+        with av2:
+            st.write("#### هل الفستان متاح في فترة؟")
+            if not dresses_df.empty:
+                av_dress = st.selectbox("الفستان", dresses_df["كود الفستان"], key="av_dress")
+                av_range = st.date_input("الفترة", (date.today(), date.today() + timedelta(days=7)), key="av_range")
+                if len(av_range) == 2:
+                    if calendar.is_free(av_dress, av_range[0], av_range[1]):
+                        st.success("✅ الفستان متاح طوال هذه الفترة")
+                    else:
+                        st.error("❌ الفستان مشغول في جزء من هذه الفترة")
+                st.dataframe(calendar.reservations(av_dress), use_container_width=True, hide_index=True)
 
     st.divider()
     st.write("### سجل الفساتين (اضغط على سطر الفستان لرؤية العرائس اللاتي حجزنه ⚡)")
-    d_disp = get_styled_df(dresses_df, date_cols=["تاريخ الشراء"])
-    d_sel = st.dataframe(d_disp, column_config={"صورة الفستان": st.column_config.ImageColumn()}, use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
+    # الجدول يعرض مصغرات صغيرة للصفحة الظاهرة فقط، والصورة الكاملة تُحمَّل عند اختيار الفستان
+    d_disp, d_sel = paged_table("dresses", "d_grid", date_col="تاريخ الشراء", newest_first=False,
+                                prepare=lambda df: df.assign(**{"صورة الفستان": df["صورة الفستان"].map(get_images().data_uri)}),
+                                column_config={"صورة الفستان": st.column_config.ImageColumn()})
 
     if d_sel.selection.rows:
         sel_dress_id = d_disp.iloc[d_sel.selection.rows[0]]["كود الفستان"]
+        sel_img = related_rows("dresses", "كود الفستان", sel_dress_id).iloc[0]["صورة الفستان"]
+        if sel_img and os.path.exists(sel_img):
+            with st.expander("🖼️ صورة الفستان", expanded=True):
+                st.image(get_images().thumbnail(sel_img, THUMB_SIZES[-1]))
+                st.download_button("الصورة بالحجم الكامل 📥", open(sel_img, "rb").read(), file_name=os.path.basename(sel_img), mime="image/jpeg")
         st.info(f"📋 سجل حركات الفستان كود: {sel_dress_id}")
-        rel_bookings_dress = bookings_df[bookings_df["كود الفستان"] == sel_dress_id]
+        rel_bookings_dress = history_rows("bookings", "كود الفستان", sel_dress_id)
         if not rel_bookings_dress.empty:
-            st.dataframe(get_styled_df(rel_bookings_dress, numeric_cols=["السعر المتفق"], date_cols=["تاريخ المناسبة"]), use_container_width=True, hide_index=True)
+            st.dataframe(get_styled_df(rel_bookings_dress), use_container_width=True, hide_index=True)
         else: st.write("هذا الفستان متاح ولم يتم حجز مسبق له.")
 
 # --- 4. الحجوزات (الربط والبحث المتقدم) ---
-with tabs[3]:
+@measured("section.bookings")
+def render_bookings():
+    services_df = load_data("services")
+    dresses_df = load_data("dresses")
+    bookings_df = load_data("bookings")
     st.header("إدارة الحجوزات")
     b_mode = st.radio("العملية:", ["➕ حجز جديد", "✏️ بحث وتعديل شامل", "🗑️ حذف حجز"], horizontal=True, key="b_mode")
     
     if b_mode == "➕ حجز جديد":
-        b_dept = st.selectbox("اختر القسم لبدء الحجز", ["الميكب", "التصوير", "الشعر", "البشره", "الفساتين"])
+        b_dept = st.selectbox("اختر القسم لبدء الحجز", DEPARTMENTS)
         is_dr = (b_dept == "الفساتين")
         with st.form("b_add", clear_on_submit=False):
             c1, c2 = st.columns(2)
-            f_cust = c1.selectbox("العروسه *", [""] + customers_df["اسم العروسه"].tolist())
+            f_cust = select_record("العروسه *", "customers", blank=True, where=c1)
             s_list = services_df[services_df["القسم"] == b_dept]["اسم الخدمة"].tolist()
             f_serv = c2.selectbox("الخدمة *", s_list if s_list else ["لا يوجد خدمات"])
             f_dress = c1.selectbox("الفستان", ["بدون فستان"] + dresses_df["كود الفستان"].tolist(), disabled=not is_dr)
@@ -502,177 +588,179 @@ with tabs[3]:
             if st.form_submit_button("تأكيد الحجز ✅"):
                 if f_cust and f_price > 0:
                     if f_paid > f_price: st.error("❌ العربون أكبر من السعر"); st.stop()
-                    # منع حجز نفس الفستان في نفس التاريخ فقط
+                    # منع حجز الفستان إذا تداخلت فترة تجهيزه وتنظيفه مع حجز آخر أو كان في المغسلة
                     if is_dr and f_dress != "بدون فستان":
-                        conf = bookings_df[(bookings_df["كود الفستان"]==f_dress) & (bookings_df["تاريخ المناسبة"]==str(f_event))]
-                        if not conf.empty: st.error("❌ الفستان محجوز بهذا التاريخ!"); st.stop()
-
-                    bid = f"{b_dept[0:2].upper()}-{int(datetime.now().timestamp())}"
-                    new_b = [bid, str(f_reg), f_cust, b_dept, f_serv, f_dress, str(f_event), str(f_price), str(f_paid), str(float(f_price)-float(f_paid)), f_notes]
-                    bookings_df.loc[len(bookings_df)] = new_b
-                    if save_data(bookings_df, "bookings.csv"):
-                        st.session_state.bookings_df = bookings_df
+                        ev = pd.Timestamp(f_event)
+                        calendar = get_dress_calendar()
+                        if not calendar.is_free(f_dress, ev - calendar.before, ev + calendar.after):
+                            st.error("❌ الفستان محجوز أو غير جاهز في فترة هذه المناسبة!"); st.stop()
+
+                    bid = new_id("bookings", b_dept[0:2].upper())
+                    new_b = [bid, f_reg, f_cust, b_dept, f_serv, f_dress, f_event, f_price, f_paid, f_price-f_paid, f_notes]
+                    if insert_row("bookings", new_b):
                         if f_paid > 0:
-                            p_id = f"PAY-{int(datetime.now().timestamp())}"
-                            groom = customers_df[customers_df["اسم العروسه"]==f_cust].iloc[0]["اسم العريس"]
-                            new_p = [p_id, str(f_reg), bid, str(f_paid), f_cust, groom, str(float(f_price)-float(f_paid)), "عربون حجز"]
-                            payments_df.loc[len(payments_df)] = new_p
-                            if save_data(payments_df, "payments.csv"):
-                                st.session_state.payments_df = payments_df
+                            p_id = new_id("payments")
+                            new_p = [p_id, f_reg, bid, f_paid, f_price-f_paid, "عربون حجز"]
+                            insert_row("payments", new_p)
                         st.success("تم الحجز بنجاح ✅")
                         st.rerun()
     
     elif b_mode == "✏️ بحث وتعديل شامل":
         if not bookings_df.empty:
-            b_search = []
-            for _, r in bookings_df.iterrows():
-                gr = customers_df[customers_df["اسم العروسه"]==r["اسم العروسه"]].iloc[0]["اسم العريس"] if not customers_df[customers_df["اسم العروسه"]==r["اسم العروسه"]].empty else ""
-                b_search.append(f"{r['كود الحجز']} | {r['اسم العروسه']} & {gr} | {r['الخدمة']} | {r['السعر المتفق']}ج")
-            sel_b = st.selectbox("ابحث عن الحجز للتعديل الشامل:", b_search)
-            bid_ed = sel_b.split(" | ")[0]
-            b_idx = bookings_df[bookings_df["كود الحجز"] == bid_ed].index[0]
-            b_curr = bookings_df.loc[b_idx]
-            with st.form("b_edit_full_f"):
-                e1, e2 = st.columns(2)
-                en_cust = e1.selectbox("العروسة", customers_df["اسم العروسه"].tolist(), index=customers_df["اسم العروسه"].tolist().index(b_curr["اسم العروسه"]))
-                s_list_edit = services_df[services_df["القسم"] == b_curr["القسم"]]["اسم الخدمة"].tolist()
-                s_idx = s_list_edit.index(b_curr["الخدمة"]) if b_curr["الخدمة"] in s_list_edit else 0
-                en_serv = e2.selectbox("الخدمة", s_list_edit if s_list_edit else [b_curr["الخدمة"]], index=s_idx)
-                en_reg = e1.date_input("تاريخ التعاقد", value=safe_date_parse(b_curr["تاريخ الحجز"]))
-                en_ev = e2.date_input("تاريخ المناسبة", value=safe_date_parse(b_curr["تاريخ المناسبة"]))
-                en_price = e1.number_input("تعديل السعر المتفق", value=float(b_curr["السعر المتفق"]))
-                en_notes = st.text_area("تعديل الملاحظات", value=b_curr["ملاحظات الحجز"])
-                if st.form_submit_button("حفظ كل التعديلات للحجز ✏️"):
-                    new_rem = en_price - float(b_curr["المدفوع"])
-                    bookings_df.loc[b_idx, ["اسم العروسه", "الخدمة", "تاريخ الحجز", "تاريخ المناسبة", "السعر المتفق", "ملاحظات الحجز", "المتبقي"]] = [en_cust, en_serv, str(en_reg), str(en_ev), str(en_price), en_notes, str(new_rem)]
-                    if save_data(bookings_df, "bookings.csv"):
-                        st.session_state.bookings_df = bookings_df
-                        st.success("تم التحديث ✅")
-                        st.rerun()
+            b_query = st.text_input("🔍 ابحث بالاسم أو الكود أو الخدمة:", key="b_query")
+            b_found = search_records("bookings", b_query)
+            if b_found is not None and b_found.empty: st.info("لا توجد نتائج للبحث")
+            bid_ed = select_record("ابحث عن الحجز للتعديل الشامل:", "bookings", None if b_found is None else b_found["كود الحجز"])
+            if bid_ed:
+                b_curr = related_rows("bookings", "كود الحجز", bid_ed).iloc[0]
+                b_rev = seen_revision("bookings", "b_edit_full_f")
+                with st.form("b_edit_full_f"):
+                    e1, e2 = st.columns(2)
+                    c_codes = list(get_options("customers"))
+                    en_cust = select_record("العروسة", "customers", c_codes, index=c_codes.index(b_curr["كود العميل"]) if b_curr["كود العميل"] in c_codes else 0, where=e1)
+                    s_list_edit = services_df[services_df["القسم"] == b_curr["القسم"]]["اسم الخدمة"].tolist()
+                    s_idx = s_list_edit.index(b_curr["الخدمة"]) if b_curr["الخدمة"] in s_list_edit else 0
+                    en_serv = e2.selectbox("الخدمة", s_list_edit if s_list_edit else [b_curr["الخدمة"]], index=s_idx)
+                    en_reg = e1.date_input("تاريخ التعاقد", value=safe_date_parse(b_curr["تاريخ الحجز"]))
+                    en_ev = e2.date_input("تاريخ المناسبة", value=safe_date_parse(b_curr["تاريخ المناسبة"]))
+                    en_price = e1.number_input("تعديل السعر المتفق", value=b_curr["السعر المتفق"])
+                    en_notes = st.text_area("تعديل الملاحظات", value=b_curr["ملاحظات الحجز"])
+                    if st.form_submit_button("حفظ كل التعديلات للحجز ✏️"):
+                        paid = get_shared_tables().ledger().paid(bid_ed)
+                        if update_row("bookings", bid_ed, dict(zip(["كود العميل", "الخدمة", "تاريخ الحجز", "تاريخ المناسبة", "السعر المتفق", "ملاحظات الحجز", "المدفوع", "المتبقي"], [en_cust, en_serv, en_reg, en_ev, en_price, en_notes, paid, en_price - paid])), base=b_rev):
+                            st.success("تم التحديث ✅")
+                            st.rerun()
     
     else:  # حذف حجز
         if not bookings_df.empty:
-            b_search_del = []
-            for _, r in bookings_df.iterrows():
-                b_search_del.append(f"{r['كود الحجز']} | {r['اسم العروسه']} | {r['الخدمة']}")
-            sel_b_del = st.selectbox("اختر الحجز للحذف:", b_search_del)
-            bid_del = sel_b_del.split(" | ")[0]
-            b_idx_del = bookings_df[bookings_df["كود الحجز"] == bid_del].index[0]
-            has_payments = not payments_df[payments_df["كود الحجز"] == bid_del].empty
+            bid_del = select_record("اختر الحجز للحذف:", "bookings")
+            has_payments = not related_rows("payments", "كود الحجز", bid_del).empty
             if has_payments:
                 st.error("⚠️ لا يمكن حذف هذا الحجز لأن له مدفوعات مسجلة!")
             else:
                 st.warning(f"⚠️ هل أنت متأكد من حذف الحجز: {bid_del}؟")
+                b_del_rev = seen_revision("bookings", "b_del")
                 if st.button("تأكيد الحذف 🗑️", type="primary"):
-                    bookings_df = bookings_df.drop(b_idx_del).reset_index(drop=True)
-                    if save_data(bookings_df, "bookings.csv"):
-                        st.session_state.bookings_df = bookings_df
+                    if delete_row("bookings", bid_del, base=b_del_rev):
                         st.success("تم الحذف ✅")
                         st.rerun()
 
     st.divider()
     st.write("### سجل الحجوزات (المس السطر لرؤية المدفوعات وبيانات العروسة ⚡)")
-    b_disp = get_styled_df(bookings_df.iloc[::-1], numeric_cols=["السعر المتفق", "المدفوع", "المتبقي"], date_cols=["تاريخ الحجز", "تاريخ المناسبة"])
-    b_sel = st.dataframe(b_disp, use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
+    b_disp, b_sel = paged_table("bookings", "b_grid", date_col="تاريخ المناسبة")
 
     if b_sel.selection.rows:
         sid = b_disp.iloc[b_sel.selection.rows[0]]["كود الحجز"]
         st.info(f"💰 دفعات الحجز رقم: {sid}")
-        rel_p = payments_df[payments_df["كود الحجز"] == sid]
+        rel_p = related_rows("payments", "كود الحجز", sid)
         if not rel_p.empty:
-            st.dataframe(get_styled_df(rel_p[["التاريخ", "القيمة المدفوعة", "ملاحظات الدفع"]], numeric_cols=["القيمة المدفوعة"], date_cols=["التاريخ"]), use_container_width=True, hide_index=True)
+            st.dataframe(get_styled_df(rel_p[["التاريخ", "القيمة المدفوعة", "ملاحظات الدفع"]]), use_container_width=True, hide_index=True)
         else: st.warning("لا توجد دفعات إضافية.")
 
 # --- 5. المدفوعات ---
-with tabs[4]:
+@measured("section.payments")
+def render_payments():
+    bookings_df = load_data("bookings")
+    payments_df = load_data("payments")
     st.header("💰 إدارة المدفوعات")
     p_mode = st.radio("العملية:", ["➕ دفعة جديدة", "✏️ بحث وتعديل شامل", "🗑️ حذف دفعة"], horizontal=True, key="p_main")
     if p_mode == "➕ دفعة جديدة":
         if not bookings_df.empty:
-            c_list = customers_df.apply(lambda x: f"{x['اسم العروسه']} | {x['اسم العريس']}", axis=1).tolist()
-            sel_c = st.selectbox("ابحث عن العميلة:", c_list)
-            b_name = sel_c.split(" | ")[0]
-            c_bks = bookings_df[bookings_df["اسم العروسه"] == b_name]
+            sel_c = select_record("ابحث عن العميلة:", "customers")
+            c_bks = related_rows("bookings", "كود العميل", sel_c)
             if not c_bks.empty:
-                sel_bk = st.selectbox("اختر الحجز:", c_bks.apply(lambda x: f"{x['كود الحجز']} - {x['الخدمة']} (باقي {x['المتبقي']})", axis=1))
-                tid = sel_bk.split(" - ")[0]
-                trow = bookings_df[bookings_df["كود الحجز"] == tid].iloc[0]
+                bk_labels = dict(zip(c_bks["كود الحجز"], c_bks["كود الحجز"] + " - " + c_bks["الخدمة"].astype(str) + " (باقي " + c_bks["المتبقي"].astype(str) + ")"))
+                tid = st.selectbox("اختر الحجز:", list(bk_labels), format_func=bk_labels.get)
+                trow = related_rows("bookings", "كود الحجز", tid).iloc[0]
                 with st.form("p_add_f"):
                     p_date_in = st.date_input("التاريخ", date.today())
                     amt = st.number_input("المبلغ المدفوع", min_value=1.0)
                     p_msg = st.text_input("ملاحظات")
                     if st.form_submit_button("تأكيد الدفع ✅"):
-                        rem = float(trow["المتبقي"])
+                        rem = trow["السعر المتفق"] - get_shared_tables().ledger().paid(tid)
                         if amt > rem: st.error("❌ المبلغ أكبر من المتبقي"); st.stop()
-                        pid = f"PAY-{int(datetime.now().timestamp())}"
-                        new_p = [pid, str(p_date_in), tid, str(amt), b_name, customers_df[customers_df["اسم العروسه"]==b_name].iloc[0]["اسم العريس"], str(rem-amt), p_msg]
-                        payments_df.loc[len(payments_df)] = new_p
-                        if save_data(payments_df, "payments.csv"):
-                            st.session_state.payments_df = payments_df
-                            bookings_df.loc[bookings_df["كود الحجز"] == tid, ["المدفوع", "المتبقي"]] = [str(float(trow["المدفوع"])+amt), str(rem-amt)]
-                            if save_data(bookings_df, "bookings.csv"):
-                                st.session_state.bookings_df = bookings_df
-                                st.rerun()
+                        pid = new_id("payments")
+                        new_p = [pid, p_date_in, tid, amt, rem-amt, p_msg]
+                        if insert_row("payments", new_p) and sync_balance(tid):
+                            st.rerun()
     elif p_mode == "✏️ بحث وتعديل شامل":
-        p_search = payments_df.apply(lambda x: f"{x['كود الدفع']} | {x['اسم العروسه']} | {x['القيمة المدفوعة']}ج | {x['التاريخ']}", axis=1).tolist()
-        if p_search:
-            sel_p = st.selectbox("ابحث عن دفعة للتعديل الشامل:", p_search)
-            pid_ed = sel_p.split(" | ")[0]
-            p_idx = payments_df[payments_df["كود الدفع"] == pid_ed].index[0]
-            p_curr = payments_df.loc[p_idx]
-            with st.form("p_edit_full_f"):
-                ep_amt = st.number_input("تعديل المبلغ", value=float(p_curr["القيمة المدفوعة"]))
-                ep_date = st.date_input("تعديل التاريخ", value=safe_date_parse(p_curr["التاريخ"]))
-                ep_note = st.text_input("تعديل الملاحظات", value=p_curr["ملاحظات الدفع"])
-                if st.form_submit_button("تحديث الدفعة ✏️"):
-                    payments_df.loc[p_idx, ["القيمة المدفوعة", "التاريخ", "ملاحظات الدفع"]] = [str(ep_amt), str(ep_date), ep_note]
-                    if save_data(payments_df, "payments.csv"):
-                        st.session_state.payments_df = payments_df
-                        st.success("تم التحديث ✅")
-                        st.rerun()
+        if not payments_df.empty:
+            p_query = st.text_input("🔍 ابحث بالاسم أو الكود:", key="p_query")
+            p_found = search_records("payments", p_query)
+            if p_found is not None and p_found.empty: st.info("لا توجد نتائج للبحث")
+            pid_ed = select_record("ابحث عن دفعة للتعديل الشامل:", "payments", None if p_found is None else p_found["كود الدفع"])
+            if pid_ed:
+                p_curr = related_rows("payments", "كود الدفع", pid_ed).iloc[0]
+                p_rev = seen_revision("payments", "p_edit_full_f")
+                with st.form("p_edit_full_f"):
+                    ep_amt = st.number_input("تعديل المبلغ", value=p_curr["القيمة المدفوعة"])
+                    ep_date = st.date_input("تعديل التاريخ", value=safe_date_parse(p_curr["التاريخ"]))
+                    ep_note = st.text_input("تعديل الملاحظات", value=p_curr["ملاحظات الدفع"])
+                    if st.form_submit_button("تحديث الدفعة ✏️"):
+                        if update_row("payments", pid_ed, {"القيمة المدفوعة": ep_amt, "التاريخ": ep_date, "ملاحظات الدفع": ep_note}, base=p_rev) and sync_balance(p_curr["كود الحجز"]):
+                            st.success("تم التحديث ✅")
+                            st.rerun()
     else:  # حذف دفعة
-        p_search_del = payments_df.apply(lambda x: f"{x['كود الدفع']} | {x['اسم العروسه']} | {x['القيمة المدفوعة']}ج", axis=1).tolist()
-        if p_search_del:
-            sel_p_del = st.selectbox("اختر الدفعة للحذف:", p_search_del)
-            pid_del = sel_p_del.split(" | ")[0]
-            p_idx_del = payments_df[payments_df["كود الدفع"] == pid_del].index[0]
-            p_to_del = payments_df.loc[p_idx_del]
+        if not payments_df.empty:
+            pid_del = select_record("اختر الدفعة للحذف:", "payments")
+            p_to_del = related_rows("payments", "كود الدفع", pid_del).iloc[0]
             st.warning(f"⚠️ هل أنت متأكد من حذف الدفعة: {pid_del}؟")
             st.info("ملاحظة: سيتم تحديث المتبقي في الحجز المرتبط")
+            p_del_rev = seen_revision("payments", "p_del")
             if st.button("تأكيد الحذف 🗑️", type="primary"):
-                # تحديث الحجز المرتبط
-                booking_id = p_to_del["كود الحجز"]
-                payment_amount = float(p_to_del["القيمة المدفوعة"])
-                b_idx = bookings_df[bookings_df["كود الحجز"] == booking_id].index[0]
-                current_paid = float(bookings_df.loc[b_idx, "المدفوع"])
-                current_remaining = float(bookings_df.loc[b_idx, "المتبقي"])
-                bookings_df.loc[b_idx, ["المدفوع", "المتبقي"]] = [str(current_paid - payment_amount), str(current_remaining + payment_amount)]
-                
-                payments_df = payments_df.drop(p_idx_del).reset_index(drop=True)
-                if save_data(payments_df, "payments.csv") and save_data(bookings_df, "bookings.csv"):
-                    st.session_state.payments_df = payments_df
-                    st.session_state.bookings_df = bookings_df
+                # رصيد الحجز المرتبط يُعاد حسابه من دفعاته الباقية
+                if delete_row("payments", pid_del, base=p_del_rev) and sync_balance(p_to_del["كود الحجز"]):
                     st.success("تم الحذف ✅")
                     st.rerun()
 
     st.divider()
     st.write("### سجل المدفوعات (المس السطر لرؤية أصل الحجز ⚡)")
-    p_disp = get_styled_df(payments_df.iloc[::-1], numeric_cols=["القيمة المدفوعة", "المتبقي بعد الدفعة"], date_cols=["التاريخ"])
-    p_sel = st.dataframe(p_disp, use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
+    p_disp, p_sel = paged_table("payments", "p_grid", date_col="التاريخ")
 
     if p_sel.selection.rows:
         linked_bid = p_disp.iloc[p_sel.selection.rows[0]]["كود الحجز"]
         st.success(f"📄 تفاصيل الحجز المرتبط بكود: {linked_bid}")
-        st.dataframe(get_styled_df(bookings_df[bookings_df["كود الحجز"] == linked_bid], numeric_cols=["السعر المتفق","المتبقي"], date_cols=["تاريخ المناسبة"]), use_container_width=True, hide_index=True)
+        st.dataframe(get_styled_df(related_rows("bookings", "كود الحجز", linked_bid)), use_container_width=True, hide_index=True)
 
 # --- 6. المالية ---
-with tabs[5]:
+def finance_version():
+    """نسخة البيانات التي تعتمد عليها المالية: مراجعة الحجوزات والمدفوعات وأجزاء الأرشيف"""
+    shared = get_shared_tables()
+    return (shared.backend.version("bookings"), shared.backend.version("payments"), shared.archive.version("bookings"))
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def filtered_finance(version, start, end, department):
+    """المجاميع المفلترة لنسخة بيانات معينة (مشتركة بين الجلسات حتى يتغير أي حجز أو دفعة)"""
+    return filter_finance(get_shared_tables().finance_with_archive(), start, end, department)
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def finance_figure(name, version, filters, _build):
+    """رسم المالية يُبنى مرة لكل نسخة بيانات وفلاتر ويُعاد من الذاكرة بعدها (build تستلم plotly.express)"""
+    # plotly ثقيل التحميل ولا يُستخدم إلا هنا، فيُستورد عند أول رسم وليس مع بدء التطبيق
+    import plotly.express as px
+    return _build(px)
+
+@st.fragment
+@measured("section.finance")
+def render_finance():
+    # المجاميع محفوظة ومحدثة مع كل حفظ، فلا يُمسح جدول الحجوزات هنا (والأرشيف يُجمع مرة لكل أرشفة)
+    finance = get_shared_tables().finance_with_archive()
     st.header("📊 التقرير المالي")
-    b_calc = get_styled_df(bookings_df, numeric_cols=["السعر المتفق", "المدفوع"])
+    months = finance.months()
+    first, last = (months[0], months[-1]) if months else (None, None)
+    f1, f2 = st.columns(2)
+    fin_range = f1.select_slider("الفترة (شهر الحجز)", months, value=(first, last)) if len(months) > 1 else (first, last)
+    fin_dept = f2.selectbox("القسم", [""] + DEPARTMENTS, format_func=lambda d: d or "كل الأقسام", key="fin_dept")
+    # الفترة الكاملة بدون قسم هي المجاميع نفسها؛ غير ذلك يُحسب من خلايا المكعب المجمعة مسبقاً
+    filters = (fin_range[0] if fin_range[0] != first else None, fin_range[1] if fin_range[1] != last else None, fin_dept or None)
+    version = finance_version()
+    if any(filters):
+        finance = filtered_finance(version, *filters)
+    summary = finance.summary()
     c1, c2, c3 = st.columns(3)
-    total_sales = b_calc['السعر المتفق'].sum()
-    total_collected = b_calc['المدفوع'].sum()
-    total_remaining = total_sales - total_collected
+    total_sales = summary["sales"]
+    total_collected = summary["collected"]
+    total_remaining = summary["remaining"]
     
     c1.metric("إجمالي المبيعات", f"{total_sales:,.0f} ج.م")
     c2.metric("إجمالي التحصيل", f"{total_collected:,.0f} ج.م")
@@ -680,89 +768,234 @@ with tabs[5]:
     
     st.divider()
     
-    # رسوم بيانية
+    # رسوم بيانية (كل رسم يُبنى مرة لكل نسخة بيانات وفلاتر)
     col_chart1, col_chart2 = st.columns(2)
     
     with col_chart1:
         st.subheader("📈 المبيعات حسب القسم")
-        if not bookings_df.empty:
-            sales_by_dept = bookings_df.groupby("القسم")["السعر المتفق"].apply(lambda x: pd.to_numeric(x, errors='coerce').sum()).reset_index()
-            fig1 = px.pie(sales_by_dept, values='السعر المتفق', names='القسم', hole=0.4)
-            st.plotly_chart(fig1, use_container_width=True)
+        if summary["count"]:
+            with METRICS.timed("chart.departments"):
+                fig1 = finance_figure("departments", version, filters, lambda px: px.pie(finance.by("القسم"), values='السعر المتفق', names='القسم', hole=0.4))
+                st.plotly_chart(fig1, use_container_width=True)
     
     with col_chart2:
         st.subheader("💰 نسبة التحصيل")
-        collection_data = pd.DataFrame({
-            'الفئة': ['المحصل', 'المتبقي'],
-            'القيمة': [total_collected, total_remaining]
-        })
-        fig2 = px.bar(collection_data, x='الفئة', y='القيمة', color='الفئة', 
-                      color_discrete_map={'المحصل': '#2ecc71', 'المتبقي': '#e74c3c'})
-        st.plotly_chart(fig2, use_container_width=True)
+        with METRICS.timed("chart.collection"):
+            collection_data = pd.DataFrame({
+                'الفئة': ['المحصل', 'المتبقي'],
+                'القيمة': [total_collected, total_remaining]
+            })
+            fig2 = finance_figure("collection", version, filters, lambda px: px.bar(
+                collection_data, x='الفئة', y='القيمة', color='الفئة',
+                color_discrete_map={'المحصل': '#2ecc71', 'المتبقي': '#e74c3c'}))
+            st.plotly_chart(fig2, use_container_width=True)
     
     st.divider()
     st.subheader("📅 المبيعات الشهرية")
-    if not bookings_df.empty:
-        bookings_with_dates = bookings_df.copy()
-        bookings_with_dates['تاريخ الحجز'] = pd.to_datetime(bookings_with_dates['تاريخ الحجز'], errors='coerce')
-        bookings_with_dates['السعر المتفق'] = pd.to_numeric(bookings_with_dates['السعر المتفق'], errors='coerce')
-        bookings_with_dates['شهر'] = bookings_with_dates['تاريخ الحجز'].dt.to_period('M').astype(str)
-        monthly_sales = bookings_with_dates.groupby('شهر')['السعر المتفق'].sum().reset_index()
-        fig3 = px.line(monthly_sales, x='شهر', y='السعر المتفق', markers=True)
-        st.plotly_chart(fig3, use_container_width=True)
+    if summary["count"]:
+        with METRICS.timed("chart.monthly"):
+            fig3 = finance_figure("monthly", version, filters, lambda px: px.line(
+                finance.by("الشهر").rename(columns={"الشهر": "شهر"}), x='شهر', y='السعر المتفق', markers=True))
+            st.plotly_chart(fig3, use_container_width=True)
+
+    st.divider()
+    col_rev1, col_rev2 = st.columns(2)
+    col_rev1.subheader("🧾 الإيراد حسب الخدمة")
+    col_rev1.dataframe(finance.by("الخدمة"), use_container_width=True, hide_index=True)
+    col_rev2.subheader("👗 الإيراد حسب الفستان")
+    col_rev2.dataframe(finance.by("الفستان"), use_container_width=True, hide_index=True)
+
+# يُعاد تشغيله وحده كل ثانيتين لعرض تقدم التصدير الجاري في الخلفية
+@st.fragment(run_every=2)
+def render_exports():
+    for job in get_exporter().recent()[:5]:
+        if not job.done:
+            st.progress(job.progress, text=f"⏳ جاري تصدير {job.file_name} ({job.written:,} من {job.total:,} سطر)")
+        elif job.error:
+            st.error(f"⚠️ خطأ في تصدير {job.file_name}: {job.error}")
+        elif os.path.exists(job.path):
+            # الملف يُقرأ عند الضغط على التحميل فقط، وليس مع كل تحديث للتقدم
+            st.download_button(f"تحميل {job.file_name} 📥", lambda path=job.path: open(path, "rb").read(), file_name=job.file_name, key=f"export_{job.id}")
+
+def render_performance():
+    """لوحة مخفية لأزمنة العمليات (تُفتح من رابط الإعدادات بـ ?perf=) لمعرفة أي خطوة تبطئ التطبيق"""
+    st.divider()
+    st.subheader("⏱️ أداء التطبيق")
+    memory = process_memory()
+    st.caption(f"آخر {METRICS.window} قياس لكل عملية منذ تشغيل التطبيق"
+               + (f" — ذاكرة العملية الآن {memory / 2**20:,.0f} MB" if memory else "")
+               + (f" — القياسات تُحفظ أيضاً في {METRICS.log_path}" if METRICS.log_path else ""))
+    perf = METRICS.summary()
+    if perf.empty:
+        st.write("لا توجد قياسات بعد")
+    else:
+        st.dataframe(perf.style.format({col: "{:,.1f}" for col in perf.columns[2:]}, na_rep="-"), use_container_width=True, hide_index=True)
+    if st.button("تصفير القياسات"):
+        METRICS.clear()
+        st.rerun()
 
 # --- 7. الإعدادات ---
-with tabs[6]:
+@st.fragment
+@measured("section.settings")
+def render_settings():
     st.header("⚙️ الإعدادات والأدوات")
     
     st.subheader("📥 تصدير البيانات")
-    col_exp1, col_exp2 = st.columns(2)
-    
-    with col_exp1:
-        if st.button("تصدير كل البيانات إلى Excel 📊"):
-            excel_data = export_to_excel({
-                "العملاء": customers_df,
-                "الخدمات": services_df,
-                "الفساتين": dresses_df,
-                "الحجوزات": bookings_df,
-                "المدفوعات": payments_df
-            }, "atelier_data.xlsx")
-            if excel_data:
-                st.download_button(
-                    label="تحميل الملف 📥",
-                    data=excel_data,
-                    file_name=f"atelier_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-    
-    with col_exp2:
-        if st.button("تصدير التقرير المالي إلى Excel 💰"):
-            financial_report = get_styled_df(bookings_df, numeric_cols=["السعر المتفق", "المدفوع", "المتبقي"])
-            excel_data = export_to_excel({"التقرير المالي": financial_report}, "financial_report.xlsx")
-            if excel_data:
-                st.download_button(
-                    label="تحميل التقرير 📥",
-                    data=excel_data,
-                    file_name=f"financial_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+    with st.form("export_form"):
+        x1, x2 = st.columns(2)
+        x_tables = x1.multiselect("الجداول", list(TABLE_TITLES), default=list(TABLE_TITLES), format_func=TABLE_TITLES.get)
+        x_fmt = x2.selectbox("الصيغة", list(FORMATS), format_func=FORMATS.get)
+        x_range = x1.date_input("الفترة (اختياري)", value=(), key="export_range")
+        x_dept = x2.selectbox("القسم", [""] + DEPARTMENTS, format_func=lambda d: d or "كل الأقسام")
+        x_archive = x1.checkbox("مع الحجوزات والمدفوعات المؤرشفة")
+        if st.form_submit_button("بدء التصدير 📥"):
+            if x_tables:
+                start, end = x_range if len(x_range) == 2 else (None, None)
+                frames = {t: load_data(t) for t in x_tables}
+                if x_archive:
+                    for t in ARCHIVED_TABLES:
+                        if t in frames: frames[t] = pd.concat([get_shared_tables().archived_only(t), frames[t]], ignore_index=True)
+                frames = filter_frames(frames, start, end, x_dept or None)
+                get_exporter().start(frames, x_fmt, "_".join(x_tables) if len(x_tables) < len(TABLE_TITLES) else "data")
+    render_exports()
+
+    st.divider()
+    st.subheader("📤 استيراد بيانات بالجملة")
+    st.caption("ملف Excel أو CSV بنفس أسماء أعمدة الجدول؛ الأكواد تُولَّد تلقائياً إذا تُركت فارغة، وعربون كل حجز يُسجل كدفعة")
+    i1, i2 = st.columns(2)
+    imp_table = i1.selectbox("الجدول", IMPORT_TABLES, format_func=TABLE_TITLES.get, key="imp_table")
+    imp_file = i2.file_uploader("الملف", type=["xlsx", "csv"], key="imp_file")
+    if imp_file and st.button("فحص الملف 🔍"):
+        try:
+            imp_rows = read_rows(imp_file)
+            imp_valid, imp_errors = validate_import(imp_table, imp_rows, get_shared_tables().get, get_settings())
+            st.session_state.import_check = (imp_table, imp_file.name, len(imp_rows), imp_valid, imp_errors)
+        except ValueError as e:
+            st.error(f"⚠️ {str(e)}")
+    imp_check = st.session_state.get("import_check")
+    if imp_check and imp_file and imp_check[:2] == (imp_table, imp_file.name):
+        _, _, imp_total, imp_valid, imp_errors = imp_check
+        m1, m2, m3 = st.columns(3)
+        m1.metric("أسطر الملف", imp_total)
+        m2.metric("أسطر سليمة", len(imp_valid))
+        m3.metric("أسطر بها أخطاء", imp_errors["السطر"].nunique())
+        if not imp_errors.empty:
+            st.dataframe(imp_errors, use_container_width=True, hide_index=True)
+        if len(imp_valid) and st.button(f"استيراد {len(imp_valid)} سطر سليم ✅", type="primary"):
+            try:
+                commit_import(get_backend(), imp_table, imp_valid)
+                del st.session_state.import_check
+                st.success("تم الاستيراد ✅")
+                st.rerun()
+            except Exception as e:
+                st.error(f"⚠️ خطأ في الاستيراد: {str(e)}")
     
     st.divider()
-    st.subheader("💾 النسخ الاحتياطية")
-    st.info(f"يتم إنشاء نسخة احتياطية تلقائياً عند كل عملية حفظ في المجلد: {BACKUP_FOLDER}")
+    st.subheader("💾 النسخ الاحتياطية ونقاط الاستعادة")
+    backup_store = get_backend().backups
+    st.info(f"يتم حفظ نقطة استعادة تلقائياً بعد كل تعديل (مضغوطة وبدون تكرار للبيانات) في المجلد: {backup_store.folder}")
     
-    if os.path.exists(BACKUP_FOLDER):
-        backups = os.listdir(BACKUP_FOLDER)
-        if backups:
-            st.write(f"عدد النسخ الاحتياطية المتوفرة: {len(backups)}")
-            with st.expander("عرض النسخ الاحتياطية"):
-                for backup in sorted(backups, reverse=True)[:20]:
-                    st.text(backup)
-        else:
-            st.write("لا توجد نسخ احتياطية حالياً")
+    if backup_store.count():
+        bk1, bk2 = st.columns(2)
+        bk1.metric("عدد نقاط الاستعادة", backup_store.count())
+        bk2.metric("حجم المخزن", f"{backup_store.size_bytes() / 1024:,.0f} KB")
+        with st.expander("♻️ استعادة كل البيانات كما كانت في لحظة معينة"):
+            rc1, rc2 = st.columns(2)
+            r_date = rc1.date_input("التاريخ", date.today(), key="restore_date")
+            r_time = rc2.time_input("الوقت", datetime.strptime("23:59", "%H:%M").time(), step=60, key="restore_time")
+            r_point = backup_store.point_at(datetime.combine(r_date, r_time))
+            if r_point:
+                r_manifest = backup_store.manifest(r_point)
+                st.write(f"أقرب نقطة استعادة: **{r_manifest['ts'].replace('T', ' ')}** (بعد تعديل: {r_manifest['reason']})")
+                st.dataframe(pd.DataFrame([{"الجدول": TABLES[t]["file"], "عدد السجلات": info["rows"]} for t, info in r_manifest["tables"].items()]), hide_index=True)
+                st.warning("⚠️ سيتم استبدال البيانات الحالية في الجداول الخمسة بهذه النسخة (ويمكن التراجع بنقطة استعادة لاحقة)")
+                if st.button("تأكيد الاستعادة ♻️", type="primary"):
+                    try:
+                        get_backend().restore(r_point)
+                        st.success("تمت الاستعادة ✅")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"⚠️ خطأ في الاستعادة: {str(e)}")
+            else:
+                st.write("لا توجد نقطة استعادة قبل هذه اللحظة")
+    else:
+        st.write("لا توجد نسخ احتياطية حالياً")
     
+    st.divider()
+    st.subheader("🧮 مراجعة أرصدة الحجوزات")
+    st.caption("المدفوع والمتبقي في كل حجز يُحسبان من الدفعات المسجلة له؛ الفحص يقارن المسجل بمجموع الدفعات")
+    if st.button("فحص الأرصدة 🔍"):
+        st.session_state.ledger_check = check_balances(load_data("bookings"), load_data("payments"))
+    if "ledger_check" in st.session_state:
+        mismatches, orphans = st.session_state.ledger_check
+        if mismatches.empty and orphans.empty:
+            st.success("كل الأرصدة مطابقة للدفعات ✅")
+        if not mismatches.empty:
+            st.warning(f"⚠️ {len(mismatches)} حجز رصيده مختلف عن دفعاته")
+            st.dataframe(mismatches, use_container_width=True, hide_index=True)
+            if st.button("تصحيح الأرصدة من الدفعات 🛠️", type="primary"):
+                repair_balances(get_backend(), mismatches)
+                del st.session_state.ledger_check
+                st.success("تم التصحيح ✅")
+                st.rerun()
+        if not orphans.empty:
+            st.warning(f"⚠️ {len(orphans)} دفعة مرتبطة بحجز غير موجود")
+            st.dataframe(get_styled_df(orphans), use_container_width=True, hide_index=True)
+
+    st.divider()
+    st.subheader("🗄️ أرشيف الحجوزات القديمة")
+    st.caption("الأرشفة متوقفة حتى تحدد مدتها هنا؛ بعدها تُنقل الحجوزات المسددة بالكامل التي مرت مناسبتها بالمدة المحددة مع دفعاتها للأرشيف تلقائياً مرة كل يوم، وتبقى ظاهرة في السجل الكامل للعميلة والفستان وفي التقرير المالي")
+    archive = get_shared_tables().archive
+    ar1, ar2, ar3 = st.columns(3)
+    ar1.metric("حجوزات مؤرشفة", len(get_shared_tables().archived("bookings")) if archive.version("bookings") else 0)
+    ar2.metric("سنوات الأرشيف", "، ".join(archive.years("bookings")) or "-")
+    new_archive_days = ar3.number_input("الأرشفة بعد (يوم من المناسبة، 0 للإيقاف)", 0, 3650, get_settings().get("archive_after_days"))
+    if st.button("أرشفة الآن 🗄️"):
+        try:
+            get_settings().update(archive_after_days=int(new_archive_days))
+            st.success(f"تم نقل {archive_old(get_backend(), get_shared_tables(), get_settings())} حجز للأرشيف ✅")
+        except StaleWriteError:
+            st.warning("⚠️ تغيرت البيانات أثناء الأرشفة، حاول مرة أخرى")
+
+    st.divider()
+    st.subheader("🗓️ المهام الخلفية")
+    st.caption(f"تعمل داخل التطبيق بدون انتظار أي جلسة؛ الملخص اليومي وتقارير المراجعة تُحفظ في المجلد: {OUTBOX_FOLDER}")
+    scheduler = get_scheduler()
+    st.dataframe(scheduler.status(), use_container_width=True, hide_index=True)
+    jb1, jb2 = st.columns([3, 1])
+    job_name = jb1.selectbox("المهمة", list(scheduler.jobs), format_func=lambda name: scheduler.jobs[name].title, label_visibility="collapsed")
+    if jb2.button("تشغيل الآن ▶️"):
+        scheduler.run_now(job_name)
+        st.toast("بدأ تشغيل المهمة في الخلفية")
+    outbox = os.path.join(get_backend().data_dir, OUTBOX_FOLDER)
+    reports = sorted((name for name in os.listdir(outbox) if name.endswith(".txt")), reverse=True)[:5] if os.path.isdir(outbox) else []
+    for report in reports:
+        st.download_button(f"{report} 📄", lambda path=os.path.join(outbox, report): open(path, "rb").read(), file_name=report, key=f"report_{report}")
+
+    if PERF_KEY and st.query_params.get("perf") == PERF_KEY:
+        render_performance()
+
     st.divider()
     st.subheader("🔔 إعدادات التنبيهات")
-    alert_days = st.slider("عرض تنبيهات المناسبات القادمة خلال (أيام):", 1, 30, 7)
+    new_alert_days = st.slider("عرض تنبيهات المناسبات القادمة خلال (أيام):", 1, 30, alert_days)
+    st.subheader("👗 مدة انشغال الفستان حول المناسبة")
+    bf1, bf2 = st.columns(2)
+    new_before = bf1.number_input("أيام قبل المناسبة (بروفة واستلام)", 0, 30, get_settings().get("dress_buffer_before"))
+    new_after = bf2.number_input("أيام بعد المناسبة (إرجاع وتنظيف)", 0, 30, get_settings().get("dress_buffer_after"))
     if st.button("حفظ الإعدادات"):
+        get_settings().update(alert_days=new_alert_days, dress_buffer_before=int(new_before), dress_buffer_after=int(new_after), archive_after_days=int(new_archive_days))
         st.success("تم حفظ الإعدادات ✅")
+        st.rerun()
+
+
+SECTIONS = {
+    "👥 العملاء": render_customers,
+    "📋 الخدمات": render_services,
+    "👗 الفساتين": render_dresses,
+    "📝 الحجوزات": render_bookings,
+    "💰 المدفوعات": render_payments,
+    "📊 المالية": render_finance,
+    "⚙️ الإعدادات": render_settings,
+}
+section = st.radio("القسم", list(SECTIONS), horizontal=True, key="section", label_visibility="collapsed")
+SECTIONS[section]()
@@ -0,0 +1 @@
+"""طبقة البيانات والخدمات الخاصة بنظام إدارة الأتيليه"""
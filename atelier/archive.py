@@ -0,0 +1,88 @@
+"""أرشيف السجلات القديمة: الحجوزات المسددة التي مرت مناسبتها بمدة تُنقل مع دفعاتها لملفات Parquet مقسمة بالسنة
+
+الجداول اليومية تبقى صغيرة، والأرشيف لا يُقرأ إلا عند طلبه (التقارير وسجل العميلة أو الفستان).
+"""
+import glob
+import os
+import uuid
+
+import pandas as pd
+
+from atelier.schema import parse
+from atelier.storage import TABLES
+
+ARCHIVE_FOLDER = "archive"
+ARCHIVED_TABLES = ["bookings", "payments"]
+
+# الحجز يعتبر مسدداً إذا كان المتبقي أقل من نصف قرش
+SETTLED_TOLERANCE = 0.005
+
+
+class Archive:
+    """مجلد لكل جدول، وداخله مجلد لكل سنة مناسبة (year=2024) فيه أجزاء Parquet لا تتغير بعد كتابتها"""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def _parts(self, table):
+        return sorted(glob.glob(os.path.join(self.folder, table, "year=*", "*.parquet")))
+
+    def version(self, table):
+        """بصمة الأرشيف: أسماء الأجزاء وأحجامها (تتغير فقط عند أرشفة جديدة)"""
+        return tuple((path, os.path.getsize(path)) for path in self._parts(table))
+
+    def years(self, table):
+        return sorted({os.path.basename(os.path.dirname(path)).split("=", 1)[1] for path in self._parts(table)})
+
+    def load(self, table, years=None):
+        """السجلات المؤرشفة كنصوص (مثل ما يُقرأ من التخزين)، لكل السنوات أو لسنوات محددة فقط"""
+        columns = TABLES[table]["columns"]
+        parts = [path for path in self._parts(table)
+                 if years is None or os.path.basename(os.path.dirname(path)).split("=", 1)[1] in years]
+        if not parts: return pd.DataFrame(columns=columns, dtype=str)
+        df = pd.concat([pd.read_parquet(path, columns=columns) for path in parts], ignore_index=True)
+        # نفس السجل قد يؤرشف مرتين إذا انقطعت العملية بعد كتابة الجزء وقبل حذفه من الجدول
+        return df.drop_duplicates(TABLES[table]["key"], keep="last").reset_index(drop=True)
+
+    def write(self, table, df, years):
+        """كتابة أسطر (نصية) في جزء جديد لكل سنة وإرجاع مسارات الأجزاء"""
+        paths = []
+        for year, rows in df.groupby(years.to_numpy(), sort=True):
+            path = os.path.join(self.folder, table, f"year={year}", f"part-{uuid.uuid4().hex[:12]}.parquet")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            rows[TABLES[table]["columns"]].astype(str).to_parquet(tmp_path, index=False, compression="zstd")
+            os.replace(tmp_path, path)
+            paths.append(path)
+        return paths
+
+    def discard(self, paths):
+        for path in paths:
+            if os.path.exists(path): os.remove(path)
+
+
+def archive_settled(backend, archive, older_than):
+    """نقل الحجوزات المسددة التي مناسبتها قبل older_than (ودفعاتها) من الجداول للأرشيف؛ يرجع عدد الحجوزات
+
+    الأجزاء تُكتب أولاً ثم تُحذف الأسطر من الجداول في عملية واحدة مشروطة بعدم تغيرها أثناء الأرشفة؛
+    إذا فشل الحذف تُحذف الأجزاء المكتوبة.
+    """
+    _, raw_bookings, bookings_rev = backend.load_versioned("bookings")
+    _, raw_payments, payments_rev = backend.load_versioned("payments")
+    bookings = parse(raw_bookings, "bookings")
+    cold = (bookings["تاريخ المناسبة"] < pd.Timestamp(older_than)) & (bookings["المتبقي"].abs() < SETTLED_TOLERANCE)
+    if not cold.any(): return 0
+
+    years = bookings.loc[cold, "تاريخ المناسبة"].dt.year.astype(str)
+    booking_years = dict(zip(bookings.loc[cold, "كود الحجز"], years))
+    cold_payments = raw_payments["كود الحجز"].isin(booking_years)
+    paths = archive.write("bookings", raw_bookings[cold], years)
+    paths += archive.write("payments", raw_payments[cold_payments], raw_payments.loc[cold_payments, "كود الحجز"].map(booking_years))
+    try:
+        backend.delete_many({"bookings": raw_bookings.loc[cold, "كود الحجز"].tolist(),
+                             "payments": raw_payments.loc[cold_payments, "كود الدفع"].tolist()},
+                            bases={"bookings": bookings_rev, "payments": payments_rev})
+    except Exception:
+        archive.discard(paths)
+        raise
+    return int(cold.sum())
@@ -0,0 +1,64 @@
+"""تقويم توفر الفساتين: فترة حجز حول كل مناسبة (بروفات/استلام/إرجاع/تنظيف) في فهرس فترات مرتب"""
+import numpy as np
+import pandas as pd
+
+NO_DRESS = "بدون فستان"
+LAUNDRY = "في المغسلة"
+
+
+class DressCalendar:
+    """كل حجز يشغل الفستان من (المناسبة - before) إلى (المناسبة + after)
+
+    كل الفترات بنفس الطول، فترتيبها ببدايتها هو نفسه ترتيبها بنهايتها؛ لذلك يكفي
+    مصفوفة بدايات مرتبة لكل فستان (وواحدة لكل الفساتين) والبحث فيها ثنائياً.
+    """
+
+    def __init__(self, bookings, dresses, before=0, after=0, today=None):
+        self.before = pd.Timedelta(days=before)
+        self.after = pd.Timedelta(days=after)
+        self.length = self.before + self.after
+        self.today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+
+        booked = bookings[(bookings["كود الفستان"] != NO_DRESS) & (bookings["كود الفستان"] != "") & bookings["تاريخ المناسبة"].notna()]
+        starts = (booked["تاريخ المناسبة"] - self.before).to_numpy("datetime64[ns]")
+        codes = booked["كود الفستان"].to_numpy(dtype=object)
+        # الفستان في المغسلة مشغول من اليوم حتى انتهاء مدة التنظيف
+        laundry = dresses.loc[dresses["حالة الفستان"] == LAUNDRY, "كود الفستان"].to_numpy(dtype=object)
+        starts = np.concatenate([starts, np.full(len(laundry), (self.today - self.before).to_datetime64(), dtype="datetime64[ns]")])
+        codes = np.concatenate([codes, laundry])
+
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order]
+        self.codes = codes[order]
+        self.dresses = dresses["كود الفستان"].tolist()
+        self._by_dress = {code: self.starts[positions] for code, positions in pd.Series(self.codes).groupby(self.codes, sort=False).indices.items()}
+
+    @staticmethod
+    def _day(value):
+        return pd.Timestamp(value).normalize().to_datetime64().astype("datetime64[ns]")
+
+    def is_free(self, dress, start, end=None):
+        """هل الفستان متاح طوال الفترة من start إلى end (شاملة الطرفين)؟"""
+        start = self._day(start)
+        end = self._day(end if end is not None else start)
+        starts = self._by_dress.get(dress)
+        if starts is None: return True
+        # أول حجز تنتهي فترته في start أو بعده؛ يتعارض إذا بدأ قبل نهاية الفترة المطلوبة
+        i = starts.searchsorted(start - self.length.to_timedelta64(), side="left")
+        return i == len(starts) or starts[i] > end
+
+    def busy_on(self, day):
+        """الفساتين المشغولة في يوم معين (الفترات التي بدأت خلال آخر length يوماً)"""
+        day = self._day(day)
+        lo = self.starts.searchsorted(day - self.length.to_timedelta64(), side="left")
+        hi = self.starts.searchsorted(day, side="right")
+        return set(self.codes[lo:hi])
+
+    def free_on(self, day):
+        busy = self.busy_on(day)
+        return [code for code in self.dresses if code not in busy]
+
+    def reservations(self, dress):
+        """فترات انشغال فستان واحد مرتبة (من - إلى)"""
+        starts = pd.to_datetime(self._by_dress.get(dress, np.array([], dtype="datetime64[ns]")))
+        return pd.DataFrame({"من": starts.date, "إلى": (starts + self.length).date})
@@ -0,0 +1,193 @@
+"""مخزن النسخ الاحتياطية: لقطات مضغوطة بدون تكرار (Content-Addressed) مع استعادة لأي لحظة"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+
+from atelier.locks import FileLock
+from atelier.metrics import METRICS
+
+# تقطيع المحتوى عند حدود الأسطر بناءً على بصمة السطر نفسه، فتعديل سطر لا يغيّر إلا قطعة واحدة
+CHUNK_MASK = 0x7F          # متوسط 128 سطراً للقطعة
+CHUNK_MIN_LINES = 16
+CHUNK_MAX_LINES = 1024
+
+
+def split_chunks(data):
+    """تقسيم محتوى CSV إلى قطع معرّفة بالمحتوى (Content-Defined Chunking)"""
+    chunks, current = [], []
+    for line in data.splitlines(keepends=True):
+        current.append(line)
+        if len(current) >= CHUNK_MAX_LINES or (len(current) >= CHUNK_MIN_LINES and (zlib.crc32(line) & CHUNK_MASK) == 0):
+            chunks.append(b"".join(current))
+            current = []
+    if current: chunks.append(b"".join(current))
+    return chunks
+
+
+class BackupStore:
+    """كل قطعة تُخزن مرة واحدة مضغوطة باسم بصمتها، وكل نقطة استعادة ملف صغير يسرد قطع الجداول"""
+
+    def __init__(self, folder, keep_points=5000):
+        self.folder = folder
+        self.objects_dir = os.path.join(folder, "objects")
+        self.manifests_dir = os.path.join(folder, "manifests")
+        self.keep_points = keep_points
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        # عدة عمليات قد تكتب في نفس المخزن، فآخر نقطة والعدد يُقرآن من القرص تحت قفل ملف وليس من ذاكرة العملية
+        self._lock = FileLock(os.path.join(folder, "store.lock"))
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _put_chunk(self, chunk):
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                METRICS.count(nbytes=f.write(zlib.compress(chunk, 6)))
+            os.replace(tmp_path, path)
+        return digest
+
+    def _get_chunk(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def points(self):
+        """كل نقاط الاستعادة مرتبة زمنياً (من أسماء الملفات فقط)"""
+        return sorted(name[:-5] for name in os.listdir(self.manifests_dir) if name.endswith(".json"))
+
+    def count(self):
+        return len(self.points())
+
+    def manifest(self, point):
+        with open(os.path.join(self.manifests_dir, f"{point}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def latest(self):
+        points = self.points()
+        return self.manifest(points[-1]) if points else {"tables": {}}
+
+    def create_point(self, changed, load, reason=""):
+        """إنشاء نقطة استعادة؛ الجداول غير المذكورة تُنسخ إشارتها من النقطة السابقة
+
+        الجداول المتغيرة تُقرأ بـ load داخل القفل، فلا تحمل النقطة نسخة أقدم مما في نقطة سبقتها من عملية أخرى.
+        """
+        with self._lock:
+            tables = dict(self.latest()["tables"])
+            for table in changed:
+                df = load(table)
+                data = df.to_csv(index=False).encode("utf-8")
+                tables[table] = {"chunks": [self._put_chunk(c) for c in split_chunks(data)], "rows": len(df)}
+            now = datetime.now()
+            point = now.strftime("%Y%m%dT%H%M%S%f")
+            manifest = {"point": point, "ts": now.isoformat(timespec="seconds"), "reason": reason, "tables": tables}
+            tmp_path = os.path.join(self.manifests_dir, f"{point}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, os.path.join(self.manifests_dir, f"{point}.json"))
+        return point
+
+    def point_at(self, as_of):
+        """آخر نقطة استعادة في لحظة معينة أو قبلها"""
+        key = as_of.strftime("%Y%m%dT%H%M%S%f")
+        candidates = [p for p in self.points() if p <= key]
+        return candidates[-1] if candidates else None
+
+    def restore(self, point, columns_by_table):
+        """إعادة بناء كل الجداول كما كانت في نقطة الاستعادة"""
+        frames = {}
+        for table, info in self.manifest(point)["tables"].items():
+            data = b"".join(self._get_chunk(d) for d in info["chunks"])
+            columns = columns_by_table[table]
+            if not data.strip():
+                frames[table] = pd.DataFrame(columns=columns, dtype=str)
+                continue
+            df = pd.read_csv(BytesIO(data), dtype=str).fillna("")
+            for col in columns:
+                if col not in df.columns: df[col] = ""
+            frames[table] = df[columns]
+        return frames
+
+    def size_bytes(self):
+        total = 0
+        for root, _, files in os.walk(self.folder):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        return total
+
+    def prune(self):
+        """حذف أقدم النقاط الزائدة عن الحد ثم القطع التي لم تعد مستخدمة"""
+        with self._lock:
+            points = self.points()
+            if len(points) <= self.keep_points: return 0
+            for point in points[:-self.keep_points]:
+                os.remove(os.path.join(self.manifests_dir, f"{point}.json"))
+            used = set()
+            for point in points[-self.keep_points:]:
+                for info in self.manifest(point)["tables"].values():
+                    used.update(info["chunks"])
+            removed = 0
+            for root, _, files in os.walk(self.objects_dir):
+                for name in files:
+                    if name not in used:
+                        os.remove(os.path.join(root, name))
+                        removed += 1
+            return removed
+
+
+class BackupWorker:
+    """التقاط نقاط الاستعادة في الخلفية بعد التعديلات، مع دمج التعديلات المتتالية في نقطة واحدة"""
+
+    def __init__(self, store, load_table, all_tables, delay=1.0):
+        self.store = store
+        self.load_table = load_table
+        self.all_tables = list(all_tables)
+        self.delay = delay
+        self._dirty = set()
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def notify(self, table):
+        with self._cond:
+            self._dirty.add(table)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty:
+                    self._cond.wait()
+            time.sleep(self.delay)
+            with self._cond:
+                tables, self._dirty = self._dirty, set()
+                self._busy = True
+            if not self.store.latest()["tables"]:
+                tables = set(self.all_tables)  # أول نقطة تحتوي كل الجداول
+            try:
+                with METRICS.timed("backup.point"):
+                    self.store.create_point(sorted(tables), self.load_table, reason="، ".join(sorted(tables)))
+            except Exception:
+                # إعادة المحاولة مع التعديل التالي أو بعد المهلة
+                with self._cond:
+                    self._dirty |= tables
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def flush(self, timeout=30):
+        """انتظار حفظ نقطة الاستعادة للتعديلات المعلقة (قبل خروج أداة سطر الأوامر مثلاً)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._dirty and not self._busy, timeout)
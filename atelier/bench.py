@@ -0,0 +1,173 @@
+"""قياس أداء المسارات الساخنة على بيانات تجريبية بعدة أحجام، وحفظ النتائج JSON لمقارنة الإصدارات
+
+    python -m atelier.bench [--sizes 1000 10000 50000] [--storage csv] [--repeat 3] [--output bench.json] [--compare قديم.json]
+
+كل عملية تُقاس بنفس الدوال التي يستدعيها app.py (الذاكرة المشتركة والتخزين والتصدير)، ولكل حجم مجلد مؤقت جديد.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from atelier.cache import SharedTables
+from atelier.export import Exporter
+from atelier.schema import parse, serialize
+from atelier.storage import TABLES, make_backend
+from atelier.synthetic import generate, write
+
+SIZES = [1000, 10000, 50000]
+REPEAT = 3
+SEARCH_QUERIES = ["منى", "كريم السيد", "0101"]
+UPCOMING_DAYS = 7
+
+
+def _measure(operation, setup=None, repeat=REPEAT):
+    """أزمنة التشغيل بالثواني؛ التهيئة (setup) قبل كل تشغيل لا تدخل في القياس، وناتجها يُمرر للعملية"""
+    times = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        operation(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _cold(backend):
+    """ذاكرة مشتركة جديدة، كأول جلسة بعد تشغيل التطبيق"""
+    return lambda: SharedTables(backend)
+
+
+def _warm(backend, prepare):
+    """ذاكرة مشتركة جاهزة، ثم تعديل حجز واحد فيُقاس التحديث الجزئي فقط"""
+    tables = SharedTables(backend)
+    prepare(tables)
+    counter = iter(range(10**9))
+
+    def setup():
+        backend.update("bookings", tables.get("bookings")["كود الحجز"].iloc[0], {"ملاحظات الحجز": f"قياس {next(counter)}"})
+        return tables
+    return setup
+
+
+def _upcoming(tables):
+    # نفس استعلام get_upcoming_events في app.py
+    today = pd.Timestamp.today().normalize()
+    return tables.between("bookings", "تاريخ المناسبة", today.to_datetime64(), (today + pd.Timedelta(days=UPCOMING_DAYS)).to_datetime64())
+
+
+def cases(backend, folder):
+    """العمليات المقاسة: الاسم ← (التشغيل، التهيئة)"""
+    bookings = parse(backend.load("bookings"), "bookings")
+    exporter = Exporter(os.path.join(folder, "exports"))
+
+    def load_all(tables):
+        for table in TABLES:
+            tables.view(table)
+
+    def search(tables):
+        for query in SEARCH_QUERIES:
+            tables.search("customers", query)
+
+    def finance(tables):
+        totals = tables.finance()
+        totals.summary()
+        for name in ["القسم", "الشهر", "الخدمة", "الفستان"]:
+            totals.by(name)
+
+    def export(tables):
+        exporter.start({table: tables.view(table) for table in TABLES}, "xlsx", "bench", background=False)
+
+    return {
+        "load_data": (load_all, _cold(backend)),
+        "load_data_after_write": (lambda tables: tables.view("bookings"), _warm(backend, load_all)),
+        "save_data_bookings": (lambda: backend.save("bookings", serialize(bookings, "bookings")), None),
+        "insert_booking": (lambda: backend.insert("bookings", {**serialize(bookings.iloc[[0]], "bookings").iloc[0].to_dict(), "كود الحجز": f"BENCH-{time.perf_counter_ns()}"}), None),
+        "get_upcoming_events": (_upcoming, _warm(backend, lambda tables: tables.sorted_index("bookings", "تاريخ المناسبة"))),
+        "booking_labels": (lambda tables: tables.options("bookings"), _cold(backend)),
+        "booking_labels_after_write": (lambda tables: tables.options("bookings"), _warm(backend, lambda tables: tables.options("bookings"))),
+        "customer_search_index": (lambda tables: tables.search_index("customers"), _cold(backend)),
+        "customer_search": (search, _warm(backend, lambda tables: tables.search_index("customers"))),
+        "finance": (finance, _cold(backend)),
+        "finance_after_write": (finance, _warm(backend, finance)),
+        "export_xlsx": (export, _warm(backend, load_all)),
+    }
+
+
+def run(sizes=SIZES, storage=None, repeat=REPEAT, seed=0, only=None, log=print):
+    """تشغيل كل القياسات لكل حجم وإرجاع النتائج كقاموس قابل للحفظ JSON"""
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            backend = make_backend(storage, data_dir=folder)
+            frames = generate(size, seed)
+            write(backend, frames)
+            backend.flush_backups()
+            for name, (operation, setup) in cases(backend, folder).items():
+                if only and name not in only: continue
+                times = _measure(operation, setup, repeat)
+                results.append({"size": size, "name": name, "min": min(times), "median": statistics.median(times), "runs": times})
+                log(f"{size:>8} {name:<28} {min(times) * 1000:>10.1f} ms")
+            backend.flush_backups()
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "version": _version(),
+        "storage": backend.name,
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "results": results,
+    }
+
+
+def _version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(old, new, threshold=1.2):
+    """مقارنة أقل زمن لكل (حجم، عملية) بين نتيجتين؛ يرجع الأسطر مع النسبة والأبطأ بأكثر من threshold"""
+    before = {(r["size"], r["name"]): r["min"] for r in old["results"]}
+    rows = [(r["size"], r["name"], before[(r["size"], r["name"])], r["min"], r["min"] / before[(r["size"], r["name"])])
+            for r in new["results"] if before.get((r["size"], r["name"]))]
+    return rows, [row for row in rows if row[4] > threshold]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m atelier.bench", description="قياس أداء الأتيليه على بيانات تجريبية")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="أعداد الحجوزات")
+    parser.add_argument("--storage", choices=["csv", "sqlite"], help="محرك التخزين (افتراضياً حسب ATELIER_STORAGE)")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="قياس عمليات محددة فقط")
+    parser.add_argument("--output", default="bench.json", help="ملف النتائج")
+    parser.add_argument("--compare", help="نتائج سابقة للمقارنة")
+    parser.add_argument("--threshold", type=float, default=1.2, help="نسبة البطء التي تعتبر تراجعاً")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.storage, args.repeat, args.seed, args.only)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+    print(f"النتائج في {args.output}")
+    if not args.compare: return 0
+
+    with open(args.compare, encoding="utf-8") as f:
+        rows, slower = compare(json.load(f), results, args.threshold)
+    for size, name, old, new, ratio in rows:
+        print(f"{size:>8} {name:<28} {old * 1000:>10.1f} → {new * 1000:>10.1f} ms  ×{ratio:.2f}{'  ⚠️' if ratio > args.threshold else ''}")
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
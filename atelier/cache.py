@@ -0,0 +1,313 @@
+"""ذاكرة مشتركة للجداول على مستوى العملية، تُحدَّث فقط عند تغير نسخة البيانات في التخزين"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from atelier.archive import ARCHIVE_FOLDER, ARCHIVED_TABLES, Archive
+from atelier.finance import CombinedTotals, FinanceTotals
+from atelier.ledger import Ledger
+from atelier.options import build_labels, touched_keys
+from atelier.relations import VIEW_SOURCES, build_index, build_sort_order, build_sorted_index, related_view
+from atelier.schema import append_row, parse, set_values
+from atelier.search import SearchIndex
+from atelier.snapshot import SNAPSHOT_FOLDER, TypedSnapshots
+from atelier.storage import TABLES
+
+# الجلسات تستلم نفس الجدول المشترك، و Copy-on-Write يضمن أن أي تعديل عليه ينسخه بدلاً من تغيير الأصل
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def apply_entries(df, table, entries):
+    """تطبيق عمليات سجل التخزين على نسخة من الجدول المكتوب بأنواعه"""
+    key_col = TABLES[table]["key"]
+    df = df.copy()
+    for entry in entries:
+        op = entry.get("op")
+        if op == "insert":
+            df = append_row(df, table, entry["row"])
+        elif op == "update":
+            set_values(df, table, df[key_col] == entry["key"], entry["changes"])
+        elif op == "delete":
+            df = df[df[key_col] != entry["key"]].reset_index(drop=True)
+    return df
+
+
+class SharedTables:
+    """جدول واحد لكل ملف مشترك بين كل جلسات المتصفح، مع تحميل تزايدي عند تغيّر النسخة"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._views = {}
+        self._indexes = {}
+        self._changes = {}
+        self._labels = {}
+        self._search = {}
+        self._finance = {}
+        self._ledger = {}
+        self._archived = {}
+        self.archive = Archive(os.path.join(backend.data_dir, ARCHIVE_FOLDER))
+        self.snapshots = TypedSnapshots(os.path.join(backend.data_dir, SNAPSHOT_FOLDER), backend)
+
+    def get(self, table):
+        version = self.backend.version(table)
+        with self._lock:
+            cached = self._entries.get(table)
+            if cached and cached[0] == version:
+                return cached[1]
+            changes = self.backend.changes_since(table, cached[0]) if cached else None
+            snapshot = None
+            if changes is not None:
+                version, entries, revision = changes
+                df = apply_entries(cached[1], table, entries)
+                # آخر انتقال تزايدي للجدول، لتحديث قوائم الاختيار بالأسطر المتغيرة فقط
+                self._changes[table] = (cached[1], df, entries)
+            else:
+                # من اللقطة الثنائية إذا كانت لنفس النسخة، وإلا من التخزين مع تحويل الأنواع
+                snapshot = self.snapshots.load(table, version)
+                if snapshot is not None:
+                    df, revision = snapshot
+                else:
+                    version, raw, revision = self.backend.load_versioned(table)
+                    df = parse(raw, table)
+                self._changes.pop(table, None)
+            self._entries[table] = (version, df, revision)
+        if changes is not None or snapshot is None:
+            self.snapshots.schedule(table, version, revision, df)
+        return df
+
+    def revision(self, table):
+        """رقم مراجعة الجدول الموجود في الذاكرة (أساس فحص تعارض الكتابة)"""
+        self.get(table)
+        return self._entries[table][2]
+
+    def view(self, table):
+        """الجدول للعرض: الجداول المرتبطة تُضاف لها أسماء العروسة والعريس من جدول العملاء"""
+        df = self.get(table)
+        if table not in VIEW_SOURCES: return df
+        sources = {name: self.get(name) for name in VIEW_SOURCES[table]}
+        key = (df, *sources.values())
+        with self._lock:
+            cached = self._views.get(table)
+            if cached and all(a is b for a, b in zip(cached[0], key)):
+                return cached[1]
+        view = related_view(table, df, sources)
+        with self._lock:
+            self._views[table] = (key, view)
+        return view
+
+    def derived(self, name, tables, build, params=()):
+        """بنية مشتقة من عروض جداول (فهرس أو تقويم مثلاً) تُبنى مرة واحدة لكل نسخة من بياناتها ومعاملاتها"""
+        frames = tuple(self.view(table) for table in tables)
+        with self._lock:
+            cached = self._indexes.get(name)
+            if cached and cached[1] == params and all(a is b for a, b in zip(cached[0], frames)):
+                return frames, cached[2]
+        value = build(*frames)
+        with self._lock:
+            self._indexes[name] = (frames, params, value)
+        return frames, value
+
+    def _derived(self, table, name, build):
+        (df,), value = self.derived((table, name), [table], build)
+        return df, value
+
+    def index(self, table, col):
+        """فهرس Hash لعمود في عرض الجدول"""
+        return self._derived(table, col, lambda df: build_index(df, col))
+
+    def sorted_index(self, table, col):
+        """فهرس مرتب لعمود في عرض الجدول (لاستعلامات المدى)"""
+        return self._derived(table, ("sorted", col), lambda df: build_sorted_index(df, col))
+
+    def range_positions(self, table, col, start, end):
+        """مواقع الأسطر التي تقع قيمة العمود فيها بين start و end (شاملة الطرفين) مرتبة تصاعدياً"""
+        df, (order, values) = self.sorted_index(table, col)
+        lo = values.searchsorted(start, side="left")
+        hi = values.searchsorted(end, side="right")
+        return df, order[lo:hi]
+
+    def between(self, table, col, start, end):
+        """الأسطر التي تقع قيمة العمود فيها بين start و end (شاملة الطرفين) مرتبة تصاعدياً"""
+        df, positions = self.range_positions(table, col, start, end)
+        return df.iloc[positions]
+
+    def sort_order(self, table, col=None):
+        """ترتيب أسطر العرض حسب عمود (أو ترتيب الإدخال) ورتبة كل سطر فيه، لترتيب أي مجموعة أسطر بسرعة"""
+        return self._derived(table, ("order", col), lambda df: build_sort_order(df, col))
+
+    def lookup(self, table, col, value):
+        """الأسطر التي يساوي فيها العمود القيمة المطلوبة، بدون مسح الجدول كاملاً"""
+        df, index = self.index(table, col)
+        positions = index.get(value)
+        return df.iloc[positions] if positions is not None else df.iloc[0:0]
+
+    def _maintained(self, store, table, build, refresh, related=True):
+        """بنية تُبنى من عرض الجدول مرة، ثم تُحدَّث بالأسطر المتغيرة فقط إذا تقدم الجدول نفسه بعمليات السجل
+
+        related=False للبنى التي لا تحتاج أعمدة الجداول المرتبطة، فلا يعيد تعديلُ تلك الجداول بناءها.
+        """
+        key_col = TABLES[table]["key"]
+        sources = tuple(self.get(name) for name in [table] + (VIEW_SOURCES.get(table, []) if related else []))
+        view = self.view(table) if related else sources[0]
+        with self._lock:
+            cached = store.get(table)
+            change = self._changes.get(table)
+        if cached and all(a is b for a, b in zip(cached[0], sources)):
+            return cached[1]
+        if (cached and change and change[0] is cached[0][0] and change[1] is sources[0]
+                and all(a is b for a, b in zip(cached[0][1:], sources[1:]))):
+            keys = touched_keys(change[2], key_col)
+            rows = view[view[key_col].isin(keys)]
+            value = refresh(cached[1], rows, keys - set(rows[key_col]))
+        else:
+            value = build(view)
+        with self._lock:
+            store[table] = (sources, value)
+        return value
+
+    def options(self, table):
+        """قاموس كود ← نص العرض لقوائم الاختيار، يُبنى مرة ثم تُحدَّث فيه الأسطر المتغيرة فقط"""
+        key_col = TABLES[table]["key"]
+
+        def refresh(labels, rows, removed):
+            labels = dict(labels)
+            for key in removed:
+                labels.pop(key, None)
+            labels.update(build_labels(table, rows, key_col))
+            return labels
+        return self._maintained(self._labels, table, lambda view: build_labels(table, view, key_col), refresh)
+
+    def search_index(self, table):
+        key_col = TABLES[table]["key"]
+
+        def build(view):
+            index = SearchIndex(table)
+            index.add(view, key_col)
+            return index
+
+        def refresh(index, rows, removed):
+            index.remove(removed)
+            index.add(rows, key_col)
+            return index
+        return self._maintained(self._search, table, build, refresh)
+
+    def finance(self):
+        """المجاميع المالية للحجوزات، تُبنى مرة ثم تُحدَّث بفروق الحجوزات المتغيرة فقط (ومنها تعديلات الدفع)"""
+        key_col = TABLES["bookings"]["key"]
+
+        def build(df):
+            totals = FinanceTotals(key_col)
+            totals.add(df)
+            return totals
+
+        def refresh(totals, rows, removed):
+            totals.remove(removed)
+            totals.add(rows)
+            return totals
+        return self._maintained(self._finance, "bookings", build, refresh, related=False)
+
+    def ledger(self):
+        """مجموع دفعات كل حجز، يُحدَّث بالدفعات المتغيرة فقط"""
+        def build(df):
+            ledger = Ledger()
+            ledger.add(df)
+            return ledger
+
+        def refresh(ledger, rows, removed):
+            ledger.remove(removed)
+            ledger.add(rows)
+            return ledger
+        return self._maintained(self._ledger, "payments", build, refresh, related=False)
+
+    def archived(self, table):
+        """السجلات المؤرشفة بأنواعها وبأعمدة العرض؛ تُقرأ من Parquet عند أول طلب، ثم فقط إذا أضيفت أجزاء جديدة"""
+        version = self.archive.version(table)
+        sources = {name: self.get(name) for name in VIEW_SOURCES.get(table, [])}
+        if table == "payments":
+            # الدفعات تُؤرشف مع حجوزاتها، فكود العميل يؤخذ من الحجوزات المؤرشفة
+            sources["bookings"] = self.archived("bookings")
+        with self._lock:
+            cached = self._archived.get(table)
+            if cached and cached[0] == version and all(a is b for a, b in zip(cached[1], sources.values())):
+                return cached[2]
+            loaded = cached[3] if cached and cached[0] == version else None
+        if loaded is None:
+            loaded = parse(self.archive.load(table), table)
+        df = related_view(table, loaded, sources) if sources else loaded
+        with self._lock:
+            self._archived[table] = (version, tuple(sources.values()), df, loaded)
+        return df
+
+    def archived_only(self, table):
+        """السجلات المؤرشفة التي ليست في الجدول الحالي (الاستعادة من نقطة قبل الأرشفة تعيد بعضها إليه)"""
+        cold = self.archived(table)
+        key_col = TABLES[table]["key"]
+        return cold[~cold[key_col].isin(self.get(table)[key_col])]
+
+    def history(self, table, col, value):
+        """الأسطر المطابقة في الجدول وفي أرشيفه معاً (السجل الكامل لعميلة أو فستان)"""
+        hot = self.lookup(table, col, value)
+        if table not in ARCHIVED_TABLES or not self.archive.version(table): return hot
+        cold = self.archived(table)
+        with self._lock:
+            cached = self._indexes.get(("archived", table, col))
+        if not cached or cached[0] is not cold:
+            cached = (cold, build_index(cold, col))
+            with self._lock:
+                self._indexes[("archived", table, col)] = cached
+        positions = cached[1].get(value)
+        if positions is None: return hot
+        cold_rows = cold.iloc[positions]
+        cold_rows = cold_rows[~cold_rows[TABLES[table]["key"]].isin(hot[TABLES[table]["key"]])]
+        return pd.concat([cold_rows, hot], ignore_index=True) if len(hot) else cold_rows.reset_index(drop=True)
+
+    def finance_with_archive(self):
+        """المجاميع المالية للحجوزات الحالية والمؤرشفة معاً (مجاميع الأرشيف تُبنى مرة لكل نسخة منه)"""
+        hot = self.finance()
+        if not self.archive.version("bookings"): return hot
+        cold, bookings = self.archived("bookings"), self.get("bookings")
+        key_col = TABLES["bookings"]["key"]
+        with self._lock:
+            cached = self._indexes.get(("archived", "finance"))
+        if cached and cached[0] is cold and cached[1] is bookings:
+            return CombinedTotals([hot, cached[3]])
+        # الحجوزات المؤرشفة التي عادت للجدول الحالي (بالاستعادة) تُحسب مرة واحدة مع الحالية، كما في history
+        overlap = frozenset(cold[key_col][cold[key_col].isin(bookings[key_col])])
+        if cached and cached[0] is cold and cached[2] == overlap:
+            totals = cached[3]
+        else:
+            totals = FinanceTotals(key_col)
+            totals.add(cold[~cold[key_col].isin(overlap)] if overlap else cold)
+        with self._lock:
+            self._indexes[("archived", "finance")] = (cold, bookings, overlap, totals)
+        return CombinedTotals([hot, totals])
+
+    def search_positions(self, table, query, limit=None):
+        """مواقع أسطر العرض المطابقة لنص البحث مرتبة بالأقرب (None إذا كان النص أقصر من أن يُبحث به)"""
+        keys = self.search_index(table).search(query, limit)
+        df, index = self.index(table, TABLES[table]["key"])
+        if keys is None: return df, None
+        return df, np.array([pos for key in keys for pos in index.get(key, ())], dtype=np.intp)
+
+    def search(self, table, query, limit=None):
+        """أسطر عرض الجدول المطابقة لنص البحث مرتبة بالأقرب، أو None إذا كان النص أقصر من أن يُبحث به"""
+        df, positions = self.search_positions(table, query, limit)
+        return None if positions is None else df.iloc[positions]
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table: self._entries.pop(table, None)
+            else: self._entries.clear()
+            self._views.clear()
+            self._indexes.clear()
+            self._changes.clear()
+            self._labels.clear()
+            self._search.clear()
+            self._finance.clear()
+            self._ledger.clear()
+            self._archived.clear()
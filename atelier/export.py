@@ -0,0 +1,173 @@
+"""تصدير الجداول إلى ملف على القرص دفعة بدفعة (Excel بوضع الكتابة فقط، أو CSV أو Parquet مضغوطة)
+
+الملف يُكتب في الخلفية، والذاكرة لا تحمل منه إلا دفعة أسطر واحدة مهما كبرت الجداول.
+"""
+import os
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import datetime
+from io import TextIOWrapper
+
+import pandas as pd
+
+EXPORT_FOLDER = "exports"
+CHUNK_ROWS = 5000
+KEEP_FILES = 10
+
+TABLE_TITLES = {"customers": "العملاء", "services": "الخدمات", "dresses": "الفساتين", "bookings": "الحجوزات", "payments": "المدفوعات"}
+
+# عمود التاريخ الذي تُطبق عليه فترة التصدير في كل جدول
+DATE_COLUMNS = {"customers": "تاريخ التسجيل", "dresses": "تاريخ الشراء", "bookings": "تاريخ الحجز", "payments": "التاريخ"}
+
+FORMATS = {"xlsx": "Excel (.xlsx)", "csv": "CSV مضغوطة (.zip)", "parquet": "Parquet مضغوطة (.zip)"}
+EXTENSIONS = {"xlsx": ".xlsx", "csv": ".csv.zip", "parquet": ".parquet.zip"}
+
+
+def filter_frames(frames, start=None, end=None, department=None):
+    """تطبيق فترة التاريخ والقسم على الجداول (المدفوعات تتبع قسم حجزها)"""
+    result = {}
+    for table, df in frames.items():
+        mask = pd.Series(True, index=df.index)
+        date_col = DATE_COLUMNS.get(table)
+        if date_col and start is not None:
+            mask &= df[date_col] >= pd.Timestamp(start)
+        if date_col and end is not None:
+            mask &= df[date_col] < pd.Timestamp(end) + pd.Timedelta(days=1)
+        if department:
+            if "القسم" in df.columns:
+                mask &= df["القسم"] == department
+            elif table == "payments" and "bookings" in frames:
+                bookings = frames["bookings"]
+                mask &= df["كود الحجز"].isin(bookings.loc[bookings["القسم"] == department, "كود الحجز"])
+        result[table] = df if mask.all() else df[mask]
+    return result
+
+
+def _chunks(df):
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS]
+
+
+def _cell_rows(chunk):
+    """أسطر الدفعة كقيم بايثون يفهمها openpyxl (التواريخ بدون وقت، والفارغ None)"""
+    columns = []
+    for col in chunk.columns:
+        series = chunk[col]
+        if series.dtype.kind == "M":
+            columns.append([None if pd.isna(v) else v.date() for v in series])
+        else:
+            columns.append([None if pd.isna(v) else v for v in series.astype(object)])
+    return zip(*columns)
+
+
+def _write_xlsx(path, frames, progress):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for table, df in frames.items():
+        sheet = workbook.create_sheet(TABLE_TITLES.get(table, table))
+        sheet.append(list(df.columns))
+        for chunk in _chunks(df):
+            for row in _cell_rows(chunk):
+                sheet.append(row)
+            progress(len(chunk))
+    workbook.save(path)
+
+
+def _write_csv(path, frames, progress):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for table, df in frames.items():
+            with archive.open(f"{table}.csv", "w") as member, TextIOWrapper(member, encoding="utf-8-sig", newline="") as out:
+                df.iloc[0:0].to_csv(out, index=False)
+                for chunk in _chunks(df):
+                    chunk.to_csv(out, index=False, header=False, date_format="%Y-%m-%d")
+                    progress(len(chunk))
+
+
+def _write_parquet(path, frames, progress):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive, tempfile.TemporaryDirectory() as tmp_dir:
+        for table, df in frames.items():
+            part = os.path.join(tmp_dir, f"{table}.parquet")
+            schema = pa.Schema.from_pandas(df.iloc[0:0], preserve_index=False)
+            with pq.ParquetWriter(part, schema, compression="zstd") as writer:
+                for chunk in _chunks(df):
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    progress(len(chunk))
+            archive.write(part, os.path.basename(part))
+
+
+WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}
+
+
+class ExportJob:
+    """تصدير واحد يعمل في خيط خلفي، مع عدد الأسطر المكتوبة لعرض التقدم"""
+
+    def __init__(self, folder, frames, fmt, label):
+        self.id = uuid.uuid4().hex[:8]
+        self.fmt = fmt
+        self.label = label
+        self.total = sum(len(df) for df in frames.values())
+        self.written = 0
+        self.error = None
+        self.done = False
+        self.file_name = f"atelier_{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{EXTENSIONS[fmt]}"
+        self.path = os.path.join(folder, self.file_name)
+        self._frames = frames
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def progress(self):
+        return 1.0 if self.done or not self.total else min(1.0, self.written / self.total)
+
+    def _advance(self, rows):
+        self.written += rows
+
+    def _run(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            WRITERS[self.fmt](tmp_path, self._frames, self._advance)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.error = str(e)
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+        finally:
+            self._frames = None
+            self.done = True
+
+
+class Exporter:
+    """قائمة عمليات التصدير المشتركة بين الجلسات، مع حذف الملفات القديمة"""
+
+    def __init__(self, folder=EXPORT_FOLDER):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self.jobs = []
+
+    def start(self, frames, fmt="xlsx", label="data", background=True):
+        """بدء تصدير الجداول المعطاة (جدول ← DataFrame) وإرجاع العملية"""
+        job = ExportJob(self.folder, frames, fmt, label)
+        with self._lock:
+            self.jobs.append(job)
+            finished = [j for j in self.jobs if j.done]
+            for old in finished[:max(0, len(finished) - KEEP_FILES)]:
+                self.jobs.remove(old)
+                if os.path.exists(old.path): os.remove(old.path)
+        if background:
+            job._thread.start()
+        else:
+            job._run()
+        return job
+
+    def running(self):
+        with self._lock:
+            return [job for job in self.jobs if not job.done]
+
+    def recent(self):
+        with self._lock:
+            return list(reversed(self.jobs))
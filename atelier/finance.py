@@ -0,0 +1,168 @@
+"""مجاميع مالية مخزنة للحجوزات (الإجمالي وحسب القسم والشهر والخدمة والفستان) تُحدَّث بفروق الأسطر المتغيرة
+
+بجانب كل تجميع منفرد يُحفظ مكعب (شهر × قسم × خدمة × فستان)، فتُحسب فلاتر لوحة المالية من خلاياه بدل أسطر الحجوزات.
+"""
+import threading
+
+import pandas as pd
+
+PRICE = "السعر المتفق"
+PAID = "المدفوع"
+
+# اسم التجميع ← دالة تستخرج قيمته لكل سطر حجز
+GROUPS = {
+    "القسم": lambda df: df["القسم"],
+    "الشهر": lambda df: df["تاريخ الحجز"].dt.strftime("%Y-%m"),
+    "الخدمة": lambda df: df["الخدمة"],
+    "الفستان": lambda df: df["كود الفستان"],
+}
+
+
+COUNT = "عدد الحجوزات"
+
+
+def _cell(values):
+    """مفتاح خلية المكعب (القيمة الفارغة نص فارغ حتى تبقى قابلة للمقارنة)"""
+    return tuple("" if value is None else value for value in values)
+
+
+def _values(series):
+    """قيم التجميع كنصوص، و None للقيم الفارغة (لا تدخل في أي مجموعة)"""
+    return [value if isinstance(value, str) and value else None for value in series.tolist()]
+
+
+class FinanceTotals:
+    """لكل حجز مساهمته (السعر والمدفوع ومجموعاته)، فيكفي عند التعديل طرح المساهمة القديمة وإضافة الجديدة"""
+
+    def __init__(self, key_col):
+        self.key_col = key_col
+        self._lock = threading.Lock()
+        self._rows = {}                  # كود الحجز ← (السعر، المدفوع، قيم التجميعات)
+        self.sales = 0.0
+        self.collected = 0.0
+        self.groups = {name: {} for name in GROUPS}   # تجميع ← قيمة ← [عدد، مبيعات، محصل]
+        self.cells = {}                                 # (شهر، قسم، خدمة، فستان) ← [عدد، مبيعات، محصل]
+
+    def _apply(self, row, sign):
+        price, paid, values = row
+        self.sales += sign * price
+        self.collected += sign * paid
+        for name, value in zip(GROUPS, values):
+            if value is None: continue
+            totals = self.groups[name].setdefault(value, [0, 0.0, 0.0])
+            totals[0] += sign
+            totals[1] += sign * price
+            totals[2] += sign * paid
+            if totals[0] == 0: del self.groups[name][value]
+        cell = _cell(values)
+        totals = self.cells.setdefault(cell, [0, 0.0, 0.0])
+        totals[0] += sign
+        totals[1] += sign * price
+        totals[2] += sign * paid
+        if totals[0] == 0: del self.cells[cell]
+
+    def _remove(self, key):
+        row = self._rows.pop(key, None)
+        if row: self._apply(row, -1)
+
+    def add(self, df):
+        """إضافة أسطر حجوزات (جديدة أو معدلة) بعد طرح مساهمتها السابقة؛ مجاميع المجموعات تُحسب بـ groupby"""
+        keys = df[self.key_col].tolist()
+        amounts = pd.DataFrame({"count": 1, "sales": df[PRICE].fillna(0.0), "collected": df[PAID].fillna(0.0)})
+        values = {name: _values(getter(df)) for name, getter in GROUPS.items()}
+        sums = {name: amounts.groupby(pd.Series(column, index=df.index, dtype=object)).sum() for name, column in values.items()}
+        cell_sums = amounts.groupby([pd.Series(_cell(column), index=df.index, dtype=object) for column in values.values()]).sum()
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+            self._rows.update(zip(keys, zip(amounts["sales"].tolist(), amounts["collected"].tolist(), zip(*values.values()))))
+            self.sales += float(amounts["sales"].sum())
+            self.collected += float(amounts["collected"].sum())
+            for name, group_sums in sums.items():
+                groups = self.groups[name]
+                for value, count, sales, collected in group_sums.itertuples():
+                    totals = groups.setdefault(value, [0, 0.0, 0.0])
+                    totals[0] += int(count)
+                    totals[1] += float(sales)
+                    totals[2] += float(collected)
+            for cell, count, sales, collected in cell_sums.itertuples():
+                totals = self.cells.setdefault(cell, [0, 0.0, 0.0])
+                totals[0] += int(count)
+                totals[1] += float(sales)
+                totals[2] += float(collected)
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def summary(self):
+        """الإجماليات: المبيعات والمحصل والمتبقي وعدد الحجوزات"""
+        with self._lock:
+            return {"sales": self.sales, "collected": self.collected,
+                    "remaining": self.sales - self.collected, "count": len(self._rows)}
+
+    def by(self, name):
+        """جدول المجموع حسب تجميع معين (مرتب بقيمة التجميع)"""
+        with self._lock:
+            items = sorted(self.groups[name].items())
+        return pd.DataFrame([(value, count, sales, collected, sales - collected) for value, (count, sales, collected) in items],
+                            columns=[name, COUNT, PRICE, PAID, "المتبقي"])
+
+    def months(self):
+        with self._lock:
+            return sorted(self.groups["الشهر"])
+
+    def cube(self):
+        """خلايا المكعب كجدول: أعمدة التجميعات ثم العدد والمبيعات والمحصل"""
+        with self._lock:
+            items = list(self.cells.items())
+        return pd.DataFrame([cell + tuple(totals) for cell, totals in items], columns=list(GROUPS) + [COUNT, PRICE, PAID])
+
+
+class CombinedTotals:
+    """نفس واجهة FinanceTotals لمجموع عدة مخازن (الحجوزات الحالية والمؤرشفة)"""
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def summary(self):
+        summaries = [part.summary() for part in self.parts]
+        return {name: sum(s[name] for s in summaries) for name in summaries[0]}
+
+    def by(self, name):
+        frames = [part.by(name) for part in self.parts]
+        return pd.concat(frames, ignore_index=True).groupby(name, sort=True, as_index=False).sum()
+
+    def months(self):
+        return sorted(set().union(*(part.months() for part in self.parts)))
+
+    def cube(self):
+        return pd.concat([part.cube() for part in self.parts], ignore_index=True)
+
+
+class CubeTotals:
+    """نفس الواجهة لخلايا مكعب مفلترة (نتيجة filtered)"""
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    def summary(self):
+        sales, collected = float(self.cells[PRICE].sum()), float(self.cells[PAID].sum())
+        return {"sales": sales, "collected": collected, "remaining": sales - collected, "count": int(self.cells[COUNT].sum())}
+
+    def by(self, name):
+        cells = self.cells[self.cells[name] != ""]
+        df = cells.groupby(name, sort=True, as_index=False)[[COUNT, PRICE, PAID]].sum()
+        df["المتبقي"] = df[PRICE] - df[PAID]
+        return df
+
+
+def filtered(totals, start=None, end=None, department=None):
+    """المجاميع لحجوزات فترة أشهر (YYYY-MM شاملة الطرفين) و/أو قسم واحد، محسوبة من خلايا المكعب"""
+    cells = totals.cube()
+    mask = pd.Series(True, index=cells.index)
+    if start: mask &= cells["الشهر"] >= start
+    if end: mask &= cells["الشهر"] <= end
+    if department: mask &= cells["القسم"] == department
+    return CubeTotals(cells[mask])
@@ -0,0 +1,88 @@
+"""صور الفساتين: حفظ الصورة مرة واحدة باسم من محتواها بعد ضبط اتجاهها وحجمها، ومصغرات محفوظة بعدة مقاسات
+
+PIL يُستورد عند أول حفظ أو توليد مصغر فقط، فعرض المصغرات الموجودة لا يحمّله.
+"""
+import base64
+import hashlib
+import os
+from functools import lru_cache
+from io import BytesIO
+
+MAX_SIDE = 1600         # أكبر طول لضلع الصورة الأصلية المحفوظة
+QUALITY = 85
+THUMB_SIZES = (96, 320)  # مصغر جدول الكتالوج، ومصغر العرض عند اختيار فستان
+THUMBS_FOLDER = "thumbs"
+
+
+def _normalized(image):
+    """الصورة بالاتجاه الصحيح (حسب بيانات الكاميرا EXIF) وبصيغة RGB تصلح لـ JPEG"""
+    from PIL import Image, ImageOps
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+class ImageStore:
+    """مجلد الصور: الأصل باسم بصمة محتواه (فالصورة المكررة تُحفظ مرة)، والمصغرات في مجلد فرعي لكل مقاس"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def save(self, file):
+        """حفظ صورة مرفوعة وإرجاع مسارها؛ لا يُعاد الحفظ إذا كانت نفس الصورة موجودة"""
+        data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+        path = os.path.join(self.folder, hashlib.sha256(data).hexdigest()[:20] + ".jpg")
+        if not os.path.exists(path):
+            from PIL import Image
+
+            with Image.open(BytesIO(data)) as image:
+                image = _normalized(image)
+                image.thumbnail((MAX_SIDE, MAX_SIDE))
+                tmp_path = path + ".tmp"
+                image.save(tmp_path, "JPEG", quality=QUALITY, optimize=True)
+                os.replace(tmp_path, path)
+        for size in THUMB_SIZES:
+            self.thumbnail(path, size)
+        return path
+
+    def _thumb_path(self, path, size):
+        return os.path.join(self.folder, THUMBS_FOLDER, str(size), os.path.splitext(os.path.basename(path))[0] + ".jpg")
+
+    def thumbnail(self, path, size):
+        """مسار المصغر (يُولَّد أول مرة فقط، أو إذا تغيرت الصورة الأصلية بعده)؛ None إذا لم توجد الصورة"""
+        if not path or not os.path.exists(path): return None
+        thumb = self._thumb_path(path, size)
+        if not os.path.exists(thumb) or os.path.getmtime(thumb) < os.path.getmtime(path):
+            os.makedirs(os.path.dirname(thumb), exist_ok=True)
+            from PIL import Image
+
+            with Image.open(path) as image:
+                image = _normalized(image)
+                image.thumbnail((size, size))
+                tmp_path = thumb + ".tmp"
+                image.save(tmp_path, "JPEG", quality=QUALITY)
+                os.replace(tmp_path, thumb)
+        return thumb
+
+    def data_uri(self, path, size=THUMB_SIZES[0]):
+        """المصغر كـ data URI لعمود الصور في الجدول (يُرسل مع الصفحة الظاهرة فقط)"""
+        if not path or not os.path.exists(path): return None
+        return _data_uri(self.thumbnail(path, size), os.path.getmtime(path))
+
+    def remove(self, path):
+        """حذف الصورة الأصلية ومصغراتها"""
+        for file in [path] + [self._thumb_path(path, size) for size in THUMB_SIZES]:
+            if file and os.path.exists(file):
+                os.remove(file)
+
+
+@lru_cache(maxsize=1024)
+def _data_uri(thumb, mtime):
+    with open(thumb, "rb") as f:
+        return "data:image/jpeg;base64," + base64.b64encode(f.read()).decode("ascii")
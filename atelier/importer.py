@@ -0,0 +1,244 @@
+"""استيراد العملاء والخدمات والفساتين والحجوزات بالجملة من Excel أو CSV
+
+الملف يُقرأ على دفعات، وكل الأسطر تُفحص معاً بعمليات أعمدة بنفس قواعد نماذج الإدخال،
+ثم تُحفظ الأسطر السليمة كلها في عملية كتابة واحدة (ونقطة استعادة واحدة).
+
+من سطر الأوامر:
+    python -m atelier.importer bookings bookings.xlsx [--data-dir مجلد البيانات] [--dry-run]
+"""
+import argparse
+import sys
+from datetime import date, datetime
+
+import pandas as pd
+
+from atelier.availability import NO_DRESS, DressCalendar
+from atelier.schema import DEPARTMENTS, DRESS_STATUSES, DRESS_TYPES, parse, serialize
+from atelier.sequences import ID_PREFIXES, max_code_number
+from atelier.settings import Settings
+from atelier.storage import TABLES, make_backend
+
+IMPORT_TABLES = ["customers", "services", "dresses", "bookings"]
+CHUNK_ROWS = 5000
+
+# الأعمدة التي يجب وجودها في الملف (والباقي اختياري يُملأ بقيمته الافتراضية)
+REQUIRED = {
+    "customers": ["اسم العروسه", "اسم العريس", "العنوان", "تليفون 1"],
+    "services": ["اسم الخدمة", "القسم"],
+    "dresses": ["وصف الفستان"],
+    "bookings": ["كود العميل", "القسم", "الخدمة", "تاريخ المناسبة", "السعر المتفق"],
+}
+
+
+def _cell_text(value):
+    if value is None: return ""
+    if isinstance(value, datetime): return value.date().isoformat()
+    if isinstance(value, date): return value.isoformat()
+    if isinstance(value, float) and value.is_integer(): return str(int(value))
+    return str(value)
+
+
+def _excel_chunks(source):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_cell_text(v).strip() for v in next(rows, ())]
+        chunk = []
+        for row in rows:
+            values = [_cell_text(v) for v in row[:len(header)]]
+            if not any(values): continue
+            chunk.append(values + [""] * (len(header) - len(values)))
+            if len(chunk) == CHUNK_ROWS:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk: yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def read_rows(source, name=None):
+    """قراءة ملف Excel أو CSV (مسار أو ملف مرفوع) على دفعات، كل القيم نصوص بدون مسافات زائدة"""
+    name = str(name or getattr(source, "name", source))
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        chunks = _excel_chunks(source)
+    else:
+        chunks = pd.read_csv(source, dtype=str, keep_default_na=False, encoding="utf-8-sig", chunksize=CHUNK_ROWS)
+    frames = [chunk.rename(columns=lambda c: str(c).strip()) for chunk in chunks]
+    if not frames: return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True).fillna("").astype(str)
+    return df.apply(lambda col: col.str.strip())
+
+
+class _Problems:
+    """أخطاء الأسطر: كل قاعدة قناع (Mask) على كل الأسطر ورسالة"""
+
+    def __init__(self, index):
+        self.index = index
+        self.bad = pd.Series(False, index=index)
+        self.parts = []
+
+    def add(self, mask, message):
+        mask = pd.Series(mask, index=self.index).fillna(False).astype(bool)
+        if mask.any():
+            self.parts.append(pd.DataFrame({"السطر": self.index[mask] + 2, "الخطأ": message}))
+            self.bad |= mask
+
+    def report(self):
+        if not self.parts: return pd.DataFrame(columns=["السطر", "الخطأ"])
+        return pd.concat(self.parts, ignore_index=True).sort_values("السطر", kind="stable").reset_index(drop=True)
+
+
+def _with_defaults(rows, table, defaults):
+    """جدول بأعمدة الجدول المطلوبة فقط، مع القيم الافتراضية للخانات الفارغة"""
+    df = pd.DataFrame(index=rows.index)
+    for col in TABLES[table]["columns"]:
+        values = rows[col] if col in rows.columns else pd.Series("", index=rows.index)
+        default = defaults.get(col)
+        df[col] = values.where(values != "", default) if default is not None else values
+    return df
+
+
+def _check_codes(problems, codes, existing):
+    """الكود اختياري (يُولَّد تلقائياً)، وإذا كُتب يجب ألا يتكرر في الملف أو في الجدول"""
+    given = codes != ""
+    problems.add(given & codes.isin(existing), "الكود موجود مسبقاً")
+    problems.add(given & codes.duplicated(keep=False), "الكود مكرر في الملف")
+
+
+def _customers(raw, typed, problems, tables, settings):
+    for col in REQUIRED["customers"]:
+        problems.add(raw[col] == "", f"خانة {col} مطلوبة")
+    phone = raw["تليفون 1"]
+    problems.add((phone != "") & ~phone.str.fullmatch(r"\d{10,}"), "رقم الهاتف يجب أن يحتوي على أرقام فقط (10 أرقام على الأقل)")
+
+
+def _services(raw, typed, problems, tables, settings):
+    problems.add(raw["اسم الخدمة"] == "", "اسم الخدمة مطلوب")
+    problems.add(~raw["القسم"].isin(DEPARTMENTS), "القسم غير معروف")
+    price = pd.to_numeric(raw["السعر المقترح"], errors="coerce")
+    problems.add(price.isna() | (price < 0), "السعر المقترح غير صحيح")
+
+
+def _dresses(raw, typed, problems, tables, settings):
+    problems.add(raw["وصف الفستان"] == "", "وصف الفستان مطلوب")
+    problems.add(~raw["نوع الفستان"].isin(DRESS_TYPES), "نوع الفستان غير معروف")
+    problems.add(~raw["حالة الفستان"].isin(DRESS_STATUSES), "حالة الفستان غير معروفة")
+
+
+def _bookings(raw, typed, problems, tables, settings):
+    customers, services, dresses = tables("customers"), tables("services"), tables("dresses")
+    problems.add(~raw["كود العميل"].isin(customers["كود العميل"]), "كود العميل غير موجود")
+    problems.add(~raw["القسم"].isin(DEPARTMENTS), "القسم غير معروف")
+    offered = set(zip(services["القسم"].astype(str), services["اسم الخدمة"]))
+    problems.add(~pd.Series(list(zip(raw["القسم"], raw["الخدمة"])), index=raw.index).isin(offered), "الخدمة غير موجودة في هذا القسم")
+    problems.add(raw["تاريخ المناسبة"] == "", "تاريخ المناسبة مطلوب")
+
+    price = pd.to_numeric(raw["السعر المتفق"], errors="coerce")
+    paid = pd.to_numeric(raw["المدفوع"], errors="coerce")
+    problems.add(price.isna() | (price <= 0), "السعر المتفق غير صحيح")
+    problems.add(paid.isna() | (paid < 0), "العربون غير صحيح")
+    problems.add(paid > price, "العربون أكبر من السعر")
+
+    dressed = raw["كود الفستان"] != NO_DRESS
+    problems.add(dressed & ~raw["كود الفستان"].isin(dresses["كود الفستان"]), "كود الفستان غير موجود")
+    problems.add(dressed & (raw["القسم"] != "الفساتين"), "الفستان يُختار لحجوزات قسم الفساتين فقط")
+
+    # تعارض الفساتين: فترات الحجوزات الموجودة والمستوردة معاً مرتبة لكل فستان؛ كل فترتين
+    # متتاليتين بداياتهما أقرب من طول الفترة متداخلتان (كل الفترات بنفس الطول)
+    calendar = DressCalendar(tables("bookings"), dresses, settings.get("dress_buffer_before"), settings.get("dress_buffer_after"))
+    new = typed[dressed & typed["تاريخ المناسبة"].notna()]
+    intervals = pd.DataFrame({
+        "code": list(calendar.codes) + new["كود الفستان"].tolist(),
+        "start": list(calendar.starts) + list((new["تاريخ المناسبة"] - calendar.before).to_numpy("datetime64[ns]")),
+        "row": [-1] * len(calendar.codes) + new.index.tolist(),
+    }).sort_values(["code", "start"], kind="stable")
+    overlaps = intervals.groupby("code", sort=False)["start"].diff() <= calendar.length
+    overlaps |= overlaps.shift(-1, fill_value=False)
+    conflicted = intervals.loc[overlaps & (intervals["row"] >= 0), "row"]
+    problems.add(raw.index.isin(conflicted), "الفستان محجوز أو غير جاهز في فترة هذه المناسبة")
+
+
+def _defaults(table):
+    today = date.today().isoformat()
+    return {
+        "customers": {"تاريخ التسجيل": today},
+        "services": {"السعر المقترح": "0"},
+        "dresses": {"نوع الفستان": "غير محدد", "حالة الفستان": DRESS_STATUSES[0], "تاريخ الشراء": today},
+        "bookings": {"تاريخ الحجز": today, "المدفوع": "0", "كود الفستان": NO_DRESS},
+    }[table]
+
+
+VALIDATORS = {"customers": _customers, "services": _services, "dresses": _dresses, "bookings": _bookings}
+
+
+def validate(table, rows, tables, settings):
+    """فحص كل الأسطر؛ يرجع (الأسطر السليمة بأنواعها، جدول الأخطاء: رقم السطر في الملف والرسالة)
+
+    tables(name) يرجع الجدول الحالي بأنواعه للتحقق من الأكواد والتعارضات.
+    """
+    missing = [col for col in REQUIRED[table] if col not in rows.columns]
+    if missing:
+        raise ValueError(f"أعمدة ناقصة في الملف: {'، '.join(missing)}")
+    raw = _with_defaults(rows, table, _defaults(table))
+    typed = parse(raw, table)
+    problems = _Problems(raw.index)
+    for col, kind in (("تاريخ التسجيل", "date"), ("تاريخ الشراء", "date"), ("تاريخ الحجز", "date"), ("تاريخ المناسبة", "date")):
+        if col in raw.columns:
+            problems.add((raw[col] != "") & typed[col].isna(), f"{col} غير صحيح")
+    key_col = TABLES[table]["key"]
+    _check_codes(problems, raw[key_col], tables(table)[key_col])
+    VALIDATORS[table](raw, typed, problems, tables, settings)
+    return typed[~problems.bad], problems.report()
+
+
+def commit(backend, table, valid):
+    """حفظ الأسطر السليمة في عملية كتابة واحدة: أكواد محجوزة كتلة واحدة، وعربون كل حجز دفعةً مرتبطة به"""
+    df = valid.copy()
+    key_col = TABLES[table]["key"]
+    missing = (df[key_col] == "") | df[key_col].isna()
+    # الأكواد المكتوبة في الملف تُقدِّم العدّاد أولاً، فلا تأخذ الأسطر بدون كود نفس أرقامها (ولا الإضافات اللاحقة)
+    backend.bump_to(table, max_code_number(table, df.loc[~missing, key_col].astype(str)))
+    numbers = pd.Series(backend.reserve_numbers(table, int(missing.sum())), index=df.index[missing]).astype(str)
+    prefixes = df.loc[missing, "القسم"].astype(str).str[0:2].str.upper() if table == "bookings" else ID_PREFIXES[table]
+    df.loc[missing, key_col] = prefixes + "-" + numbers
+    frames = {table: df}
+    if table == "bookings":
+        df["المتبقي"] = df["السعر المتفق"] - df["المدفوع"]
+        deposits = df[df["المدفوع"] > 0]
+        payment_numbers = pd.Series(backend.reserve_numbers("payments", len(deposits)), index=deposits.index).astype(str)
+        frames["payments"] = pd.DataFrame({
+            "كود الدفع": ID_PREFIXES["payments"] + "-" + payment_numbers,
+            "التاريخ": deposits["تاريخ الحجز"], "كود الحجز": deposits["كود الحجز"],
+            "القيمة المدفوعة": deposits["المدفوع"], "المتبقي بعد الدفعة": deposits["المتبقي"], "ملاحظات الدفع": "عربون حجز",
+        })
+    backend.insert_many({name: serialize(frame, name) for name, frame in frames.items()})
+    return len(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m atelier.importer", description="استيراد بيانات بالجملة من Excel أو CSV")
+    parser.add_argument("table", choices=IMPORT_TABLES)
+    parser.add_argument("file")
+    parser.add_argument("--data-dir", default=".", help="مجلد البيانات")
+    parser.add_argument("--dry-run", action="store_true", help="فحص الملف فقط بدون حفظ")
+    args = parser.parse_args(argv)
+
+    backend = make_backend(data_dir=args.data_dir)
+    try:
+        rows = read_rows(args.file)
+        valid, errors = validate(args.table, rows, lambda name: parse(backend.load(name), name), Settings(args.data_dir))
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return 2
+    print(f"أسطر الملف: {len(rows)} — سليمة: {len(valid)} — بها أخطاء: {errors['السطر'].nunique()}")
+    if len(errors): print(errors.to_string(index=False))
+    if not args.dry_run and len(valid):
+        print(f"تم استيراد {commit(backend, args.table, valid)} سطر")
+        backend.flush_backups()
+    return 1 if len(errors) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""مهام الصيانة الدورية للتطبيق: الملخص اليومي، ومراجعة سلامة البيانات، والأرشفة، ودمج السجلات، وتنظيف النسخ، وتسخين الذاكرة
+
+كل مهمة تستخدم نفس واجهات التخزين التي تستخدمها الجلسات (بأقفالها وفحص التعارض)، فتعمل أثناء تعديل المستخدمين بأمان.
+"""
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+from atelier.archive import archive_settled
+from atelier.ledger import TOLERANCE, check
+from atelier.storage import TABLES
+
+OUTBOX_FOLDER = "outbox"
+DIGEST_COLUMNS = ["كود الحجز", "اسم العروسه", "اسم العريس", "تليفون 1", "الخدمة", "تاريخ المناسبة", "المتبقي"]
+
+
+def _write_report(folder, name, text):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _with_phones(tables, rows):
+    phones = tables.get("customers").set_index("كود العميل")["تليفون 1"]
+    rows = rows.assign(**{"تليفون 1": rows["كود العميل"].map(phones).fillna("")})
+    return rows.assign(**{"تاريخ المناسبة": rows["تاريخ المناسبة"].dt.strftime("%Y-%m-%d")})[DIGEST_COLUMNS]
+
+
+def write_digest(tables, settings, folder=OUTBOX_FOLDER, today=None):
+    """ملف ملخص اليوم (مرة واحدة لكل يوم): المناسبات القادمة خلال مدة التنبيه، والحجوزات التي مرت مناسبتها ولم تُسدد"""
+    today = pd.Timestamp(today or date.today()).normalize()
+    name = f"digest-{today:%Y-%m-%d}.txt"
+    if os.path.exists(os.path.join(folder, name)): return "ملخص اليوم موجود بالفعل"
+    days = settings.get("alert_days")
+    upcoming = tables.between("bookings", "تاريخ المناسبة", today.to_datetime64(), (today + pd.Timedelta(days=days)).to_datetime64())
+    bookings = tables.view("bookings")
+    overdue = bookings[(bookings["تاريخ المناسبة"] < today) & (bookings["المتبقي"] > TOLERANCE)].sort_values("تاريخ المناسبة")
+    lines = [f"ملخص يوم {today:%Y-%m-%d}", "", f"المناسبات خلال {days} أيام: {len(upcoming)}"]
+    if len(upcoming): lines.append(_with_phones(tables, upcoming).to_string(index=False))
+    lines += ["", f"حجوزات مرت مناسبتها ولم تُسدد: {len(overdue)} (الإجمالي {overdue['المتبقي'].sum():,.0f} ج.م)"]
+    if len(overdue): lines.append(_with_phones(tables, overdue).to_string(index=False))
+    _write_report(folder, name, "\n".join(lines) + "\n")
+    return f"{len(upcoming)} مناسبة قادمة، {len(overdue)} حجز متأخر السداد"
+
+
+def check_integrity(tables, folder=OUTBOX_FOLDER, today=None):
+    """مراجعة الأرصدة مقابل الدفعات والروابط المكسورة؛ يُكتب تقرير فقط إذا وُجدت مشاكل"""
+    bookings, payments = tables.get("bookings"), tables.get("payments")
+    mismatches, orphans = check(bookings, payments)
+    lost_customers = bookings[~bookings["كود العميل"].isin(tables.get("customers")["كود العميل"])]
+    problems = len(mismatches) + len(orphans) + len(lost_customers)
+    if not problems: return "لا توجد مشاكل"
+    sections = [("حجوزات رصيدها مختلف عن دفعاتها", mismatches), ("دفعات بدون حجز", orphans), ("حجوزات لعميلة غير موجودة", lost_customers)]
+    text = "\n\n".join(f"{title}: {len(df)}\n{df.to_string(index=False)}" for title, df in sections if len(df))
+    _write_report(folder, f"integrity-{today or date.today():%Y-%m-%d}.txt", text + "\n")
+    return f"{problems} مشكلة (التفاصيل في {OUTBOX_FOLDER})"
+
+
+def archive_old(backend, tables, settings, today=None):
+    """أرشفة الحجوزات المسددة الأقدم من المدة المحددة في الإعدادات؛ يرجع عدد الحجوزات المنقولة"""
+    days = settings.get("archive_after_days")
+    if not days: return 0
+    return archive_settled(backend, tables.archive, (today or date.today()) - timedelta(days=days))
+
+
+def compact_journals(backend):
+    """دمج سجلات العمليات في ملفات CSV (لا شيء لمحرك SQLite)"""
+    if not hasattr(backend, "journal"): return "لا يلزم"
+    tables = [table for table in TABLES if backend.journal.size(table)]
+    for table in tables:
+        backend.compact(table)
+    return f"{len(tables)} جدول"
+
+
+def prune_backups(backend):
+    return f"حُذفت {backend.backups.prune()} قطعة"
+
+
+def warm_up(tables):
+    """تحميل الجداول والفهارس والمجاميع في الذاكرة المشتركة، فتجدها أول جلسة بعد أي تغيير جاهزة"""
+    for table in TABLES:
+        tables.view(table)
+    for table in ["customers", "dresses", "bookings", "payments"]:
+        tables.options(table)
+    for table in ["customers", "bookings", "payments"]:
+        tables.search_index(table)
+    tables.sorted_index("bookings", "تاريخ المناسبة")
+    tables.finance()
+    tables.ledger()
+
+
+def register(scheduler, backend, tables, settings, outbox=None):
+    """تسجيل مهام التطبيق في المُجدول"""
+    outbox = outbox or os.path.join(backend.data_dir, OUTBOX_FOLDER)
+    scheduler.add("warm_up", lambda: warm_up(tables), "تسخين الذاكرة المشتركة", every=300, at_start=True)
+    scheduler.add("digest", lambda: write_digest(tables, settings, outbox), "الملخص اليومي", at="08:00", at_start=True)
+    scheduler.add("integrity", lambda: check_integrity(tables, outbox), "مراجعة سلامة البيانات", at="04:00")
+    scheduler.add("archive", lambda: f"{archive_old(backend, tables, settings)} حجز" if settings.get("archive_after_days") else "الأرشفة متوقفة",
+                  "أرشفة الحجوزات القديمة", at="03:00", at_start=True)
+    scheduler.add("compact", lambda: compact_journals(backend), "دمج سجلات العمليات", at="03:30")
+    scheduler.add("prune_backups", lambda: prune_backups(backend), "تنظيف النسخ الاحتياطية", every=3600)
+    return scheduler
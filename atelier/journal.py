@@ -0,0 +1,175 @@
+"""سجل العمليات الإلحاقي (Write-Ahead Journal) لجداول CSV"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from atelier.metrics import METRICS
+
+JOURNAL_FOLDER = "journal"
+
+
+def file_sha256(path):
+    """بصمة SHA-256 لمحتوى ملف"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Journal:
+    """ملف JSON-Lines لكل جدول تُلحق به عمليات insert/update/delete سطراً بسطر"""
+
+    def __init__(self, folder=JOURNAL_FOLDER):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, table):
+        return os.path.join(self.folder, f"{table}.jsonl")
+
+    def marker_path(self, table):
+        return os.path.join(self.folder, f"{table}.compact")
+
+    def lock_path(self, table):
+        return os.path.join(self.folder, f"{table}.lock")
+
+    def revision_path(self, table):
+        return os.path.join(self.folder, f"{table}.rev")
+
+    def snapshot_revision(self, table):
+        """رقم نسخة الجدول المدمجة في ملف اللقطة"""
+        try:
+            with open(self.revision_path(table), encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def set_snapshot_revision(self, table, revision):
+        tmp_path = self.revision_path(table) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(revision))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.revision_path(table))
+
+    def last_entry(self, table):
+        """آخر عملية مكتملة في السجل (بالقراءة من نهاية الملف فقط)"""
+        path = self.path(table)
+        if not os.path.exists(path): return None
+        with open(path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            block = 4096
+            while True:
+                start = max(0, end - block)
+                f.seek(start)
+                data = f.read(end - start)
+                lines = data[:data.rfind(b"\n") + 1].splitlines()
+                if len(lines) >= 2 or start == 0:
+                    return json.loads(lines[-1]) if lines else None
+                block *= 4
+
+    def revision(self, table):
+        """رقم النسخة الحالي: من آخر عملية في السجل أو من اللقطة إذا كان السجل فارغاً"""
+        last = self.last_entry(table)
+        return last.get("rev", 0) if last else self.snapshot_revision(table)
+
+    def size(self, table):
+        path = self.path(table)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def append(self, table, entry):
+        """إلحاق عملية واحدة مع fsync وإرجاع حجم السجل بعد الإضافة"""
+        entry = {"ts": datetime.now().isoformat(timespec="seconds"), **entry}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with open(self.path(table), "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            METRICS.count(rows=1, nbytes=len(line.encode("utf-8")))
+            return f.tell()
+
+    def read(self, table):
+        """قراءة كل العمليات المسجلة (مع تجاهل سطر أخير مقطوع بسبب انقطاع مفاجئ)"""
+        path = self.path(table)
+        if not os.path.exists(path): return []
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return entries
+
+    def read_from(self, table, start):
+        """قراءة العمليات المكتملة بدءاً من موضع معين، مع إرجاع موضع النهاية المقروء فعلاً"""
+        path = self.path(table)
+        if not os.path.exists(path): return [], start
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        return [json.loads(line) for line in complete.decode("utf-8").splitlines()], start + len(complete)
+
+    def clear(self, table):
+        path = self.path(table)
+        if os.path.exists(path): os.remove(path)
+
+    def begin_compaction(self, table, snapshot_sha, revision):
+        """تسجيل بصمة اللقطة الجديدة ورقم نسختها قبل استبدال القديمة (للاسترداد بعد الانهيار)"""
+        with open(self.marker_path(table), "w", encoding="utf-8") as f:
+            json.dump({"sha": snapshot_sha, "rev": revision}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def end_compaction(self, table, revision):
+        self.set_snapshot_revision(table, revision)
+        self.clear(table)
+        os.remove(self.marker_path(table))
+
+    def recover(self, table, snapshot_path):
+        """إكمال أو إلغاء ضغط توقف في المنتصف"""
+        marker = self.marker_path(table)
+        if not os.path.exists(marker): return
+        with open(marker, encoding="utf-8") as f:
+            expected = json.load(f)
+        if os.path.exists(snapshot_path) and file_sha256(snapshot_path) == expected["sha"]:
+            # اللقطة الجديدة استُبدلت بالفعل، والسجل أصبح مدمجاً فيها
+            self.end_compaction(table, expected["rev"])
+        else:
+            os.remove(marker)
+
+
+def replay(df, entries, key_col):
+    """تطبيق العمليات المسجلة بالترتيب على آخر لقطة للجدول"""
+    if not entries: return df
+    columns = list(df.columns)
+    rows = df.values.tolist()
+    positions = {}
+    for i, row in enumerate(rows):
+        positions.setdefault(row[columns.index(key_col)], []).append(i)
+    key_pos = columns.index(key_col)
+
+    for entry in entries:
+        op = entry.get("op")
+        if op == "insert":
+            row = entry["row"]
+            rows.append([str(row.get(col, "")) for col in columns])
+            positions.setdefault(rows[-1][key_pos], []).append(len(rows) - 1)
+        elif op == "update":
+            for i in list(positions.get(entry["key"], [])):
+                if rows[i] is None: continue
+                old_key = rows[i][key_pos]
+                for col, value in entry["changes"].items():
+                    if col in columns: rows[i][columns.index(col)] = str(value)
+                if rows[i][key_pos] != old_key:
+                    positions[old_key].remove(i)
+                    positions.setdefault(rows[i][key_pos], []).append(i)
+        elif op == "delete":
+            for i in positions.pop(entry["key"], []):
+                rows[i] = None
+
+    return pd.DataFrame([r for r in rows if r is not None], columns=columns, dtype=str)
@@ -0,0 +1,112 @@
+"""دفتر المدفوعات: الدفعات هي مصدر الحقيقة، والمدفوع والمتبقي في كل حجز مشتقان منها
+
+فحص وإصلاح الأرصدة من سطر الأوامر:
+    python -m atelier.ledger [مجلد البيانات] [--repair]
+"""
+import argparse
+import sys
+import threading
+
+import pandas as pd
+
+from atelier.schema import parse, storage_value
+from atelier.storage import make_backend
+
+BOOKING = "كود الحجز"
+PAYMENT = "كود الدفع"
+AMOUNT = "القيمة المدفوعة"
+PRICE = "السعر المتفق"
+PAID = "المدفوع"
+REMAINING = "المتبقي"
+
+# فرق أقل من نصف قرش يعتبر تقريباً للأرقام العشرية وليس خطأ في الرصيد
+TOLERANCE = 0.005
+
+
+def paid_by_booking(payments):
+    """مجموع دفعات كل حجز في مرور واحد"""
+    return payments.groupby(BOOKING, sort=False)[AMOUNT].sum()
+
+
+def balances(bookings, payments):
+    """المدفوع والمتبقي لكل حجز محسوبان من الدفعات (بنفس ترتيب أسطر الحجوزات)"""
+    paid = bookings[BOOKING].map(paid_by_booking(payments)).astype("float64").fillna(0.0)
+    return pd.DataFrame({BOOKING: bookings[BOOKING], PAID: paid, REMAINING: bookings[PRICE] - paid})
+
+
+def check(bookings, payments):
+    """الحجوزات التي يختلف رصيدها المخزن عن الدفتر، والدفعات المرتبطة بحجز غير موجود"""
+    expected = balances(bookings, payments)
+    wrong = ((bookings[PAID] - expected[PAID]).abs() > TOLERANCE) | ((bookings[REMAINING] - expected[REMAINING]).abs() > TOLERANCE)
+    mismatches = pd.DataFrame({
+        BOOKING: bookings[BOOKING],
+        "المدفوع المسجل": bookings[PAID], "المدفوع من الدفعات": expected[PAID],
+        "المتبقي المسجل": bookings[REMAINING], "المتبقي الصحيح": expected[REMAINING],
+    })[wrong].reset_index(drop=True)
+    orphans = payments[~payments[BOOKING].isin(bookings[BOOKING])].reset_index(drop=True)
+    return mismatches, orphans
+
+
+def repair(backend, mismatches):
+    """تصحيح أرصدة الحجوزات المختلفة (تعديل سطر لكل حجز، فيبقى في سجل العمليات ونقاط الاستعادة)"""
+    for code, paid, remaining in zip(mismatches[BOOKING], mismatches["المدفوع من الدفعات"], mismatches["المتبقي الصحيح"]):
+        backend.update("bookings", code, {PAID: storage_value("bookings", PAID, paid),
+                                          REMAINING: storage_value("bookings", REMAINING, remaining)})
+    return len(mismatches)
+
+
+class Ledger:
+    """مجموع دفعات كل حجز، يُبنى مرة ثم يُحدَّث بالدفعات المضافة أو المعدلة أو المحذوفة فقط"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._payments = {}    # كود الدفع ← (كود الحجز، القيمة)
+        self._paid = {}        # كود الحجز ← مجموع دفعاته
+
+    def _remove(self, key):
+        booking, amount = self._payments.pop(key, (None, 0.0))
+        if booking is not None: self._paid[booking] -= amount
+
+    def add(self, df):
+        keys = df[PAYMENT].tolist()
+        amounts = df[AMOUNT].fillna(0.0)
+        sums = amounts.groupby(df[BOOKING], sort=False).sum()
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+            self._payments.update(zip(keys, zip(df[BOOKING].tolist(), amounts.tolist())))
+            for booking, amount in sums.items():
+                self._paid[booking] = self._paid.get(booking, 0.0) + float(amount)
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def paid(self, booking):
+        """مجموع دفعات حجز واحد"""
+        with self._lock:
+            return self._paid.get(booking, 0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m atelier.ledger", description="فحص أرصدة الحجوزات مقابل الدفعات")
+    parser.add_argument("data_dir", nargs="?", default=".", help="مجلد البيانات")
+    parser.add_argument("--repair", action="store_true", help="تصحيح الأرصدة المختلفة")
+    args = parser.parse_args(argv)
+
+    backend = make_backend(data_dir=args.data_dir)
+    mismatches, orphans = check(parse(backend.load("bookings"), "bookings"), parse(backend.load("payments"), "payments"))
+    print(f"حجوزات رصيدها مختلف: {len(mismatches)}")
+    if len(mismatches): print(mismatches.to_string(index=False))
+    print(f"دفعات بدون حجز: {len(orphans)}")
+    if len(orphans): print(orphans[[PAYMENT, BOOKING, AMOUNT]].to_string(index=False))
+    if args.repair and len(mismatches):
+        print(f"تم تصحيح {repair(backend, mismatches)} حجز")
+        backend.flush_backups()
+        mismatches = mismatches.iloc[0:0]
+    return 1 if len(mismatches) or len(orphans) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""أقفال ملفات بين العمليات (عدة Workers/جلسات على نفس مجلد البيانات)"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # ويندوز
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """قفل حصري على ملف، مع قفل خيوط داخل نفس العملية لأن أقفال الملفات لا تمنع خيوط العملية نفسها"""
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            if self._fd is not None: os.close(self._fd)
+            self._fd = None
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            os.close(self._fd)
+        finally:
+            self._fd = None
+            self._thread_lock.release()
@@ -0,0 +1,112 @@
+"""قياس زمن وذاكرة العمليات الساخنة (التخزين والنسخ الاحتياطي وأقسام الصفحة والرسوم) داخل العملية نفسها
+
+آخر WINDOW قياس لكل عملية تبقى في الذاكرة لحساب p50 و p95، ويمكن إلحاق كل قياس بملف JSONL
+بتحديد مساره في المتغير ATELIER_METRICS_LOG.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+WINDOW = 500
+
+
+def process_memory():
+    """الذاكرة المستخدمة حالياً في العملية بالبايت (None إذا لم تتوفر على النظام)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Metrics:
+    """سجل القياسات: اسم العملية ← آخر WINDOW قياس (الزمن، الأسطر، البايتات المكتوبة، فرق الذاكرة)"""
+
+    def __init__(self, window=WINDOW, log_path=None):
+        self.window = window
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._active = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._active, "stack"): self._active.stack = []
+        return self._active.stack
+
+    @contextmanager
+    def timed(self, name):
+        """قياس الكتلة؛ الأسطر والبايتات تضاف بـ count من أي دالة تُستدعى داخلها في نفس الخيط"""
+        sample = {"rows": 0, "bytes": 0}
+        stack = self._stack()
+        stack.append(sample)
+        memory = process_memory()
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            after = process_memory()
+            self.record(name, seconds, sample["rows"], sample["bytes"], after - memory if memory is not None and after is not None else None)
+
+    def count(self, rows=0, nbytes=0):
+        """إضافة أسطر وبايتات لكل القياسات المفتوحة في هذا الخيط (العملية وما يحتويها)"""
+        for sample in self._stack():
+            sample["rows"] += rows
+            sample["bytes"] += nbytes
+
+    def record(self, name, seconds, rows=0, nbytes=0, memory=None):
+        with self._lock:
+            if name not in self._samples: self._samples[name] = deque(maxlen=self.window)
+            self._samples[name].append((seconds, rows, nbytes, memory))
+            if self.log_path:
+                line = {"ts": datetime.now().isoformat(timespec="milliseconds"), "name": name, "ms": round(seconds * 1000, 3),
+                        "rows": rows, "bytes": nbytes, "memory": memory}
+                try:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(line, ensure_ascii=False) + "\n")
+                except OSError:
+                    self.log_path = None  # لا يُوقف التطبيق بسبب ملف القياس
+
+    def summary(self):
+        """جدول لكل عملية: عدد القياسات و p50 و p95 والأقصى بالملي ثانية، ومتوسط الأسطر والبايتات وفرق الذاكرة"""
+        with self._lock:
+            samples = {name: np.array([(s, r, b, np.nan if m is None else m) for s, r, b, m in values], dtype="float64")
+                       for name, values in self._samples.items()}
+        rows = []
+        for name, values in sorted(samples.items()):
+            ms = values[:, 0] * 1000
+            rows.append({
+                "العملية": name, "المرات": len(values),
+                "p50 (ms)": np.percentile(ms, 50), "p95 (ms)": np.percentile(ms, 95), "الأقصى (ms)": ms.max(),
+                "الأسطر": values[:, 1].mean(), "البايتات المكتوبة": values[:, 2].mean(),
+                "فرق الذاكرة (MB)": np.nanmean(values[:, 3]) / 2**20 if not np.isnan(values[:, 3]).all() else np.nan,
+            })
+        return pd.DataFrame(rows, columns=["العملية", "المرات", "p50 (ms)", "p95 (ms)", "الأقصى (ms)", "الأسطر", "البايتات المكتوبة", "فرق الذاكرة (MB)"])
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+# سجل واحد للعملية كلها (مثل get_backend في التطبيق)، فتظهر قياسات خيوط الخلفية مع قياسات الجلسات
+METRICS = Metrics(log_path=os.environ.get("ATELIER_METRICS_LOG"))
+
+
+def measured(name):
+    """مُزخرف يقيس كل استدعاء للدالة باسم name"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,48 @@
+"""نصوص قوائم الاختيار (كود ← نص العرض) مبنية بعمليات أعمدة كاملة بدل المرور على الأسطر"""
+from atelier.schema import DATE_FORMAT
+
+
+def _text(series):
+    return series.astype(str).where(series.notna(), "")
+
+
+def _customers(df):
+    return _text(df["اسم العروسه"]) + " | " + _text(df["اسم العريس"])
+
+
+def _dresses(df):
+    return df["كود الفستان"] + " | " + _text(df["وصف الفستان"]).str.slice(0, 50) + "..."
+
+
+def _bookings(df):
+    return (df["كود الحجز"] + " | " + _text(df["اسم العروسه"]) + " & " + _text(df["اسم العريس"])
+            + " | " + _text(df["الخدمة"]) + " | " + _text(df["السعر المتفق"]) + "ج")
+
+
+def _payments(df):
+    return (df["كود الدفع"] + " | " + _text(df["اسم العروسه"]) + " | " + _text(df["القيمة المدفوعة"]) + "ج | "
+            + df["التاريخ"].dt.strftime(DATE_FORMAT).fillna(""))
+
+
+LABEL_BUILDERS = {"customers": _customers, "dresses": _dresses, "bookings": _bookings, "payments": _payments}
+
+
+def build_labels(table, view, key_col):
+    """قاموس كود ← نص العرض لكل أسطر العرض بالترتيب"""
+    if view.empty: return {}
+    return dict(zip(view[key_col], LABEL_BUILDERS[table](view)))
+
+
+def touched_keys(entries, key_col):
+    """أكواد الأسطر التي غيّرتها عمليات السجل"""
+    keys = set()
+    for entry in entries:
+        op = entry.get("op")
+        if op == "insert":
+            keys.add(entry["row"].get(key_col, ""))
+        elif op == "update":
+            keys.add(entry["key"])
+            if key_col in entry["changes"]: keys.add(str(entry["changes"][key_col]))
+        elif op == "delete":
+            keys.add(entry["key"])
+    return keys
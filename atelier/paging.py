@@ -0,0 +1,40 @@
+"""عرض الجداول الكبيرة صفحة بصفحة: الترتيب والتصفية على الخادم من الفهارس، وتحويل الصفحة الظاهرة فقط"""
+import math
+
+import numpy as np
+
+
+def select_positions(tables, table, sort_col=None, descending=False, query="", date_col=None, date_range=None):
+    """مواقع أسطر عرض الجدول بعد البحث وتحديد الفترة، مرتبة حسب العمود المطلوب
+
+    بدون عمود ترتيب ومع نص بحث تُرتب النتائج بالأقرب للبحث.
+    """
+    for _ in range(3):
+        df, (order, rank) = tables.sort_order(table, sort_col)
+        positions, consistent = None, True
+        if query:
+            found_df, found = tables.search_positions(table, query)
+            consistent &= found_df is df
+            positions = found
+        if date_col and date_range:
+            range_df, in_range = tables.range_positions(table, date_col, *date_range)
+            consistent &= range_df is df
+            positions = in_range if positions is None else positions[np.isin(positions, in_range)]
+        # كتابة حدثت أثناء الحساب: الفهارس من نسخ مختلفة، فنعيد من نسخة واحدة
+        if consistent: break
+
+    if positions is None:
+        ordered = order
+    elif sort_col is None and query:
+        return df, positions
+    else:
+        ordered = positions[np.argsort(rank[positions], kind="stable")]
+    return df, ordered[::-1] if descending else ordered
+
+
+def page_window(df, positions, page, page_size):
+    """أسطر صفحة واحدة مع رقم الصفحة الفعلي وعدد الصفحات"""
+    pages = max(1, math.ceil(len(positions) / page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    return df.iloc[positions[start:start + page_size]], page, pages
@@ -0,0 +1,79 @@
+"""العلاقات بين الجداول: الربط بالأكواد (Foreign Keys) وفهارس Hash للوصول المباشر للأسطر المرتبطة"""
+
+import numpy as np
+
+# الحجز يشير للعميلة بكودها، والدفعة تشير للحجز (ومنه للعميلة)؛ عمود الربط يحمل اسم مفتاح الجدول الأب
+FOREIGN_KEYS = {
+    "bookings": {"كود العميل": "customers"},
+    "payments": {"كود الحجز": "bookings"},
+}
+
+# الإصدارات القديمة كانت تربط الحجز باسم العروسة نصاً؛ يُحوَّل لكود العميل مرة واحدة
+LEGACY_LINKS = {"bookings": {"كود العميل": "اسم العروسه"}}
+
+# أعمدة العرض المأخوذة من جدول العملاء (لا تُخزن، فتعديل الاسم يغيّر جدول العملاء وحده)
+NAME_COLUMNS = ["اسم العروسه", "اسم العريس"]
+
+# الجداول التي يُبنى منها عرض كل جدول مرتبط
+VIEW_SOURCES = {"bookings": ["customers"], "payments": ["bookings", "customers"]}
+
+
+def build_index(df, col):
+    """فهرس Hash: كل قيمة في العمود ← مواقع الأسطر التي تحملها"""
+    return df.groupby(col, sort=False, observed=True).indices
+
+
+def build_sorted_index(df, col):
+    """فهرس مرتب لعمود (تاريخ مثلاً): ترتيب الأسطر وقيمها المرتبة للبحث بمدى بدل المرور على كل الأسطر"""
+    values = df[col].to_numpy()
+    order = np.argsort(values, kind="stable")
+    return order, values[order]
+
+
+def build_sort_order(df, col=None):
+    """ترتيب الأسطر حسب عمود (الفارغ في الآخر) ورتبة كل سطر في هذا الترتيب"""
+    if col is None:
+        order = np.arange(len(df))
+    else:
+        order = df[col].reset_index(drop=True).sort_values(kind="stable", na_position="last").index.to_numpy()
+    rank = np.empty(len(order), dtype=np.intp)
+    rank[order] = np.arange(len(order))
+    return order, rank
+
+
+def legacy_columns(table):
+    return list(LEGACY_LINKS.get(table, {}).values())
+
+
+def link_legacy(table, df, columns, load_table):
+    """ملء أكواد الربط الفارغة في بيانات قديمة من عمود الاسم، ثم حذف عمود الاسم"""
+    df = df.copy()
+    for fk_col, name_col in LEGACY_LINKS.get(table, {}).items():
+        if name_col not in df.columns: continue
+        # عند تكرار الاسم يُربط بأول عميلة مسجلة به
+        codes = _lookup(load_table(FOREIGN_KEYS[table][fk_col]), name_col, fk_col)
+        missing = df[fk_col] == ""
+        df.loc[missing, fk_col] = df.loc[missing, name_col].map(codes).fillna("")
+    return df[columns]
+
+
+def _lookup(df, key_col, col):
+    """قاموس كود ← قيمة عمود (لربط جدول بجدول آخر)"""
+    return df.drop_duplicates(key_col).set_index(key_col)[col]
+
+
+def related_view(table, df, sources):
+    """الجدول مع أسماء العروسة والعريس مأخوذة من جدول العملاء عبر الأكواد"""
+    view = df.copy()
+    position = view.columns.get_loc("كود العميل" if table == "bookings" else "كود الحجز") + 1
+    if table == "payments":
+        bookings = sources["bookings"]
+        codes = view["كود الحجز"].map(_lookup(bookings, "كود الحجز", "كود العميل"))
+        view.insert(position, "كود العميل", codes.fillna("").astype(str))
+        position += 1
+    customers = sources["customers"]
+    for offset, col in enumerate(NAME_COLUMNS):
+        names = view["كود العميل"].map(_lookup(customers, "كود العميل", col))
+        view.insert(position + offset, col, names.fillna("").astype(str))
+    return view
+
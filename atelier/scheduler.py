@@ -0,0 +1,114 @@
+"""مُجدول مهام خلفي داخل العملية: مهام دورية (كل مدة) أو يومية (في ساعة محددة) تعمل خارج مسار الطلبات
+
+المهام تعمل واحدة تلو الأخرى في خيط واحد، فلا تتداخل مهمتان ولا نسختان من نفس المهمة.
+حالة كل مهمة (آخر تشغيل ومدته ونتيجته أو خطؤه والتشغيل التالي) متاحة للعرض في الإعدادات.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from atelier.metrics import METRICS
+
+
+class Job:
+    """مهمة مسجلة: دالة بدون معاملات ترجع نصاً قصيراً عن نتيجتها (أو None)"""
+
+    def __init__(self, name, func, title="", every=None, at=None, at_start=False):
+        if (every is None) == (at is None):
+            raise ValueError("حدد every (ثوانٍ) أو at (ساعة HH:MM) للمهمة")
+        self.name = name
+        self.func = func
+        self.title = title or name
+        self.every = every
+        self.at = at
+        self.runs = 0
+        self.running = False
+        self.last_run = None
+        self.last_seconds = None
+        self.last_result = None
+        self.last_error = None
+        self.next_run = datetime.now() if at_start else self._next(datetime.now())
+
+    def _next(self, now):
+        if self.every is not None:
+            return now + timedelta(seconds=self.every)
+        hour, minute = map(int, self.at.split(":"))
+        run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return run if run > now else run + timedelta(days=1)
+
+    def run(self):
+        self.running = True
+        start = time.perf_counter()
+        try:
+            with METRICS.timed(f"job.{self.name}"):
+                result = self.func()
+            self.last_result, self.last_error = result, None
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            self.running = False
+            self.runs += 1
+            self.last_run = datetime.now()
+            self.last_seconds = time.perf_counter() - start
+            self.next_run = self._next(self.last_run)
+
+
+class Scheduler:
+    """قائمة المهام وخيط واحد ينام حتى موعد أقرب مهمة (أو حتى يُطلب تشغيل مهمة الآن)"""
+
+    def __init__(self):
+        self.jobs = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def add(self, name, func, title="", every=None, at=None, at_start=False):
+        job = Job(name, func, title, every, at, at_start)
+        with self._cond:
+            self.jobs[name] = job
+            self._cond.notify_all()
+        return job
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="atelier-scheduler")
+                self._thread.start()
+        return self
+
+    def run_now(self, name):
+        """تقديم موعد مهمة إلى الآن (تعمل في الخيط الخلفي وليس في الطلب الحالي)"""
+        with self._cond:
+            self.jobs[name].next_run = datetime.now()
+            self._cond.notify_all()
+
+    def _due(self):
+        now = datetime.now()
+        due = [job for job in self.jobs.values() if job.next_run <= now]
+        return min(due, key=lambda job: job.next_run) if due else None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._due()
+                while job is None:
+                    wait = min((j.next_run for j in self.jobs.values()), default=None)
+                    self._cond.wait(None if wait is None else max(0.0, (wait - datetime.now()).total_seconds()))
+                    job = self._due()
+            job.run()
+
+    def status(self):
+        """جدول حالة المهام للعرض"""
+        with self._cond:
+            jobs = list(self.jobs.values())
+        return pd.DataFrame([{
+            "المهمة": job.title,
+            "الموعد": f"يومياً {job.at}" if job.at else f"كل {job.every // 60:g} دقيقة" if job.every >= 60 else f"كل {job.every:g} ثانية",
+            "الحالة": "⏳ تعمل الآن" if job.running else "⚠️ فشلت" if job.last_error else "✅" if job.runs else "-",
+            "آخر تشغيل": job.last_run.strftime("%Y-%m-%d %H:%M") if job.last_run else "",
+            "المدة (ث)": round(job.last_seconds, 2) if job.last_seconds is not None else None,
+            "النتيجة": job.last_error or job.last_result or "",
+            "التشغيل التالي": job.next_run.strftime("%Y-%m-%d %H:%M"),
+            "مرات التشغيل": job.runs,
+        } for job in jobs])
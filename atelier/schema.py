@@ -0,0 +1,113 @@
+"""طبقة الأنواع (Schema): تحويل الجداول من نصوص إلى أنواع حقيقية مرة واحدة عند التحميل"""
+import math
+from datetime import date, datetime
+
+import pandas as pd
+
+DEPARTMENTS = ["الميكب", "التصوير", "الشعر", "البشره", "الفساتين"]
+DRESS_TYPES = ["زفاف", "سواريه", "غير محدد"]
+DRESS_STATUSES = ["متاح", "محجوز", "في المغسلة"]
+
+MONEY = "money"
+DATE = "date"
+
+# الأعمدة غير المذكورة نصية؛ القوائم تعني عموداً تصنيفياً (Categorical) بهذه القيم
+SCHEMA = {
+    "customers": {"تاريخ التسجيل": DATE},
+    "services": {"القسم": DEPARTMENTS, "السعر المقترح": MONEY},
+    "dresses": {"نوع الفستان": DRESS_TYPES, "تاريخ الشراء": DATE, "حالة الفستان": DRESS_STATUSES},
+    "bookings": {"تاريخ الحجز": DATE, "القسم": DEPARTMENTS, "تاريخ المناسبة": DATE, "السعر المتفق": MONEY, "المدفوع": MONEY, "المتبقي": MONEY},
+    "payments": {"التاريخ": DATE, "القيمة المدفوعة": MONEY, "المتبقي بعد الدفعة": MONEY},
+}
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def _parse_series(series, kind):
+    if kind == MONEY:
+        return pd.to_numeric(series, errors="coerce").fillna(0.0).astype("float64")
+    if kind == DATE:
+        return pd.to_datetime(series, errors="coerce", format="ISO8601")
+    values = series.where(series != "")
+    extra = sorted(set(values.dropna()) - set(kind))
+    return pd.Series(pd.Categorical(values, categories=kind + extra), index=series.index)
+
+
+def parse(df, table):
+    """تحويل جدول نصي (كما يُقرأ من التخزين) إلى أعمدة بأنواعها الحقيقية"""
+    df = df.copy()
+    for col, kind in SCHEMA[table].items():
+        df[col] = _parse_series(df[col].astype(str), kind)
+    return df
+
+
+def serialize(df, table):
+    """تحويل جدول بأنواعه إلى نصوص للتخزين"""
+    out = df.copy()
+    for col, kind in SCHEMA[table].items():
+        if kind == MONEY:
+            out[col] = out[col].astype("float64").astype(str)
+        elif kind == DATE:
+            out[col] = out[col].dt.strftime(DATE_FORMAT).fillna("")
+        else:
+            out[col] = out[col].astype(object).where(out[col].notna(), "")
+    return out.astype(str)
+
+
+def typed_value(table, col, value):
+    """تحويل قيمة واحدة (من نموذج إدخال) لنوع العمود"""
+    kind = SCHEMA[table].get(col)
+    if kind == MONEY:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return 0.0
+        return 0.0 if math.isnan(number) else number
+    if kind == DATE:
+        if isinstance(value, (date, datetime, pd.Timestamp)) and not pd.isna(value):
+            return pd.Timestamp(value)
+        return pd.to_datetime(value, errors="coerce", format="ISO8601") if value else pd.NaT
+    if isinstance(kind, list) and value == "":
+        return None
+    return value
+
+
+def storage_value(table, col, value):
+    """تحويل قيمة واحدة لنصها المخزن"""
+    kind = SCHEMA[table].get(col)
+    value = typed_value(table, col, value)
+    if kind == MONEY:
+        return str(value)
+    if kind == DATE:
+        return "" if pd.isna(value) else value.strftime(DATE_FORMAT)
+    return "" if value is None or (isinstance(value, float) and math.isnan(value)) else str(value)
+
+
+def to_storage(table, row):
+    return {col: storage_value(table, col, value) for col, value in row.items()}
+
+
+def _ensure_categories(df, col, values):
+    if isinstance(df[col].dtype, pd.CategoricalDtype):
+        missing = sorted({v for v in values if not pd.isna(v)} - set(df[col].cat.categories))
+        if missing: df[col] = df[col].cat.add_categories(missing)
+
+
+def append_row(df, table, row):
+    """إضافة سطر مع الحفاظ على أنواع الأعمدة (loc وحدها تُسقط النوع التصنيفي)"""
+    row = {col: typed_value(table, col, row.get(col, "")) for col in df.columns}
+    for col in df.columns:
+        _ensure_categories(df, col, [row[col]])
+    new = pd.DataFrame([row], columns=df.columns)
+    for col in df.columns:
+        new[col] = new[col].astype(df[col].dtype)
+    return pd.concat([df, new], ignore_index=True)
+
+
+def set_values(df, table, mask, changes):
+    """تعديل أعمدة الأسطر المحددة بقيم من نفس النوع"""
+    for col, value in changes.items():
+        value = typed_value(table, col, value)
+        _ensure_categories(df, col, [value])
+        df.loc[mask, col] = value
+    return df
@@ -0,0 +1,161 @@
+"""البحث السريع: فهرس مقاطع ثلاثية (Trigrams) للنصوص العربية بعد توحيد الحروف، وفهرس مرتب لأرقام الهواتف"""
+import bisect
+import re
+import threading
+from collections import Counter
+
+import pandas as pd
+
+# الأعمدة النصية والأعمدة الهاتفية المفهرسة في عرض كل جدول
+SEARCH_FIELDS = {
+    "customers": (["كود العميل", "اسم العروسه", "اسم العريس", "العنوان", "ملاحظات"], ["تليفون 1", "تليفون 2"]),
+    "services": (["كود الخدمة", "اسم الخدمة", "القسم"], []),
+    "dresses": (["كود الفستان", "نوع الفستان", "وصف الفستان"], []),
+    "bookings": (["كود الحجز", "اسم العروسه", "اسم العريس", "الخدمة", "كود الفستان", "ملاحظات الحجز"], []),
+    "payments": (["كود الدفع", "كود الحجز", "اسم العروسه", "اسم العريس", "ملاحظات الدفع"], []),
+}
+
+# توحيد أشكال الحروف التي يكتبها الناس بطرق مختلفة، وحذف التشكيل والتطويل، وتحويل الأرقام العربية
+_TRANSLATION = str.maketrans({
+    **{c: "ا" for c in "أإآٱ"},
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    **{chr(c): None for c in range(0x064B, 0x0653)}, "ـ": None,
+    **{d: str(i) for i, d in enumerate("٠١٢٣٤٥٦٧٨٩")},
+    **{d: str(i) for i, d in enumerate("۰۱۲۳۴۵۶۷۸۹")},
+})
+
+_NON_DIGITS = re.compile(r"\D")
+MIN_QUERY = 2
+
+
+def normalize(text):
+    """نص موحد للبحث: أحرف صغيرة، بدون تشكيل، وأشكال الألف والياء والتاء المربوطة موحدة"""
+    return " ".join(str(text).translate(_TRANSLATION).lower().split())
+
+
+def phone_key(phone):
+    """رقم الهاتف بالأرقام فقط وبالصيغة المحلية (0020/+20 ← 0)
+
+    مع علامة + أو 0020 يُحذف مفتاح الدولة مهما كان الطول، فيطابق جزء الرقم الدولي المكتوب في البحث نفس الأرقام المحلية.
+    """
+    text = str(phone).translate(_TRANSLATION).strip()
+    digits = _NON_DIGITS.sub("", text)
+    if digits.startswith("0020"): digits = "0" + digits[4:]
+    elif digits.startswith("20") and (text.startswith("+") or len(digits) == 12): digits = "0" + digits[2:]
+    return digits
+
+
+def _grams(text):
+    """المقاطع الثلاثية لكل كلمة، مع مسافة في أولها ونهايتها لتمييز بداية الكلمة ونهايتها"""
+    grams = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _query_words(text):
+    """مقاطع كل كلمة في نص البحث؛ نهاية الكلمة الأخيرة لا تُعلَّم لأن المستخدم قد يكون ما زال يكتبها"""
+    words = text.split()
+    result = []
+    for i, word in enumerate(words):
+        padded = f" {word} " if i < len(words) - 1 else f" {word}"
+        result.append({padded[j:j + 3] for j in range(max(1, len(padded) - 2))})
+    return result
+
+
+class SearchIndex:
+    """فهرس مقلوب: كل مقطع ← أكواد الأسطر التي تحتويه، مع تحديث سطر بسطر عند الحفظ"""
+
+    def __init__(self, table):
+        self.text_fields, self.phone_fields = SEARCH_FIELDS[table]
+        self._lock = threading.Lock()
+        self.order = {}        # كود ← ترتيب السطر (لترتيب النتائج المتساوية)
+        self.texts = {}        # كود ← النص الموحد
+        self.key_grams = {}    # كود ← مقاطعه
+        self.grams = {}        # مقطع ← أكواد
+        self.phones = []       # (رقم موحد، كود) مرتبة للبحث ببادئة الرقم
+        self.key_phones = {}
+        self._next = 0
+
+    def _texts(self, df):
+        combined = pd.Series("", index=df.index)
+        for col in self.text_fields:
+            combined = combined + " " + df[col].astype(str).where(df[col].notna(), "")
+        return combined.map(normalize)
+
+    def add(self, df, key_col):
+        """فهرسة أسطر (جديدة أو معدلة) دفعة واحدة"""
+        texts = self._texts(df).tolist()
+        phones = list(zip(*[df[col].map(phone_key).tolist() for col in self.phone_fields])) or [()] * len(df)
+        with self._lock:
+            new_phones = []
+            for key, text, numbers in zip(df[key_col].tolist(), texts, phones):
+                self._remove(key)
+                if key not in self.order:
+                    self.order[key] = self._next
+                    self._next += 1
+                self.texts[key] = text
+                grams = _grams(text)
+                self.key_grams[key] = grams
+                for gram in grams:
+                    self.grams.setdefault(gram, set()).add(key)
+                self.key_phones[key] = {n for n in numbers if n}
+                new_phones.extend((n, key) for n in self.key_phones[key])
+            if len(new_phones) > 16:
+                self.phones.extend(new_phones)
+                self.phones.sort()
+            else:
+                for pair in new_phones:
+                    bisect.insort(self.phones, pair)
+
+    def _remove(self, key):
+        for gram in self.key_grams.pop(key, ()):
+            keys = self.grams.get(gram)
+            if keys:
+                keys.discard(key)
+                if not keys: del self.grams[gram]
+        for number in self.key_phones.pop(key, ()):
+            i = bisect.bisect_left(self.phones, (number, key))
+            if i < len(self.phones) and self.phones[i] == (number, key): del self.phones[i]
+        self.texts.pop(key, None)
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+                self.order.pop(key, None)
+
+    def _phone_matches(self, digits):
+        matches = set()
+        for prefix in {digits, "0" + digits.lstrip("0")} if digits else ():
+            i = bisect.bisect_left(self.phones, (prefix,))
+            while i < len(self.phones) and self.phones[i][0].startswith(prefix):
+                matches.add(self.phones[i][1])
+                i += 1
+        return matches
+
+    def search(self, query, limit=None):
+        """أكواد الأسطر المطابقة مرتبة بالأقرب: تطابق الرقم، ثم النص الكامل، ثم نسبة المقاطع المشتركة"""
+        text = normalize(query)
+        if len(text) < MIN_QUERY: return None
+        query_words = _query_words(text)
+        digits = phone_key(query) if len(_NON_DIGITS.sub("", text)) >= 3 else ""
+        with self._lock:
+            scores = None
+            for grams in query_words:
+                hits = Counter()
+                for gram in grams:
+                    for key in self.grams.get(gram, ()):
+                        hits[key] += 1
+                # كل كلمة يجب أن تطابق، مع قبول خطأ إملائي بسيط في الكلمات الطويلة (نصف مقاطعها على الأقل)
+                needed = len(grams) if len(grams) <= 3 else (len(grams) + 1) // 2
+                word_scores = {key: count / len(grams) for key, count in hits.items() if count >= needed}
+                scores = word_scores if scores is None else {
+                    key: score + word_scores[key] for key, score in scores.items() if key in word_scores}
+            scores = {key: score / len(query_words) + (1.0 if text in self.texts[key] else 0.0)
+                      for key, score in (scores or {}).items()}
+            for key in self._phone_matches(digits):
+                scores[key] = scores.get(key, 0.0) + 2.0
+            ranked = sorted(scores, key=lambda key: (-scores[key], self.order[key]))
+        return ranked[:limit] if limit else ranked
@@ -0,0 +1,81 @@
+"""مولّد الأكواد: عدّاد دائم لكل جدول بدلاً من الطابع الزمني أو البحث عن أكبر كود"""
+import json
+import os
+import re
+
+import pandas as pd
+
+from atelier.locks import FileLock
+
+SEQUENCES_FILE = "sequences.json"
+
+# أول رقم يُعطى عند عدم وجود أكواد سابقة (كما كانت الأكواد تبدأ C-101 و S-101)
+ID_START = 100
+
+# بادئة الكود لكل جدول؛ بادئة الحجوزات تؤخذ من اسم القسم عند التوليد
+ID_PREFIXES = {"customers": "C", "services": "S", "dresses": "D", "bookings": "BK", "payments": "PAY"}
+
+_NUMBER = re.compile(r"(\d+)\s*$")
+
+
+def key_number(key):
+    """الرقم في نهاية الكود (C-105 ← 105)، أو None إذا لم ينته برقم"""
+    match = _NUMBER.search(str(key))
+    return int(match.group(1)) if match else None
+
+
+def max_key_number(keys):
+    """أكبر رقم مستخدم في أكواد جدول موجود (يُستدعى مرة واحدة فقط لتهيئة العدّاد)"""
+    numbers = [n for n in map(key_number, keys) if n is not None]
+    return max(numbers + [ID_START])
+
+
+def max_code_number(table, keys):
+    """أكبر رقم في الأكواد المكتوبة يدوياً بنفس صيغة الأكواد المولدة (<البادئة>-<رقم>)، أو None
+
+    أكواد الحجوزات بادئتها من اسم القسم، فتُقبل أي بادئة لها.
+    """
+    prefix = r"[^-\s]+" if table == "bookings" else re.escape(ID_PREFIXES[table])
+    numbers = pd.Series(list(keys), dtype=str).str.extract(rf"^{prefix}-(\d+)$")[0].dropna()
+    return int(numbers.astype(int).max()) if len(numbers) else None
+
+
+class SequenceFile:
+    """عدّادات كل الجداول في ملف JSON صغير، تُقرأ وتُحدَّث تحت قفل ملف بين العمليات"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = FileLock(path + ".lock")
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, values):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(values, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def next(self, name, seed, count=1):
+        """حجز الرقم التالي (أو count رقماً متتالياً وإرجاع أولها)؛ seed() تعطي آخر رقم مستخدم إذا لم يكن للعدّاد قيمة بعد"""
+        with self._lock:
+            values = self._read()
+            number = (values[name] if name in values else seed()) + 1
+            values[name] = number + count - 1
+            self._write(values)
+            return number
+
+    def bump_to(self, name, number, seed):
+        """تقديم العدّاد إلى number على الأقل، فلا يُعطى رقم كود مكتوب يدوياً أو مستورد"""
+        with self._lock:
+            values = self._read()
+            current = values[name] if name in values else seed()
+            if name not in values or current < number:
+                values[name] = max(current, number)
+                self._write(values)
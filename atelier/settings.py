@@ -0,0 +1,40 @@
+"""إعدادات التطبيق المشتركة بين كل الجلسات (ملف JSON صغير بجانب البيانات)"""
+import json
+import os
+
+from atelier.locks import FileLock
+
+SETTINGS_FILE = "settings.json"
+
+# مدة انشغال الفستان قبل المناسبة (بروفة/استلام) وبعدها (إرجاع/تنظيف) بالأيام
+# archive_after_days: الحجوزات المسددة التي مرت مناسبتها بهذه المدة تُنقل للأرشيف؛ 0 (الافتراضي) يوقف الأرشفة حتى يحددها المسؤول
+DEFAULTS = {"alert_days": 7, "dress_buffer_before": 2, "dress_buffer_after": 2, "archive_after_days": 0}
+
+
+class Settings:
+    """قراءة وحفظ الإعدادات، مع القيم الافتراضية لأي إعداد لم يُحفظ بعد"""
+
+    def __init__(self, data_dir="."):
+        self.path = os.path.join(data_dir, SETTINGS_FILE)
+        self._lock = FileLock(self.path + ".lock")
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, name):
+        return self._read().get(name, DEFAULTS.get(name))
+
+    def update(self, **changes):
+        with self._lock:
+            values = self._read()
+            values.update(changes)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(values, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
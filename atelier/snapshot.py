@@ -0,0 +1,82 @@
+"""لقطة ثنائية للجداول بأنواعها (Parquet) تُقرأ عند بدء التطبيق بدلاً من قراءة CSV وتحويل أنواعه من جديد
+
+كل لقطة تحمل نسخة الجدول في التخزين وقت أخذها، فلا تُستخدم إلا إذا لم يتغير الجدول بعدها.
+تُعاد كتابتها في الخلفية بعد كل تغيير يُحمَّل في الذاكرة المشتركة.
+"""
+import json
+import os
+import threading
+import time
+
+SNAPSHOT_FOLDER = "snapshots"
+METADATA_KEY = b"atelier"
+
+
+def _version_text(backend, version):
+    return json.dumps([backend.name, version])
+
+
+class TypedSnapshots:
+    """ملف Parquet لكل جدول، ومعه (في بيانات الملف نفسه) نسخة التخزين ورقم المراجعة"""
+
+    def __init__(self, folder, backend, delay=1.0):
+        self.folder = folder
+        self.backend = backend
+        self.delay = delay
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def path(self, table):
+        return os.path.join(self.folder, f"{table}.parquet")
+
+    def load(self, table, version):
+        """(الجدول بأنواعه، رقم المراجعة) إذا كانت اللقطة لنفس النسخة، وإلا None"""
+        path = self.path(table)
+        if not os.path.exists(path): return None
+        try:
+            import pyarrow.parquet as pq
+
+            # بيانات الملف أولاً (بدون قراءة الأعمدة) لرفض اللقطة القديمة بسرعة
+            info = json.loads(pq.read_schema(path).metadata[METADATA_KEY])
+            if info["version"] != _version_text(self.backend, version): return None
+            data = pq.read_table(path)
+            if json.loads(data.schema.metadata[METADATA_KEY]) != info: return None  # استُبدلت أثناء القراءة
+            return data.to_pandas(), info["revision"]
+        except Exception:
+            return None  # لقطة تالفة أو مكتبة غير متوفرة: القراءة من التخزين كالمعتاد
+
+    def write(self, table, version, revision, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(self.folder, exist_ok=True)
+        data = pa.Table.from_pandas(df, preserve_index=False)
+        info = json.dumps({"version": _version_text(self.backend, version), "revision": revision})
+        data = data.replace_schema_metadata({**(data.schema.metadata or {}), METADATA_KEY: info.encode("utf-8")})
+        tmp_path = self.path(table) + ".tmp"
+        pq.write_table(data, tmp_path, compression="zstd")
+        os.replace(tmp_path, self.path(table))
+
+    def schedule(self, table, version, revision, df):
+        """كتابة اللقطة في الخلفية؛ التغييرات المتتالية خلال المهلة تُكتب مرة واحدة بآخر نسخة"""
+        with self._cond:
+            self._pending[table] = (version, revision, df)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.delay)
+            with self._cond:
+                pending, self._pending = self._pending, {}
+            for table, (version, revision, df) in pending.items():
+                try:
+                    self.write(table, version, revision, df)
+                except Exception:
+                    pass  # اللقطة تسريع فقط؛ تُعاد مع التغيير التالي
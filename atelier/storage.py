@@ -0,0 +1,676 @@
+"""محركات التخزين (Storage Backends): CSV و SQLite"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import ExitStack
+
+import pandas as pd
+
+from atelier.backups import BackupStore, BackupWorker
+from atelier.journal import JOURNAL_FOLDER, Journal, file_sha256, replay
+from atelier.locks import FileLock
+from atelier.metrics import METRICS, measured
+from atelier.relations import FOREIGN_KEYS, LEGACY_LINKS, legacy_columns, link_legacy
+from atelier.sequences import ID_PREFIXES, SEQUENCES_FILE, SequenceFile, max_code_number, max_key_number
+
+BACKUP_FOLDER = "backups"
+CHANGES_KEEP = 1000  # عدد النسخ الأخيرة المحفوظة في سجل تغييرات SQLite لكل جدول
+
+# تعريف الأعمدة الثابتة لضمان عدم حدوث KeyError
+C_COLS = ["كود العميل", "تاريخ التسجيل", "اسم العروسه", "اسم العريس", "العنوان", "تليفون 1", "تليفون 2", "ملاحظات"]
+S_COLS = ["كود الخدمة", "القسم", "اسم الخدمة", "السعر المقترح"]
+D_COLS = ["كود الفستان", "نوع الفستان", "تاريخ الشراء", "وصف الفستان", "صورة الفستان", "حالة الفستان"]
+B_COLS = ["كود الحجز", "تاريخ الحجز", "كود العميل", "القسم", "الخدمة", "كود الفستان", "تاريخ المناسبة", "السعر المتفق", "المدفوع", "المتبقي", "ملاحظات الحجز"]
+P_COLS = ["كود الدفع", "التاريخ", "كود الحجز", "القيمة المدفوعة", "المتبقي بعد الدفعة", "ملاحظات الدفع"]
+
+# سجل الجداول: اسم الملف والأعمدة والمفتاح الأساسي لكل جدول
+TABLES = {
+    "customers": {"file": "customers.csv", "columns": C_COLS, "key": "كود العميل"},
+    "services": {"file": "services.csv", "columns": S_COLS, "key": "كود الخدمة"},
+    "dresses": {"file": "dresses.csv", "columns": D_COLS, "key": "كود الفستان"},
+    "bookings": {"file": "bookings.csv", "columns": B_COLS, "key": "كود الحجز"},
+    "payments": {"file": "payments.csv", "columns": P_COLS, "key": "كود الدفع"},
+}
+
+
+class StaleWriteError(Exception):
+    """محاولة كتابة مبنية على نسخة قديمة من سجل عدّله مستخدم آخر، أو إضافة كود موجود بالفعل"""
+
+    def __init__(self, file_name, key=None):
+        if key is None:
+            super().__init__(f"تم تعديل بيانات {file_name} من مستخدم آخر، حدّث الصفحة وأعد المحاولة")
+        else:
+            super().__init__(f"الكود {key} موجود بالفعل في {file_name}، حدّث الصفحة وأعد المحاولة")
+
+
+def _q(name):
+    """تنصيص اسم عمود/جدول داخل جمل SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def read_table_csv(path, columns):
+    """قراءة ملف CSV كنصوص مع ضمان وجود كل الأعمدة"""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns, dtype=str)
+    df = pd.read_csv(path, dtype=str).fillna("")
+    for col in columns:
+        if col not in df.columns: df[col] = ""
+    return df[columns]
+
+
+class Backend:
+    """الأساس المشترك للمحركات: نقاط الاستعادة في مخزن النسخ الاحتياطية"""
+
+    name = ""
+
+    def __init__(self, data_dir="."):
+        self.data_dir = data_dir
+        self.backups = BackupStore(os.path.join(data_dir, BACKUP_FOLDER))
+        self._backup_worker = BackupWorker(self.backups, self.load, TABLES)
+
+    def _start_backups(self):
+        # نقطة استعادة أساسية عند أول تشغيل للمخزن
+        if not self.backups.count():
+            self._backup_worker.notify(next(iter(TABLES)))
+
+    def _written(self, table):
+        self._backup_worker.notify(table)
+
+    def flush_backups(self, timeout=30):
+        return self._backup_worker.flush(timeout)
+
+    def next_id(self, table, prefix=None):
+        """كود جديد لم يُستخدم من قبل (مثل C-101)، بدون فحص الجدول وآمن مع عدة جلسات في نفس اللحظة"""
+        return f"{prefix or ID_PREFIXES[table]}-{self._next_number(table)}"
+
+    def reserve_numbers(self, table, count):
+        """حجز count رقماً متتالياً للأكواد دفعة واحدة (للاستيراد بالجملة)"""
+        if count <= 0: return range(0)
+        first = self._next_number(table, count)
+        return range(first, first + count)
+
+    def bump_to(self, table, number):
+        """تقديم عدّاد الأكواد إلى number على الأقل (قبل حجز أرقام لأسطر بجانبها أكواد مكتوبة يدوياً)"""
+        if number is not None: self._bump_to(table, number)
+
+    def restore(self, point):
+        """إرجاع الجداول الخمسة معاً كما كانت في نقطة الاستعادة"""
+        frames = self.backups.restore(point, {table: TABLES[table]["columns"] + legacy_columns(table) for table in TABLES})
+        for table in LEGACY_LINKS:
+            frames[table] = link_legacy(table, frames[table], TABLES[table]["columns"], frames.get)
+        self.save_many(frames)
+        return frames
+
+
+class CSVBackend(Backend):
+    """التخزين في ملفات CSV: كل تعديل سطر يُلحق بسجل العمليات، ويُدمج السجل في الملف دورياً"""
+
+    name = "csv"
+
+    def __init__(self, data_dir=".", journal_max_bytes=None):
+        super().__init__(data_dir)
+        self.journal = Journal(os.path.join(data_dir, JOURNAL_FOLDER))
+        self.journal_max_bytes = journal_max_bytes or int(os.environ.get("ATELIER_JOURNAL_MAX_BYTES", 1_000_000))
+        self._locks = {table: FileLock(self.journal.lock_path(table)) for table in TABLES}
+        self._compacting = set()
+        self._keys = {}
+        self.sequences = SequenceFile(os.path.join(self.journal.folder, SEQUENCES_FILE))
+        for table in LEGACY_LINKS:
+            self._migrate_links(table)
+        self._start_backups()
+
+    def path(self, table):
+        return os.path.join(self.data_dir, TABLES[table]["file"])
+
+    def _migrate_links(self, table):
+        """تحويل ملف بصيغة الربط بالاسم القديمة لصيغة الربط بالكود (مرة واحدة)"""
+        legacy = legacy_columns(table)
+        with self._locks[table]:
+            self.journal.recover(table, self.path(table))
+            header = list(pd.read_csv(self.path(table), nrows=0).columns) if os.path.exists(self.path(table)) else []
+            entries = self.journal.read(table)
+            if not any(col in header for col in legacy) and not any(
+                    col in entry.get("row", {}) for entry in entries for col in legacy):
+                return
+            columns = TABLES[table]["columns"]
+            df = replay(read_table_csv(self.path(table), columns + legacy), entries, TABLES[table]["key"])
+            df = link_legacy(table, df, columns, self.load)
+            self._replace_snapshot(table, df, self.journal.revision(table))
+
+    def _read_snapshot(self, table):
+        return read_table_csv(self.path(table), TABLES[table]["columns"])
+
+    def version(self, table):
+        """نسخة الجدول: بصمة ملف اللقطة + حجم سجل العمليات (تتغير مع أي كتابة من أي عملية)"""
+        try:
+            stat = os.stat(self.path(table))
+            snapshot = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            snapshot = None
+        return (snapshot, self.journal.size(table))
+
+    def revision(self, table):
+        with self._locks[table]:
+            return self.journal.revision(table)
+
+    @measured("storage.load")
+    def load_versioned(self, table):
+        """تحميل الجدول مع النسخة ورقم المراجعة المطابقين له تماماً"""
+        with self._locks[table]:
+            self.journal.recover(table, self.path(table))
+            snapshot = self.version(table)[0]
+            df = self._read_snapshot(table)
+            entries, end = self.journal.read_from(table, 0)
+            revision = self.journal.revision(table)
+        df = replay(df, entries, TABLES[table]["key"])
+        METRICS.count(rows=len(df))
+        return (snapshot, end), df, revision
+
+    def changes_since(self, table, old_version):
+        """العمليات التي أُلحقت بعد نسخة معينة، أو None إذا تغيرت اللقطة نفسها ويلزم تحميل كامل"""
+        with self._locks[table]:
+            snapshot, size = self.version(table)
+            if snapshot != old_version[0] or size < old_version[1]:
+                return None
+            entries, end = self.journal.read_from(table, old_version[1])
+            revision = self.journal.revision(table)
+        return (snapshot, end), entries, revision
+
+    def load(self, table):
+        """آخر لقطة للجدول + إعادة تطبيق سجل العمليات"""
+        return self.load_versioned(table)[1]
+
+    def _current(self, table):
+        """الجدول الحالي بدون قفل (يُستدعى والقفل ممسوك بالفعل)"""
+        self.journal.recover(table, self.path(table))
+        return replay(self._read_snapshot(table), self.journal.read(table), TABLES[table]["key"])
+
+    def _next_number(self, table, count=1):
+        # قفل الجدول قبل قفل العدّاد دائماً (كما في الإضافة)، فتهيئة العدّاد من أكواد الجدول لا تتعارض مع إضافة
+        with self._locks[table]:
+            return self.sequences.next(table, lambda: self._seed_number(table), count)
+
+    def _seed_number(self, table):
+        return max_key_number(self._current(table)[TABLES[table]["key"]])
+
+    def _bump_to(self, table, number):
+        with self._locks[table]:
+            self.sequences.bump_to(table, number, lambda: self._seed_number(table))
+
+    @measured("storage.save")
+    def save(self, table, df, base=None):
+        """استبدال الجدول كاملاً؛ يُرفض إذا تغيّر الجدول بعد النسخة base"""
+        with self._locks[table]:
+            self.journal.recover(table, self.path(table))
+            revision = self.journal.revision(table)
+            if base is not None and base != revision:
+                raise StaleWriteError(TABLES[table]["file"])
+            self._replace_snapshot(table, df, revision + 1)
+        self._written(table)
+
+    @measured("storage.insert")
+    def insert(self, table, row):
+        self._append(table, {"op": "insert", "row": {col: str(row.get(col, "")) for col in TABLES[table]["columns"]}})
+
+    @measured("storage.insert_many")
+    def insert_many(self, frames):
+        """إضافة أسطر كثيرة لعدة جداول (جدول ← DataFrame نصي): لقطة جديدة لكل جدول تُكتب كاملة أو لا تُكتب"""
+        tables = [table for table in TABLES if table in frames]
+        with ExitStack() as stack:
+            for table in tables:
+                stack.enter_context(self._locks[table])
+            merged = {}
+            for table in tables:
+                key_col = TABLES[table]["key"]
+                df = self._current(table)
+                added = frames[table][TABLES[table]["columns"]].astype(str)
+                # كود موجود أو مكرر يرفض الإضافة كلها قبل كتابة أي جدول
+                clash = added[key_col][added[key_col].isin(df[key_col]) | added[key_col].duplicated()]
+                if len(clash):
+                    raise StaleWriteError(TABLES[table]["file"], clash.iloc[0])
+                merged[table] = (df, added)
+            for table in tables:
+                df, added = merged[table]
+                self._replace_snapshot(table, pd.concat([df, added], ignore_index=True), self.journal.revision(table) + 1)
+                number = max_code_number(table, added[TABLES[table]["key"]])
+                if number is not None: self.sequences.bump_to(table, number, lambda: self._seed_number(table))
+        for table in tables:
+            self._written(table)
+
+    @measured("storage.save_many")
+    def save_many(self, frames):
+        """استبدال عدة جداول كاملة معاً (للاستعادة) بأقفالها كلها، فلا تدخل كتابة من جلسة أخرى بين جدول وآخر"""
+        tables = [table for table in TABLES if table in frames]
+        with ExitStack() as stack:
+            for table in tables:
+                stack.enter_context(self._locks[table])
+            for table in tables:
+                self.journal.recover(table, self.path(table))
+            for table in tables:
+                self._replace_snapshot(table, frames[table], self.journal.revision(table) + 1)
+        for table in tables:
+            self._written(table)
+
+    @measured("storage.delete_many")
+    def delete_many(self, keys, bases=None):
+        """حذف أسطر كثيرة من عدة جداول (جدول ← أكواد) معاً؛ يُرفض إذا تغيّر أي جدول بعد مراجعته في bases"""
+        tables = [table for table in TABLES if table in keys]
+        with ExitStack() as stack:
+            for table in tables:
+                stack.enter_context(self._locks[table])
+            for table in tables:
+                self.journal.recover(table, self.path(table))
+                if bases and table in bases and bases[table] != self.journal.revision(table):
+                    raise StaleWriteError(TABLES[table]["file"])
+            for table in tables:
+                df = replay(self._read_snapshot(table), self.journal.read(table), TABLES[table]["key"])
+                kept = df[~df[TABLES[table]["key"]].isin(set(keys[table]))]
+                self._replace_snapshot(table, kept.reset_index(drop=True), self.journal.revision(table) + 1)
+        for table in tables:
+            self._written(table)
+
+    @measured("storage.update")
+    def update(self, table, key, changes, base=None):
+        self._append(table, {"op": "update", "key": key, "changes": {col: str(v) for col, v in changes.items()}}, base)
+
+    @measured("storage.delete")
+    def delete(self, table, key, base=None):
+        self._append(table, {"op": "delete", "key": key}, base)
+
+    def _check_stale(self, table, key, base, revision):
+        """دمج الكتابة إذا لم يُعدَّل نفس السجل بعد النسخة base، ورفضها إذا عُدِّل"""
+        if base is None or base == revision: return
+        if base < self.journal.snapshot_revision(table):
+            raise StaleWriteError(TABLES[table]["file"])  # التعديلات الوسيطة دُمجت في اللقطة ولا يمكن فحصها
+        key_col = TABLES[table]["key"]
+        for entry in self.journal.read(table):
+            if entry.get("rev", 0) <= base: continue
+            touched = entry.get("op") == "delete" and entry["key"] == key
+            touched |= entry.get("op") == "update" and key in (entry["key"], entry["changes"].get(key_col))
+            if touched: raise StaleWriteError(TABLES[table]["file"])
+
+    def _existing_keys(self, table):
+        """أكواد الجدول الحالية (والقفل ممسوك)؛ تُحفظ مع نسخة الجدول، فلا يُقرأ الجدول كاملاً إلا بعد كتابة من عملية أخرى"""
+        cached = self._keys.get(table)
+        if cached and cached[0] == self.version(table):
+            return cached[1]
+        keys = set(self._current(table)[TABLES[table]["key"]])
+        self._keys[table] = (self.version(table), keys)
+        return keys
+
+    def _track_keys(self, table, entry, before):
+        """تحديث الأكواد المحفوظة بعملية هذه العملية نفسها، إذا لم يكتب غيرها قبلها"""
+        cached = self._keys.get(table)
+        if not cached or cached[0] != before: return
+        keys, key_col = cached[1], TABLES[table]["key"]
+        if entry["op"] == "insert":
+            keys.add(entry["row"][key_col])
+        elif entry["op"] == "delete":
+            keys.discard(entry["key"])
+        elif key_col in entry["changes"]:
+            keys.discard(entry["key"])
+            keys.add(entry["changes"][key_col])
+        self._keys[table] = (self.version(table), keys)
+
+    def _append(self, table, entry, base=None):
+        with self._locks[table]:
+            self.journal.recover(table, self.path(table))
+            revision = self.journal.revision(table)
+            if entry["op"] == "insert":
+                key = entry["row"][TABLES[table]["key"]]
+                if key in self._existing_keys(table):
+                    raise StaleWriteError(TABLES[table]["file"], key)
+            else:
+                self._check_stale(table, entry["key"], base, revision)
+            before = self.version(table)
+            size = self.journal.append(table, {"rev": revision + 1, **entry})
+            self._track_keys(table, entry, before)
+            if entry["op"] == "insert":
+                # كود مكتوب يدوياً بصيغة الأكواد المولدة يُقدِّم العدّاد، فلا يُعطى رقمه لإضافة لاحقة
+                number = max_code_number(table, [entry["row"][TABLES[table]["key"]]])
+                if number is not None: self.sequences.bump_to(table, number, lambda: self._seed_number(table))
+        self._written(table)
+        if size > self.journal_max_bytes and table not in self._compacting:
+            self._compacting.add(table)
+            threading.Thread(target=self.compact, args=(table,), daemon=True).start()
+
+    def _replace_snapshot(self, table, df, revision):
+        """كتابة لقطة جديدة بشكل ذري (ملف مؤقت + rename) ثم تفريغ السجل"""
+        path = self.path(table)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+            METRICS.count(rows=len(df), nbytes=f.tell())
+        self.journal.begin_compaction(table, file_sha256(tmp_path), revision)
+        os.replace(tmp_path, path)
+        self.journal.end_compaction(table, revision)
+
+    @measured("storage.compact")
+    def compact(self, table):
+        """دمج سجل العمليات في لقطة CSV جديدة (يعمل في الخلفية)"""
+        try:
+            with self._locks[table]:
+                self.journal.recover(table, self.path(table))
+                entries = self.journal.read(table)
+                if not entries: return
+                df = replay(self._read_snapshot(table), entries, TABLES[table]["key"])
+                self._replace_snapshot(table, df, self.journal.revision(table))
+        finally:
+            self._compacting.discard(table)
+
+
+class SQLiteBackend(Backend):
+    """التخزين في قاعدة SQLite مدمجة بنظام WAL: كل تعديل عملية على سطر واحد داخل Transaction"""
+
+    name = "sqlite"
+
+    def __init__(self, data_dir=".", db_name="atelier.db"):
+        super().__init__(data_dir)
+        self.db_path = os.path.join(data_dir, db_name)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS _versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS _sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                # سجل التغييرات: عمليات كل نسخة بنفس صيغة سجل CSV، و entry = NULL لاستبدال الجدول كاملاً
+                conn.execute("CREATE TABLE IF NOT EXISTS _changes (seq INTEGER PRIMARY KEY, name TEXT NOT NULL, version INTEGER NOT NULL, entry TEXT)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_version ON _changes (name, version)")
+                for table in TABLES:
+                    conn.execute("INSERT OR IGNORE INTO _versions VALUES (?, 0)", (table,))
+                    self._create_table(conn, table)
+        finally:
+            conn.close()
+        self._start_backups()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _create_table(self, conn, table):
+        """إنشاء الجدول عند أول تشغيل مع ترحيل بيانات ملف CSV القديم إن وجد"""
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+        if exists:
+            # عمود _rev (رقم آخر نسخة عدّلت السطر) للقواعد المنشأة قبل إضافته
+            existing = [r[1] for r in conn.execute(f"PRAGMA table_info({_q(table)})")]
+            if "_rev" not in existing:
+                conn.execute(f"ALTER TABLE {_q(table)} ADD COLUMN _rev INTEGER NOT NULL DEFAULT 0")
+            self._migrate_links(conn, table, existing)
+            self._key_index(conn, table)
+            return
+        columns = TABLES[table]["columns"]
+        cols_sql = ", ".join(f"{_q(col)} TEXT NOT NULL DEFAULT ''" for col in columns)
+        conn.execute(f"CREATE TABLE {_q(table)} ({cols_sql}, _rev INTEGER NOT NULL DEFAULT 0)")
+        csv_path = os.path.join(self.data_dir, TABLES[table]["file"])
+        legacy = read_table_csv(csv_path, columns + legacy_columns(table))
+        journal_dir = os.path.join(self.data_dir, JOURNAL_FOLDER)
+        if os.path.isdir(journal_dir):
+            legacy = replay(legacy, Journal(journal_dir).read(table), TABLES[table]["key"])
+        legacy = link_legacy(table, legacy, columns, lambda parent: self._read_all(conn, parent))
+        if not legacy.empty:
+            self._insert_many(conn, table, legacy)
+        self._key_index(conn, table)
+
+    def _key_index(self, conn, table):
+        """فهرس UNIQUE على المفتاح يمنع إضافة كود موجود؛ يبقى فهرساً عادياً إذا كانت في البيانات القديمة أكواد مكررة"""
+        name, key_col = "idx_" + table + "_key", _q(TABLES[table]["key"])
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name=?", (name,)).fetchone()
+        if row and row[0].upper().startswith("CREATE UNIQUE"): return
+        duplicated = conn.execute(f"SELECT 1 FROM {_q(table)} GROUP BY {key_col} HAVING COUNT(*) > 1 LIMIT 1").fetchone()
+        if row and duplicated: return
+        conn.execute(f"DROP INDEX IF EXISTS {_q(name)}")
+        conn.execute(f"CREATE {'' if duplicated else 'UNIQUE '}INDEX {_q(name)} ON {_q(table)} ({key_col})")
+
+    def _migrate_links(self, conn, table, existing):
+        """إضافة أعمدة الربط بالكود لقاعدة قديمة وملؤها من عمود الاسم داخل SQL"""
+        for fk_col, name_col in LEGACY_LINKS.get(table, {}).items():
+            if fk_col in existing or name_col not in existing: continue
+            parent = FOREIGN_KEYS[table][fk_col]
+            conn.execute(f"ALTER TABLE {_q(table)} ADD COLUMN {_q(fk_col)} TEXT NOT NULL DEFAULT ''")
+            conn.execute(
+                f"UPDATE {_q(table)} SET {_q(fk_col)} = COALESCE((SELECT p.{_q(fk_col)} FROM {_q(parent)} p "
+                f"WHERE p.{_q(name_col)} = {_q(table)}.{_q(name_col)} ORDER BY p.rowid LIMIT 1), '')"
+            )
+
+    def _read_all(self, conn, table):
+        columns = TABLES[table]["columns"]
+        rows = conn.execute(f"SELECT {', '.join(_q(c) for c in columns)} FROM {_q(table)} ORDER BY rowid").fetchall()
+        return pd.DataFrame(rows, columns=columns, dtype=str)
+
+    def _insert_many(self, conn, table, df):
+        columns = TABLES[table]["columns"]
+        placeholders = ", ".join("?" for _ in columns)
+        conn.executemany(
+            f"INSERT INTO {_q(table)} ({', '.join(_q(c) for c in columns)}) VALUES ({placeholders})",
+            df[columns].astype(str).values.tolist(),
+        )
+
+    def version(self, table):
+        """رقم نسخة الجدول، يزيد داخل نفس الـ Transaction مع كل كتابة"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT version FROM _versions WHERE name = ?", (table,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    revision = version
+
+    def changes_since(self, table, old_version):
+        """عمليات النسخ التالية لنسخة معينة من سجل التغييرات، أو None إذا استُبدل الجدول أو حُذفت نسخ من السجل"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                version = conn.execute("SELECT version FROM _versions WHERE name = ?", (table,)).fetchone()[0]
+                rows = conn.execute("SELECT version, entry FROM _changes WHERE name = ? AND version > ? ORDER BY seq", (table, old_version)).fetchall()
+        finally:
+            conn.close()
+        if version < old_version or len({v for v, _ in rows}) != version - old_version or any(e is None for _, e in rows):
+            return None
+        return version, [json.loads(e) for _, e in rows], version
+
+    @measured("storage.load")
+    def load_versioned(self, table):
+        """تحميل الجدول ورقم نسخته داخل نفس Transaction القراءة"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                version = conn.execute("SELECT version FROM _versions WHERE name = ?", (table,)).fetchone()[0]
+                df = self._read_all(conn, table)
+        finally:
+            conn.close()
+        METRICS.count(rows=len(df))
+        return version, df, version
+
+    def load(self, table):
+        return self.load_versioned(table)[1]
+
+    def _next_number(self, table, count=1):
+        """حجز الرقم التالي (أو count رقماً) داخل Transaction كتابة، وتهيئة العدّاد من أكواد الجدول عند أول استخدام"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT value FROM _sequences WHERE name = ?", (table,)).fetchone()
+                last = row[0] if row else self._seed_sql(conn, table)
+                conn.execute("INSERT OR REPLACE INTO _sequences VALUES (?, ?)", (table, last + count))
+        finally:
+            conn.close()
+        return last + 1
+
+    def _log(self, conn, table, version, entries=None):
+        """تسجيل عمليات النسخة (None = استبدال كامل) وحذف ما قبل آخر CHANGES_KEEP نسخة؛ يرجع عدد أسطر السجل المتغيرة"""
+        before = conn.total_changes
+        rows = [json.dumps(e, ensure_ascii=False) for e in entries] if entries is not None else [None]
+        conn.executemany("INSERT INTO _changes (name, version, entry) VALUES (?, ?, ?)", [(table, version, e) for e in rows])
+        conn.execute("DELETE FROM _changes WHERE name = ? AND version <= ?", (table, version - CHANGES_KEEP))
+        return conn.total_changes - before
+
+    def _seed_sql(self, conn, table):
+        keys = conn.execute(f"SELECT {_q(TABLES[table]['key'])} FROM {_q(table)}").fetchall()
+        return max_key_number(k for (k,) in keys)
+
+    def _bump_sql(self, conn, table, number):
+        """تقديم العدّاد داخل Transaction الكتابة الحالية (وتهيئته من أكواد الجدول إذا لم يكن له قيمة)"""
+        if number is None: return
+        row = conn.execute("SELECT value FROM _sequences WHERE name = ?", (table,)).fetchone()
+        current = row[0] if row else self._seed_sql(conn, table)
+        if not row or current < number:
+            conn.execute("INSERT OR REPLACE INTO _sequences VALUES (?, ?)", (table, max(current, number)))
+
+    def _bump_to(self, table, number):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._bump_sql(conn, table, number)
+        finally:
+            conn.close()
+
+    def _write(self, table, apply, key=None, base=None, entries=None):
+        """تنفيذ كتابة داخل Transaction بقفل كتابة فوري، مع فحص التعارض ورفع رقم نسخة الجدول وتسجيل عملياتها"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                revision = conn.execute("SELECT version FROM _versions WHERE name = ?", (table,)).fetchone()[0]
+                if base is not None and base != revision:
+                    if key is None:
+                        raise StaleWriteError(TABLES[table]["file"])
+                    touched = conn.execute(f"SELECT MAX(_rev) FROM {_q(table)} WHERE {_q(TABLES[table]['key'])} = ?", (key,)).fetchone()[0]
+                    if touched is None or touched > base:
+                        raise StaleWriteError(TABLES[table]["file"])
+                apply(conn, revision + 1)
+                METRICS.count(rows=conn.total_changes)
+                conn.execute("UPDATE _versions SET version = ? WHERE name = ?", (revision + 1, table))
+                self._log(conn, table, revision + 1, entries)
+        except sqlite3.IntegrityError:
+            # فهرس المفتاح UNIQUE: الكود موجود بالفعل
+            inserted = entries[0]["row"][TABLES[table]["key"]] if entries and entries[0]["op"] == "insert" else None
+            raise StaleWriteError(TABLES[table]["file"], inserted) from None
+        finally:
+            conn.close()
+        self._written(table)
+
+    def _insert_sql(self, table):
+        columns = TABLES[table]["columns"]
+        return f"INSERT INTO {_q(table)} ({', '.join(_q(c) for c in columns)}, _rev) VALUES ({', '.join('?' for _ in columns)}, ?)"
+
+    @measured("storage.save")
+    def save(self, table, df, base=None):
+        """استبدال الجدول كاملاً؛ يُرفض إذا تغيّر الجدول بعد النسخة base"""
+        columns = TABLES[table]["columns"]
+
+        def apply(conn, revision):
+            conn.execute(f"DELETE FROM {_q(table)}")
+            conn.executemany(self._insert_sql(table), [row + [revision] for row in df[columns].astype(str).values.tolist()])
+        self._write(table, apply, base=base)
+
+    @measured("storage.insert")
+    def insert(self, table, row):
+        values = [str(row.get(col, "")) for col in TABLES[table]["columns"]]
+        entry = {"op": "insert", "row": dict(zip(TABLES[table]["columns"], values))}
+
+        def apply(conn, revision):
+            conn.execute(self._insert_sql(table), values + [revision])
+            self._bump_sql(conn, table, max_code_number(table, [entry["row"][TABLES[table]["key"]]]))
+        self._write(table, apply, entries=[entry])
+
+    @measured("storage.insert_many")
+    def insert_many(self, frames):
+        """إضافة أسطر كثيرة لعدة جداول (جدول ← DataFrame نصي) في Transaction واحدة"""
+        tables = [table for table in TABLES if table in frames]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                logged = 0
+                for table in tables:
+                    revision = conn.execute("SELECT version FROM _versions WHERE name = ?", (table,)).fetchone()[0] + 1
+                    rows = frames[table][TABLES[table]["columns"]].astype(str).values.tolist()
+                    try:
+                        conn.executemany(self._insert_sql(table), [row + [revision] for row in rows])
+                    except sqlite3.IntegrityError:
+                        raise StaleWriteError(TABLES[table]["file"]) from None
+                    conn.execute("UPDATE _versions SET version = ? WHERE name = ?", (revision, table))
+                    logged += self._log(conn, table, revision)
+                    self._bump_sql(conn, table, max_code_number(table, frames[table][TABLES[table]["key"]].astype(str)))
+                METRICS.count(rows=conn.total_changes - len(tables) - logged)
+        finally:
+            conn.close()
+        for table in tables:
+            self._written(table)
+
+    @measured("storage.save_many")
+    def save_many(self, frames):
+        """استبدال عدة جداول كاملة (للاستعادة) في Transaction واحدة: تُستبدل كلها أو لا يتغير شيء"""
+        tables = [table for table in TABLES if table in frames]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                logged = 0
+                for table in tables:
+                    revision = conn.execute("SELECT version FROM _versions WHERE name = ?", (table,)).fetchone()[0] + 1
+                    rows = frames[table][TABLES[table]["columns"]].astype(str).values.tolist()
+                    conn.execute(f"DELETE FROM {_q(table)}")
+                    conn.executemany(self._insert_sql(table), [row + [revision] for row in rows])
+                    conn.execute("UPDATE _versions SET version = ? WHERE name = ?", (revision, table))
+                    logged += self._log(conn, table, revision)
+                METRICS.count(rows=conn.total_changes - len(tables) - logged)
+        finally:
+            conn.close()
+        for table in tables:
+            self._written(table)
+
+    @measured("storage.delete_many")
+    def delete_many(self, keys, bases=None):
+        """حذف أسطر كثيرة من عدة جداول (جدول ← أكواد) في Transaction واحدة؛ يُرفض إذا تغيّر جدول بعد مراجعته في bases"""
+        tables = [table for table in TABLES if table in keys]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                logged = 0
+                for table in tables:
+                    revision = conn.execute("SELECT version FROM _versions WHERE name = ?", (table,)).fetchone()[0]
+                    if bases and table in bases and bases[table] != revision:
+                        raise StaleWriteError(TABLES[table]["file"])
+                    conn.executemany(f"DELETE FROM {_q(table)} WHERE {_q(TABLES[table]['key'])} = ?", [(key,) for key in keys[table]])
+                    conn.execute("UPDATE _versions SET version = ? WHERE name = ?", (revision + 1, table))
+                    logged += self._log(conn, table, revision + 1)
+                METRICS.count(rows=conn.total_changes - len(tables) - logged)
+        finally:
+            conn.close()
+        for table in tables:
+            self._written(table)
+
+    @measured("storage.update")
+    def update(self, table, key, changes, base=None):
+        sets = ", ".join(f"{_q(col)} = ?" for col in changes)
+
+        def apply(conn, revision):
+            conn.execute(f"UPDATE {_q(table)} SET {sets}, _rev = ? WHERE {_q(TABLES[table]['key'])} = ?", [str(v) for v in changes.values()] + [revision, key])
+        entry = {"op": "update", "key": key, "changes": {col: str(v) for col, v in changes.items()}}
+        self._write(table, apply, key=key, base=base, entries=[entry])
+
+    @measured("storage.delete")
+    def delete(self, table, key, base=None):
+        self._write(table, lambda conn, revision: conn.execute(f"DELETE FROM {_q(table)} WHERE {_q(TABLES[table]['key'])} = ?", (key,)),
+                    key=key, base=base, entries=[{"op": "delete", "key": key}])
+
+
+BACKENDS = {"csv": CSVBackend, "sqlite": SQLiteBackend}
+
+
+def make_backend(kind=None, data_dir="."):
+    """اختيار محرك التخزين من المتغير ATELIER_STORAGE (csv افتراضياً)"""
+    kind = (kind or os.environ.get("ATELIER_STORAGE", "csv")).lower()
+    if kind not in BACKENDS:
+        raise ValueError(f"محرك تخزين غير معروف: {kind}")
+    return BACKENDS[kind](data_dir)
@@ -0,0 +1,169 @@
+"""بيانات تجريبية متسقة بأي حجم (لقياس الأداء وتجربة التطبيق)، بنفس الأعمدة والروابط الحقيقية
+
+نفس البذرة تعطي نفس البيانات دائماً. الأرصدة مطابقة للدفعات، وحجوزات كل فستان متباعدة.
+    python -m atelier.synthetic مجلد_البيانات --bookings 50000 [--seed 0] [--storage sqlite]
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from atelier.schema import DATE_FORMAT, DRESS_TYPES
+from atelier.sequences import ID_PREFIXES, ID_START
+from atelier.storage import TABLES, make_backend
+
+BRIDES = ["منى", "سارة", "هدى", "نور", "مريم", "ياسمين", "آية", "دينا", "رنا", "شيماء", "أسماء", "فاطمة", "ريم", "ندى", "هبة", "إسراء"]
+GROOMS = ["أحمد", "علي", "محمد", "كريم", "عمر", "يوسف", "مصطفى", "محمود", "خالد", "حسن", "إبراهيم", "طارق", "شريف", "وليد"]
+FAMILIES = ["السيد", "عبد الله", "حسين", "إبراهيم", "منصور", "سليمان", "فؤاد", "الشريف", "عثمان", "رمضان", "جمال", "نصار"]
+CITIES = ["القاهرة", "الجيزة", "الإسكندرية", "المنصورة", "طنطا", "الزقازيق", "بنها", "شبين الكوم"]
+DRESS_COLORS = ["أبيض", "أوف وايت", "شامبين", "وردي", "ذهبي", "فضي", "كحلي", "أحمر"]
+DRESS_STYLES = ["منفوش", "سمبل", "بذيل طويل", "بأكمام دانتيل", "كب", "مطرز بالكامل"]
+
+# الخدمات الثابتة لكل قسم مع سعرها المقترح
+SERVICES = [
+    ("الميكب", "ميكب عروسة", 3000), ("الميكب", "ميكب سواريه", 1200), ("الميكب", "ميكب خطوبة", 1800),
+    ("التصوير", "تصوير فرح كامل", 6000), ("التصوير", "سيشن خارجي", 2500),
+    ("الشعر", "تسريحة عروسة", 1500), ("الشعر", "تسريحة سواريه", 700),
+    ("البشره", "جلسة تنظيف بشرة", 600), ("البشره", "باكدج عروسة", 2200),
+    ("الفساتين", "فستان زفاف", 8000), ("الفساتين", "فستان سواريه", 2500), ("الفساتين", "فستان خطوبة", 4000),
+]
+
+NO_DRESS = "بدون فستان"
+HISTORY_DAYS = 3 * 365
+
+
+def _codes(table, count, prefixes=None):
+    numbers = pd.Series(np.arange(ID_START + 1, ID_START + 1 + count)).astype(str)
+    return (prefixes if prefixes is not None else ID_PREFIXES[table]) + "-" + numbers
+
+
+def _dates(days):
+    return pd.Series(pd.to_datetime(days, unit="D")).dt.strftime(DATE_FORMAT)
+
+
+def _money(values):
+    return pd.Series(np.asarray(values, dtype="float64")).astype(str)
+
+
+def generate(bookings=1000, seed=0, today=None):
+    """الجداول الخمسة كنصوص (كما تُخزن): العملاء ثلثا عدد الحجوزات، وفستان لكل 50 حجز، ومن دفعة لثلاث لكل حجز
+
+    المناسبات موزعة على 3 سنوات حتى اليوم وحتى 8 شهور بعده، فالمناسبات القادمة والمسددة القديمة موجودة معاً.
+    """
+    rng = np.random.default_rng(seed)
+    today = (pd.Timestamp(today or date.today()) - pd.Timestamp(0)).days
+    n_customers = max(1, bookings * 2 // 3)
+    n_dresses = max(5, bookings // 50)
+
+    registered = today - rng.integers(30, HISTORY_DAYS, n_customers)
+    customers = pd.DataFrame({
+        "كود العميل": _codes("customers", n_customers),
+        "تاريخ التسجيل": _dates(registered),
+        "اسم العروسه": pd.Series(rng.choice(BRIDES, n_customers)) + " " + rng.choice(FAMILIES, n_customers),
+        "اسم العريس": pd.Series(rng.choice(GROOMS, n_customers)) + " " + rng.choice(FAMILIES, n_customers),
+        "العنوان": rng.choice(CITIES, n_customers),
+        "تليفون 1": pd.Series(rng.choice(["010", "011", "012", "015"], n_customers)) + pd.Series(rng.integers(0, 10**8, n_customers)).astype(str).str.zfill(8),
+        "تليفون 2": "",
+        "ملاحظات": "",
+    })
+
+    services = pd.DataFrame(SERVICES, columns=["القسم", "اسم الخدمة", "السعر المقترح"])
+    services.insert(0, "كود الخدمة", _codes("services", len(services)))
+    services["السعر المقترح"] = _money(services["السعر المقترح"])
+
+    dresses = pd.DataFrame({
+        "كود الفستان": _codes("dresses", n_dresses),
+        "نوع الفستان": rng.choice(DRESS_TYPES[:2], n_dresses, p=[0.6, 0.4]),
+        "تاريخ الشراء": _dates(today - HISTORY_DAYS - rng.integers(0, 365, n_dresses)),
+        "وصف الفستان": pd.Series(rng.choice(DRESS_STYLES, n_dresses)) + " " + rng.choice(DRESS_COLORS, n_dresses),
+        "صورة الفستان": "",
+        "حالة الفستان": "متاح",
+    })
+
+    # الحجز بعد تسجيل العميلة بأيام، والمناسبة بعد الحجز بأسبوع إلى 8 شهور
+    owner = rng.integers(0, n_customers, bookings)
+    booked = np.minimum(registered[owner] + rng.integers(0, 30, bookings), today)
+    event = booked + rng.integers(7, 240, bookings)
+    service = rng.integers(0, len(SERVICES), bookings)
+    department = np.array([s[0] for s in SERVICES])[service]
+    price = np.round(np.array([s[2] for s in SERVICES])[service] * rng.uniform(0.8, 1.3, bookings), -2)
+    order = np.argsort(event, kind="stable")
+    # حجوزات الفساتين بترتيب المناسبة توزع على الفساتين بالدور، فتتباعد حجوزات الفستان الواحد
+    dress = np.full(bookings, NO_DRESS, dtype=object)
+    with_dress = order[department[order] == "الفساتين"]
+    dress[with_dress] = dresses["كود الفستان"].to_numpy()[np.arange(len(with_dress)) % n_dresses]
+
+    # المناسبات الماضية مسددة غالباً، والقادمة مدفوع منها عربون وجزء فقط
+    counts = rng.integers(1, 4, bookings)
+    settled = (event < today) & (rng.random(bookings) < 0.9)
+    share = np.where(settled, 1.0, rng.uniform(0.2, 0.8, bookings))
+    booking_of = np.repeat(np.arange(bookings), counts)
+    starts = np.cumsum(counts) - counts
+    step = np.arange(len(booking_of)) - starts[booking_of]
+    weights = rng.uniform(0.5, 1.5, len(booking_of))
+    amounts = np.round(price[booking_of] * share[booking_of] * weights / np.bincount(booking_of, weights)[booking_of], 0)
+    # آخر دفعة تكمل المجموع المطلوب بالضبط (بدون فروق تقريب)
+    last = starts + counts - 1
+    amounts[last] += np.round(price * share, 0) - np.bincount(booking_of, amounts, minlength=bookings)
+    paid = np.bincount(booking_of, amounts, minlength=bookings)
+    span = np.minimum(event, today) - booked
+    paid_on = booked[booking_of] + span[booking_of] * step // counts[booking_of]
+
+    booking_codes = _codes("bookings", bookings, pd.Series(department).str[0:2].str.upper())
+    bookings_df = pd.DataFrame({
+        "كود الحجز": booking_codes,
+        "تاريخ الحجز": _dates(booked),
+        "كود العميل": customers["كود العميل"].to_numpy()[owner],
+        "القسم": department,
+        "الخدمة": np.array([s[1] for s in SERVICES])[service],
+        "كود الفستان": dress,
+        "تاريخ المناسبة": _dates(event),
+        "السعر المتفق": _money(price),
+        "المدفوع": _money(paid),
+        "المتبقي": _money(price - paid),
+        "ملاحظات الحجز": "",
+    })
+
+    payments = pd.DataFrame({
+        "كود الدفع": _codes("payments", len(booking_of)),
+        "التاريخ": _dates(paid_on),
+        "كود الحجز": booking_codes.to_numpy()[booking_of],
+        "القيمة المدفوعة": _money(amounts),
+        "المتبقي بعد الدفعة": _money(price[booking_of] - pd.Series(amounts).groupby(booking_of).cumsum().to_numpy()),
+        "ملاحظات الدفع": np.where(step == 0, "عربون حجز", ""),
+    })
+    frames = {"customers": customers, "services": services, "dresses": dresses, "bookings": bookings_df, "payments": payments}
+    return {table: df[TABLES[table]["columns"]].astype(str) for table, df in frames.items()}
+
+
+def write(backend, frames):
+    """حفظ الجداول المولدة كاملة (تستبدل محتوى الجداول)"""
+    for table, df in frames.items():
+        backend.save(table, df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m atelier.synthetic", description="توليد بيانات تجريبية للأتيليه")
+    parser.add_argument("data_dir", help="مجلد البيانات (يجب أن يكون فارغاً)")
+    parser.add_argument("--bookings", type=int, default=1000, help="عدد الحجوزات")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=["csv", "sqlite"], help="محرك التخزين (افتراضياً حسب ATELIER_STORAGE)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    backend = make_backend(args.storage, data_dir=args.data_dir)
+    if any(len(backend.load(table)) for table in TABLES):
+        print("⚠️ المجلد فيه بيانات بالفعل؛ اختر مجلداً فارغاً حتى لا تتعارض الأكواد")
+        return 2
+    frames = generate(args.bookings, args.seed)
+    write(backend, frames)
+    backend.flush_backups()
+    print(" — ".join(f"{table}: {len(df)}" for table, df in frames.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+import pytest
+
+from atelier.archive import archive_settled
+from atelier.cache import SharedTables
+from atelier.storage import make_backend
+
+TODAY = date.today()
+
+
+def _booking(code, event, price, paid):
+    return {"كود الحجز": code, "تاريخ الحجز": (event - timedelta(days=30)).isoformat(), "كود العميل": "C-101",
+            "القسم": "الميكب", "الخدمة": "ميكب عروسة", "كود الفستان": "بدون فستان", "تاريخ المناسبة": event.isoformat(),
+            "السعر المتفق": str(price), "المدفوع": str(paid), "المتبقي": str(price - paid)}
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    backend = make_backend(request.param, data_dir=str(tmp_path))
+    backend.insert("customers", {"كود العميل": "C-101", "اسم العروسه": "منى", "اسم العريس": "أحمد"})
+    backend.insert("bookings", _booking("BK-101", TODAY - timedelta(days=800), 3000, 3000))
+    backend.insert("bookings", _booking("BK-102", TODAY + timedelta(days=20), 8000, 2000))
+    backend.insert("payments", {"كود الدفع": "PAY-101", "التاريخ": (TODAY - timedelta(days=830)).isoformat(), "كود الحجز": "BK-101", "القيمة المدفوعة": "3000"})
+    backend.insert("payments", {"كود الدفع": "PAY-102", "التاريخ": TODAY.isoformat(), "كود الحجز": "BK-102", "القيمة المدفوعة": "2000"})
+    assert backend.flush_backups()
+    return backend
+
+
+def test_archive_keeps_finance_totals(backend):
+    before = SharedTables(backend).finance_with_archive().summary()
+    assert archive_settled(backend, SharedTables(backend).archive, TODAY - timedelta(days=365)) == 1
+    tables = SharedTables(backend)
+    assert backend.load("bookings")["كود الحجز"].tolist() == ["BK-102"]
+    assert tables.finance_with_archive().summary() == before
+    assert tables.history("bookings", "كود العميل", "C-101")["كود الحجز"].tolist() == ["BK-101", "BK-102"]
+
+
+def test_restore_after_archive_does_not_double_count(backend):
+    point = backend.backups.points()[-1]
+    before = SharedTables(backend).finance_with_archive().summary()
+    assert before["sales"] == 11000 and before["count"] == 2
+    archive_settled(backend, SharedTables(backend).archive, TODAY - timedelta(days=365))
+    backend.restore(point)
+    tables = SharedTables(backend)
+    assert sorted(backend.load("bookings")["كود الحجز"]) == ["BK-101", "BK-102"]
+    assert tables.finance_with_archive().summary() == before
+    assert len(tables.archived_only("bookings")) == 0
+    # أرشفة من جديد بعد الاستعادة: السجل في الأرشيف مرتين ويُحسب مرة واحدة
+    archive_settled(backend, tables.archive, TODAY - timedelta(days=365))
+    assert SharedTables(backend).finance_with_archive().summary() == before
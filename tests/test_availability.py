@@ -0,0 +1,49 @@
+import pandas as pd
+
+from atelier.availability import DressCalendar
+
+TODAY = "2024-06-01"
+
+
+def _calendar(before=2, after=3):
+    bookings = pd.DataFrame({
+        "كود الفستان": ["D-101", "D-101", "بدون فستان", "D-102", ""],
+        "تاريخ المناسبة": pd.to_datetime(["2024-06-10", "2024-06-20", "2024-06-10", None, "2024-06-10"]),
+    })
+    dresses = pd.DataFrame({"كود الفستان": ["D-101", "D-102", "D-103"], "حالة الفستان": ["متاح", "متاح", "في المغسلة"]})
+    return DressCalendar(bookings, dresses, before, after, today=TODAY)
+
+
+def test_buffer_days_around_each_event():
+    calendar = _calendar()
+    # الحجز الأول يشغل الفستان من 8 إلى 13 يونيو
+    assert not calendar.is_free("D-101", "2024-06-08")
+    assert not calendar.is_free("D-101", "2024-06-13")
+    assert calendar.is_free("D-101", "2024-06-07")
+    assert calendar.is_free("D-101", "2024-06-14", "2024-06-17")
+    assert not calendar.is_free("D-101", "2024-06-14", "2024-06-18")
+    assert not calendar.is_free("D-101", "2024-06-01", "2024-06-30")
+    # الحجز بدون تاريخ أو بدون فستان لا يشغل شيئاً
+    assert calendar.is_free("D-102", "2024-06-10")
+    assert calendar.is_free("D-999", "2024-06-10")
+
+
+def test_laundry_is_busy_from_today():
+    calendar = _calendar()
+    assert not calendar.is_free("D-103", TODAY)
+    assert not calendar.is_free("D-103", "2024-06-04")
+    assert calendar.is_free("D-103", "2024-06-05")
+
+
+def test_busy_and_free_on_a_day():
+    calendar = _calendar()
+    assert calendar.busy_on("2024-06-09") == {"D-101"}
+    assert calendar.free_on("2024-06-09") == ["D-102", "D-103"]
+    assert calendar.free_on("2024-06-15") == ["D-101", "D-102", "D-103"]
+    assert calendar.busy_on("2024-06-02") == {"D-103"}
+
+
+def test_reservations_of_one_dress():
+    reservations = _calendar(before=1, after=1).reservations("D-101")
+    assert [(str(a), str(b)) for a, b in reservations.values.tolist()] == [("2024-06-09", "2024-06-11"), ("2024-06-19", "2024-06-21")]
+    assert _calendar().reservations("D-102").empty
@@ -0,0 +1,67 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from atelier.backups import BackupStore, split_chunks
+from atelier.storage import TABLES, make_backend
+
+
+def _customer(code, bride="منى"):
+    return {"كود العميل": code, "اسم العروسه": bride, "اسم العريس": "أحمد"}
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    return make_backend(request.param, data_dir=str(tmp_path))
+
+
+def _objects(store):
+    return sum(len(files) for _, _, files in os.walk(store.objects_dir))
+
+
+def test_restore_round_trip(backend):
+    backend.insert("customers", _customer("C-101"))
+    backend.insert("customers", _customer("C-102"))
+    backend.insert("services", {"كود الخدمة": "S-101", "القسم": "الميكب", "اسم الخدمة": "ميكب عروسة", "السعر": "1500"})
+    assert backend.flush_backups()
+    point = backend.backups.points()[-1]
+    saved = {table: backend.load(table) for table in TABLES}
+
+    backend.update("customers", "C-101", {"اسم العروسه": "سارة"})
+    backend.delete("customers", "C-102")
+    backend.delete("services", "S-101")
+    backend.restore(point)
+    for table in TABLES:
+        pd.testing.assert_frame_equal(backend.load(table).reset_index(drop=True), saved[table].reset_index(drop=True))
+    # الاستعادة تعديل عادي: تُكتب بعدها نقطة جديدة ولا تُحذف النقاط اللاحقة
+    assert backend.flush_backups()
+    assert backend.backups.points()[-1] > point
+
+
+def test_points_share_unchanged_chunks(tmp_path):
+    store = BackupStore(str(tmp_path / "backups"))
+    df = pd.DataFrame({"كود العميل": [f"C-{n}" for n in range(5000)], "اسم العروسه": "منى"}, dtype=str)
+    first = store.create_point(["customers"], lambda table: df)
+    objects = _objects(store)
+    assert len(split_chunks(df.to_csv(index=False).encode("utf-8"))) == objects
+
+    df.loc[2500, "اسم العروسه"] = "سارة"
+    second = store.create_point(["customers"], lambda table: df)
+    assert _objects(store) - objects <= 2
+    columns = {"customers": list(df.columns)}
+    assert store.restore(first, columns)["customers"]["اسم العروسه"].eq("منى").all()
+    pd.testing.assert_frame_equal(store.restore(second, columns)["customers"], df)
+
+
+def test_point_at_and_prune(tmp_path):
+    store = BackupStore(str(tmp_path / "backups"), keep_points=2)
+    frames = [pd.DataFrame({"كود العميل": [f"C-{n}"]}, dtype=str) for n in range(3)]
+    points = [store.create_point(["customers"], lambda table, df=df: df) for df in frames]
+    assert store.point_at(datetime.now()) == points[-1]
+    assert store.point_at(datetime(2000, 1, 1)) is None
+
+    assert store.prune() == 1
+    assert store.points() == points[1:]
+    assert store.restore(points[1], {"customers": ["كود العميل"]})["customers"]["كود العميل"].tolist() == ["C-1"]
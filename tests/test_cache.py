@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from atelier.cache import SharedTables
+from atelier.schema import parse
+from atelier.storage import make_backend
+
+
+def _customer(code, bride="منى"):
+    return {"كود العميل": code, "اسم العروسه": bride, "اسم العريس": "أحمد", "تليفون 1": "01012345678"}
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    backend = make_backend(request.param, data_dir=str(tmp_path))
+    for code in ["C-101", "C-102", "C-103"]:
+        backend.insert("customers", _customer(code))
+    return backend
+
+
+def _assert_fresh(tables, backend):
+    pd.testing.assert_frame_equal(tables.get("customers").reset_index(drop=True),
+                                  parse(backend.load("customers"), "customers").reset_index(drop=True))
+    assert tables.revision("customers") == backend.revision("customers")
+
+
+def test_changes_are_applied_incrementally(backend):
+    tables = SharedTables(backend)
+    first = tables.get("customers")
+    assert tables.get("customers") is first
+    backend.update("customers", "C-102", {"اسم العروسه": "سارة"})
+    backend.delete("customers", "C-101")
+    backend.insert("customers", _customer("C-104", "هدى"))
+    _assert_fresh(tables, backend)
+    # الانتقال الأخير محفوظ بعملياته، فالقوائم والفهارس تُحدَّث بالأسطر المتغيرة فقط
+    before, after, entries = tables._changes["customers"]
+    assert before is first and [e["op"] for e in entries] == ["update", "delete", "insert"]
+    assert tables.search("customers", "هدى")["كود العميل"].tolist() == ["C-104"]
+
+
+def test_full_reload_after_rewrite(backend):
+    tables = SharedTables(backend)
+    tables.get("customers")
+    df = backend.load("customers")
+    df.loc[df["كود العميل"] == "C-103", "اسم العروسه"] = "ريم"
+    backend.save("customers", df)
+    _assert_fresh(tables, backend)
+    assert "customers" not in tables._changes
+
+
+def test_writes_from_another_instance_are_seen(backend, tmp_path):
+    tables = SharedTables(backend)
+    tables.get("customers")
+    make_backend(backend.name, data_dir=str(tmp_path)).update("customers", "C-103", {"اسم العروسه": "ريم"})
+    _assert_fresh(tables, backend)
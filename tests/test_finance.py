@@ -0,0 +1,63 @@
+import pytest
+
+from atelier.cache import SharedTables
+from atelier.finance import FinanceTotals, filtered
+from atelier.schema import parse
+from atelier.storage import make_backend
+
+
+def _booking(code, day, department, price, paid, dress="بدون فستان"):
+    return {"كود الحجز": code, "تاريخ الحجز": day, "كود العميل": "C-101", "القسم": department,
+            "الخدمة": "خدمة " + department, "كود الفستان": dress, "تاريخ المناسبة": day,
+            "السعر المتفق": str(price), "المدفوع": str(paid), "المتبقي": str(price - paid)}
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    backend = make_backend(request.param, data_dir=str(tmp_path))
+    backend.insert("bookings", _booking("BK-101", "2024-01-10", "الميكب", 3000, 1000))
+    backend.insert("bookings", _booking("BK-102", "2024-01-20", "الفساتين", 8000, 8000, dress="D-101"))
+    backend.insert("bookings", _booking("BK-103", "2024-03-05", "الميكب", 2500, 500))
+    return backend
+
+
+def _fresh(backend):
+    totals = FinanceTotals("كود الحجز")
+    totals.add(parse(backend.load("bookings"), "bookings"))
+    return totals
+
+
+def _assert_same(totals, expected):
+    assert totals.summary() == expected.summary()
+    for name in ["القسم", "الشهر", "الخدمة", "الفستان"]:
+        assert totals.by(name).values.tolist() == expected.by(name).values.tolist()
+
+
+def test_summary_and_groups(backend):
+    totals = SharedTables(backend).finance()
+    assert totals.summary() == {"sales": 13500, "collected": 9500, "remaining": 4000, "count": 3}
+    assert totals.by("الشهر").values.tolist() == [["2024-01", 2, 11000, 9000, 2000], ["2024-03", 1, 2500, 500, 2000]]
+    assert totals.months() == ["2024-01", "2024-03"]
+
+
+def test_deltas_match_a_full_rebuild(backend):
+    tables = SharedTables(backend)
+    tables.finance()
+    backend.update("bookings", "BK-101", {"المدفوع": "3000", "المتبقي": "0"})
+    backend.update("bookings", "BK-103", {"القسم": "الفساتين", "تاريخ الحجز": "2024-02-01"})
+    backend.delete("bookings", "BK-102")
+    backend.insert("bookings", _booking("BK-104", "2024-04-01", "الميكب", 1200, 0))
+    _assert_same(tables.finance(), _fresh(backend))
+    # مجموعة لم يبق لها حجوزات تختفي من التجميع
+    assert "2024-03" not in tables.finance().months()
+
+
+def test_filtered_cube(backend):
+    totals = SharedTables(backend).finance()
+    assert filtered(totals).summary() == totals.summary()
+    january = filtered(totals, start="2024-01", end="2024-01")
+    assert january.summary() == {"sales": 11000, "collected": 9000, "remaining": 2000, "count": 2}
+    makeup = filtered(totals, department="الميكب")
+    assert makeup.summary()["count"] == 2
+    assert makeup.by("الشهر").values.tolist() == [["2024-01", 1, 3000, 1000, 2000], ["2024-03", 1, 2500, 500, 2000]]
+    assert filtered(totals, start="2024-02", department="الفساتين").summary()["count"] == 0
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from atelier.importer import commit, validate
+from atelier.schema import parse
+from atelier.settings import Settings
+from atelier.storage import make_backend
+
+
+def _customers(*codes):
+    return pd.DataFrame({
+        "كود العميل": list(codes),
+        "اسم العروسه": "منى", "اسم العريس": "أحمد", "العنوان": "القاهرة", "تليفون 1": "01012345678",
+    })
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    return make_backend(request.param, data_dir=str(tmp_path))
+
+
+def _import(backend, rows):
+    valid, errors = validate("customers", rows, lambda name: parse(backend.load(name), name), Settings(backend.data_dir))
+    assert errors.empty
+    return commit(backend, "customers", valid)
+
+
+def test_next_id_comes_after_imported_codes(backend):
+    _import(backend, _customers("C-105"))
+    assert backend.next_id("customers") == "C-106"
+
+
+def test_blank_codes_skip_explicit_codes_in_same_file(backend):
+    backend.next_id("customers")  # العدّاد مهيأ قبل الاستيراد
+    _import(backend, _customers("", "C-103", ""))
+    codes = backend.load("customers")["كود العميل"].tolist()
+    assert len(set(codes)) == 3
+    assert set(codes) - {"C-103"} == {"C-104", "C-105"}
+    assert backend.next_id("customers") == "C-106"
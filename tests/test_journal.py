@@ -0,0 +1,72 @@
+import os
+
+import pandas as pd
+
+from atelier.journal import Journal, file_sha256, replay
+from atelier.storage import make_backend
+
+
+def _customer(code, bride="منى"):
+    return {"كود العميل": code, "اسم العروسه": bride, "اسم العريس": "أحمد"}
+
+
+def _backend(tmp_path):
+    backend = make_backend("csv", data_dir=str(tmp_path))
+    for code in ["C-101", "C-102", "C-103"]:
+        backend.insert("customers", _customer(code))
+    backend.update("customers", "C-102", {"اسم العروسه": "سارة"})
+    backend.delete("customers", "C-101")
+    return backend
+
+
+def test_replay_applies_entries_in_order():
+    df = pd.DataFrame({"كود": ["A", "B"], "الاسم": ["أ", "ب"]}, dtype=str)
+    entries = [{"op": "insert", "row": {"كود": "C", "الاسم": "ج"}},
+               {"op": "update", "key": "A", "changes": {"كود": "A2", "الاسم": "أأ"}},
+               {"op": "update", "key": "A2", "changes": {"الاسم": "أ٢"}},
+               {"op": "delete", "key": "B"},
+               {"op": "update", "key": "B", "changes": {"الاسم": "لا يظهر"}}]
+    result = replay(df, entries, "كود")
+    assert result.values.tolist() == [["A2", "أ٢"], ["C", "ج"]]
+
+
+def test_writes_go_to_the_journal_until_compaction(tmp_path):
+    backend = _backend(tmp_path)
+    before = backend.load("customers")
+    assert [e["op"] for e in backend.journal.read("customers")] == ["insert", "insert", "insert", "update", "delete"]
+    revision = backend.revision("customers")
+
+    backend.compact("customers")
+    assert backend.journal.read("customers") == []
+    assert backend.revision("customers") == revision
+    pd.testing.assert_frame_equal(backend.load("customers"), before)
+    # بعد الضغط تبدأ الأرقام من رقم اللقطة
+    backend.update("customers", "C-103", {"اسم العروسه": "هدى"}, base=revision)
+    assert backend.revision("customers") == revision + 1
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    backend = _backend(tmp_path)
+    before = backend.load("customers")
+    with open(backend.journal.path("customers"), "a", encoding="utf-8") as f:
+        f.write('{"op": "insert", "row": {"كود العميل": "C-1')
+    pd.testing.assert_frame_equal(make_backend("csv", data_dir=str(tmp_path)).load("customers"), before)
+
+
+def test_interrupted_compaction_is_recovered(tmp_path):
+    backend = _backend(tmp_path)
+    before = backend.load("customers")
+    journal = Journal(backend.journal.folder)
+    # توقف قبل استبدال اللقطة: العلامة لا تطابق الملف، فيُلغى الضغط ويبقى السجل
+    journal.begin_compaction("customers", "0" * 64, backend.revision("customers"))
+    pd.testing.assert_frame_equal(make_backend("csv", data_dir=str(tmp_path)).load("customers"), before)
+    assert not os.path.exists(journal.marker_path("customers"))
+    assert len(journal.read("customers")) == 5
+
+    # توقف بعد استبدال اللقطة وقبل تفريغ السجل: يُكمَل الضغط ولا تُطبق العمليات مرتين
+    revision = backend.revision("customers")
+    before.to_csv(backend.path("customers"), index=False)
+    journal.begin_compaction("customers", file_sha256(backend.path("customers")), revision)
+    pd.testing.assert_frame_equal(make_backend("csv", data_dir=str(tmp_path)).load("customers"), before)
+    assert journal.read("customers") == []
+    assert journal.snapshot_revision("customers") == revision
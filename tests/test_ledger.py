@@ -0,0 +1,64 @@
+import pytest
+
+from atelier.cache import SharedTables
+from atelier.ledger import check, main, repair
+from atelier.schema import parse
+from atelier.storage import make_backend
+
+
+def _booking(code, price, paid):
+    return {"كود الحجز": code, "تاريخ الحجز": "2024-05-01", "كود العميل": "C-101", "القسم": "الميكب",
+            "الخدمة": "ميكب عروسة", "كود الفستان": "بدون فستان", "تاريخ المناسبة": "2024-06-01",
+            "السعر المتفق": str(price), "المدفوع": str(paid), "المتبقي": str(price - paid)}
+
+
+def _payment(code, booking, amount):
+    return {"كود الدفع": code, "التاريخ": "2024-05-01", "كود الحجز": booking, "القيمة المدفوعة": str(amount)}
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    backend = make_backend(request.param, data_dir=str(tmp_path))
+    backend.insert("bookings", _booking("BK-101", 5000, 3000))
+    backend.insert("bookings", _booking("BK-102", 2000, 0))
+    backend.insert("payments", _payment("PAY-101", "BK-101", 1000))
+    backend.insert("payments", _payment("PAY-102", "BK-101", 1500.5))
+    backend.insert("payments", _payment("PAY-103", "BK-999", 200))
+    return backend
+
+
+def _check(backend):
+    return check(parse(backend.load("bookings"), "bookings"), parse(backend.load("payments"), "payments"))
+
+
+def test_check_finds_wrong_balances_and_orphans(backend):
+    mismatches, orphans = _check(backend)
+    assert mismatches["كود الحجز"].tolist() == ["BK-101"]
+    assert mismatches["المدفوع من الدفعات"].tolist() == [2500.5]
+    assert mismatches["المتبقي الصحيح"].tolist() == [2499.5]
+    assert orphans["كود الدفع"].tolist() == ["PAY-103"]
+
+
+def test_repair_fixes_balances(backend):
+    assert repair(backend, _check(backend)[0]) == 1
+    row = parse(backend.load("bookings"), "bookings").iloc[0]
+    assert (row["المدفوع"], row["المتبقي"]) == (2500.5, 2499.5)
+    assert len(_check(backend)[0]) == 0
+
+
+def test_command_line_exit_code(backend, monkeypatch):
+    monkeypatch.setenv("ATELIER_STORAGE", backend.name)
+    assert main([backend.data_dir]) == 1
+    assert main([backend.data_dir, "--repair"]) == 1      # الدفعة بدون حجز تبقى
+    backend.delete("payments", "PAY-103")
+    assert main([backend.data_dir]) == 0
+
+
+def test_ledger_follows_payment_changes(backend):
+    tables = SharedTables(backend)
+    assert tables.ledger().paid("BK-101") == 2500.5
+    backend.update("payments", "PAY-101", {"القيمة المدفوعة": "500"})
+    backend.update("payments", "PAY-103", {"كود الحجز": "BK-102"})
+    backend.delete("payments", "PAY-102")
+    ledger = tables.ledger()
+    assert (ledger.paid("BK-101"), ledger.paid("BK-102"), ledger.paid("BK-999")) == (500, 200, 0)
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from atelier.search import SearchIndex, phone_key
+
+
+def _index(*phones):
+    df = pd.DataFrame({
+        "كود العميل": [f"C-{i}" for i in range(len(phones))],
+        "اسم العروسه": "", "اسم العريس": "", "العنوان": "", "ملاحظات": "",
+        "تليفون 1": list(phones), "تليفون 2": "",
+    })
+    index = SearchIndex("customers")
+    index.add(df, "كود العميل")
+    return index
+
+
+def test_phone_key_international_prefix():
+    assert phone_key("+201098765432") == "01098765432"
+    assert phone_key("00201098765432") == "01098765432"
+    assert phone_key("201098765432") == "01098765432"
+    assert phone_key("+2010987") == "010987"
+
+
+def test_partial_international_phone_matches_local_number():
+    index = _index("01098765432", "01123456789")
+    assert index.search("+2010987") == index.search("010987") == ["C-0"]
+    assert index.search("002010987") == ["C-0"]
@@ -0,0 +1,31 @@
+import pytest
+
+from atelier.sequences import max_code_number
+from atelier.storage import make_backend
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    return make_backend(request.param, data_dir=str(tmp_path))
+
+
+def test_max_code_number_only_counts_generated_pattern():
+    assert max_code_number("dresses", ["D-150", "D-7", "فستان 900", "X-999"]) == 150
+    assert max_code_number("bookings", ["MA-120", "ال-130"]) == 130
+    assert max_code_number("customers", ["بدون"]) is None
+
+
+def test_next_id_is_sequential(backend):
+    assert [backend.next_id("customers") for _ in range(3)] == ["C-101", "C-102", "C-103"]
+    assert list(backend.reserve_numbers("customers", 2)) == [104, 105]
+
+
+def test_manual_code_advances_sequence(backend):
+    backend.next_id("dresses")
+    backend.insert("dresses", {"كود الفستان": "D-150", "وصف الفستان": "يدوي"})
+    assert backend.next_id("dresses") == "D-151"
+
+
+def test_manual_code_before_first_generated_code(backend):
+    backend.insert("dresses", {"كود الفستان": "D-150", "وصف الفستان": "يدوي"})
+    assert backend.next_id("dresses") == "D-151"
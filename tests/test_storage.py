@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from atelier.storage import TABLES, StaleWriteError, make_backend
+
+
+def _customer(code, bride="منى"):
+    return {"كود العميل": code, "اسم العروسه": bride, "اسم العريس": "أحمد", "تليفون 1": "01012345678"}
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    return make_backend(request.param, data_dir=str(tmp_path))
+
+
+def _run(kind, folder):
+    """نفس العمليات على محرك؛ يرجع الجدول الناتج"""
+    backend = make_backend(kind, data_dir=str(folder))
+    for code in ["C-101", "C-102", "C-103"]:
+        backend.insert("customers", _customer(code))
+    backend.update("customers", "C-102", {"اسم العروسه": "سارة", "العنوان": "الجيزة"})
+    backend.delete("customers", "C-101")
+    return backend.load("customers")
+
+
+def test_csv_and_sqlite_give_same_table(tmp_path):
+    csv = _run("csv", tmp_path / "csv")
+    sqlite = _run("sqlite", tmp_path / "sqlite")
+    pd.testing.assert_frame_equal(csv.reset_index(drop=True), sqlite.reset_index(drop=True))
+    assert csv["كود العميل"].tolist() == ["C-102", "C-103"]
+    assert csv.set_index("كود العميل").loc["C-102", "اسم العروسه"] == "سارة"
+    assert list(csv.columns) == TABLES["customers"]["columns"]
+
+
+def test_duplicate_key_is_rejected(backend):
+    backend.insert("customers", _customer("C-101"))
+    with pytest.raises(StaleWriteError):
+        backend.insert("customers", _customer("C-101", "سارة"))
+    with pytest.raises(StaleWriteError):
+        backend.insert_many({"customers": pd.DataFrame([_customer("C-102"), _customer("C-101")]).reindex(columns=TABLES["customers"]["columns"], fill_value="")})
+    assert backend.load("customers")["كود العميل"].tolist() == ["C-101"]
+
+
+def test_key_is_free_again_after_delete(backend):
+    backend.insert("customers", _customer("C-101"))
+    backend.delete("customers", "C-101")
+    backend.insert("customers", _customer("C-101", "سارة"))
+    assert backend.load("customers")["اسم العروسه"].tolist() == ["سارة"]
+
+
+def test_duplicate_from_another_process_is_rejected(tmp_path, backend):
+    other = make_backend(backend.name, data_dir=backend.data_dir)
+    backend.insert("customers", _customer("C-101"))
+    other.insert("customers", _customer("C-102"))
+    with pytest.raises(StaleWriteError):
+        backend.insert("customers", _customer("C-102"))
+
+
+def test_stale_update_is_rejected(backend):
+    backend.insert("customers", _customer("C-101"))
+    backend.insert("customers", _customer("C-102"))
+    base = backend.revision("customers")
+    backend.update("customers", "C-101", {"اسم العروسه": "سارة"})
+    with pytest.raises(StaleWriteError):
+        backend.update("customers", "C-101", {"اسم العروسه": "هدى"}, base=base)
+    # سجل آخر لم يتغير بعد النسخة base: الكتابة تُدمج
+    backend.update("customers", "C-102", {"اسم العروسه": "هدى"}, base=base)
+    names = backend.load("customers").set_index("كود العميل")["اسم العروسه"]
+    assert names.to_dict() == {"C-101": "سارة", "C-102": "هدى"}